@@ -3,7 +3,6 @@
 # License: GPLv3
 
 import datetime
-import pathlib
 import platform
 import subprocess
 import sys
@@ -12,6 +11,7 @@ import tkinter.font as tkfont
 import tkinter.simpledialog as tkdialog
 import tkinter.ttk as ttk
 
+import Images
 import Player
 from Const import APPNAME, NSWE, PAD, PAD3, VERSION, WE
 
@@ -31,8 +31,7 @@ class Form(tkdialog.Dialog):
         year = datetime.date.today().year
         if year > 2021:
             year = f'2021-{year - 2000}'
-        self.icon = tk.PhotoImage(
-            file=(pathlib.Path(__file__).parent / 'images/ple.png'))
+        self.icon = Images.get('ple.png')
         self.image_label = ttk.Label(master, image=self.icon,
                                      anchor=tk.CENTER)
         std_font = tkfont.nametofont('TkDefaultFont')
@@ -78,8 +77,7 @@ Tk {tk.TkVersion}
 
 
     def make_buttons(self):
-        self.ok_icon = tk.PhotoImage(
-            file=(pathlib.Path(__file__).parent / 'images/dialog-ok.png'))
+        self.ok_icon = Images.get('dialog-ok.png')
         self.box = ttk.Frame(self)
         self.ok_button = ttk.Button(
             self.box, text='OK', underline=0, command=self.ok,
@@ -2,20 +2,35 @@
 # Copyright © 2021 Mark Summerfield. All rights reserved.
 # License: GPLv3
 
+import concurrent.futures
 import math
 import os
+import tkinter as tk
 import tkinter.filedialog
+import tkinter.messagebox
+import tkinter.simpledialog
 
 import AboutForm
+import catalog
 import Config
+import dedupe
+import formats
 import HelpForm
+import Images
 import OptionsForm
 import Player
 import playlist
+import repair
+import search
+import SearchForm
+import shuffle
 import TrackForm
+import undo
+import UsedInForm
+import walk
 from Const import (
-    APPNAME, ERROR_FG, HISTORY_LEN, PAUSE_ICON, PLAY_ICON, VERSION,
-    Bookmark)
+    APPNAME, ERROR_FG, HISTORY_LEN, INFO_FG, PAUSE_ICON, PLAY_ICON,
+    VERSION, Bookmark)
 
 
 class ActionMixin:
@@ -35,11 +50,7 @@ class ActionMixin:
 
     def folder_selected(self, name):
         self.tracks = None
-        count = 0
-        for _, _, files in os.walk(name):
-            for file in files:
-                if playlist.is_playlist(file):
-                    count += 1
+        count = len(self.scan(name, playlist.is_playlist))
         if count == 0:
             message = name
         elif count == 1:
@@ -51,7 +62,12 @@ class ActionMixin:
 
     def playlist_selected(self, name):
         try:
-            self.tracks = playlist.Playlist(name)
+            # Reuses the playlist (and its undo history) if it was
+            # recently used and hasn't changed
+            self.tracks = self.recent_playlists.get(name)
+            if self.tracks.journal is None:
+                self.tracks.journal = undo.Journal(
+                    Config.config.undo_levels)
             self.a_playlist_pane.set_tracks(self.tracks)
             if self.startup_or_bookmark:
                 self.a_playlist_pane.treeview.select(
@@ -60,8 +76,8 @@ class ActionMixin:
             self.set_status_message(
                 f'{len(self.tracks):,} tracks in {name} of '
                 f'{self.tracks.humanized_length}', millisec=None)
-            if self.playing is None:
-                self.maybe_update_times(name)
+            if self.playing is None: # probe once the tracks are shown
+                self.after_idle(self.maybe_update_times, name, self.tracks)
             else:
                 treeview = self.a_playlist_pane.treeview
                 if treeview.exists(self.playing):
@@ -90,14 +106,33 @@ class ActionMixin:
 
     def populate_new_playlist(self, path):
         playlist_name = self.unique_new_playlist_name(path)
-        self.tracks = playlist.Playlist(playlist_name)
-        for filename in playlist.filter(path):
-            self.tracks += playlist.Track(playlist.normalize_name(filename),
-                                          filename)
-        self.tracks.sort()
+        self.tracks = playlist.Playlist(
+            playlist_name, relative=Config.config.relative_paths)
+        with self.tracks.batch(): # save once rather than once per track
+            for track in playlist.titled_tracks(playlist.filter(
+                    path, follow_symlinks=Config.config.follow_symlinks,
+                    progress=self.scan_progress)):
+                self.tracks += track
+            self.tracks.sort()
         return playlist_name
 
 
+    def scan(self, folder, match):
+        '''returns a list of the files in folder (and its subfolders) for
+        which match(name) is True'''
+        return list(walk.files(
+            folder, match, follow_symlinks=Config.config.follow_symlinks,
+            progress=self.scan_progress))
+
+
+    def scan_progress(self, folders, files):
+        if folders % SCAN_PROGRESS_FOLDERS == 0:
+            self.set_status_message(
+                f'Scanned {folders:,} folders and {files:,} files…',
+                millisec=None)
+            self.update_idletasks()
+
+
     def unique_new_playlist_name(self, path):
         config = Config.config
         playlists_path = config.playlists_path
@@ -113,6 +148,190 @@ class ActionMixin:
             count += 1
 
 
+    def on_repair(self, _event=None):
+        name = self.playlists_pane.treeview.focus()
+        if not name:
+            return
+        if os.path.isdir(name):
+            names = self.scan(name, playlist.is_playlist)
+        elif playlist.is_playlist(name):
+            names = [name]
+        else:
+            return
+        top = self.winfo_toplevel()
+        relocated = unresolved = changed = 0
+        try:
+            top.config(cursor='watch')
+            top.update_idletasks()
+            index = repair.MusicIndex(Config.config.music_path)
+            sizes = dedupe.Hashes().sizes()
+            for filename in names:
+                try:
+                    tracks = playlist.Playlist(filename)
+                    moved, missing = repair.relocate(tracks, index,
+                                                     sizes=sizes)
+                    if moved:
+                        changed += 1
+                    relocated += len(moved)
+                    unresolved += len(missing)
+                except (OSError, playlist.Error):
+                    pass # skip unreadable playlists
+        finally:
+            top.config(cursor='arrow')
+        if changed and self.tracks is not None:
+            self.on_playlists_select() # reload the repaired playlist
+        self.set_status_message(
+            f'Relocated {relocated:,} tracks in {changed:,} playlists; '
+            f'{unresolved:,} tracks still missing',
+            fg=ERROR_FG if unresolved else INFO_FG)
+
+
+    def on_dedupe(self, _event=None, *, content=False):
+        if self.hashing is not None:
+            return # a content dedupe is still hashing
+        name = self.playlists_pane.treeview.focus()
+        if not name:
+            return
+        if os.path.isdir(name):
+            names = self.scan(name, playlist.is_playlist)
+        elif playlist.is_playlist(name):
+            names = [name]
+        else:
+            return
+        current = (None if self.tracks is None else
+                   os.path.abspath(self.tracks.filename))
+        top = self.winfo_toplevel()
+        playlists = []
+        try:
+            top.config(cursor='watch')
+            top.update_idletasks()
+            for filename in sorted(names):
+                if os.path.abspath(filename) == current:
+                    playlists.append(self.tracks) # so undo works
+                else:
+                    try:
+                        playlists.append(playlist.Playlist(filename))
+                    except (OSError, playlist.Error):
+                        pass # skip unreadable playlists
+            if not content:
+                groups = dedupe.find(playlists)
+            else:
+                filenames, stats = dedupe.candidates(playlists)
+        finally:
+            top.config(cursor='arrow')
+        if not content:
+            self.remove_duplicates(groups)
+            return
+        # Hash in a thread (which starts no processes) and find the
+        # duplicates once the hashes are cached
+        hashes = dedupe.Hashes(processes=False)
+        pool = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self.hashing = pool.submit(hashes.digests, filenames, stats)
+        pool.shutdown(wait=False) # the thread exits once it has finished
+        self.set_status_message(f'Comparing the audio of {len(filenames):,} '
+                                'files…', millisec=None)
+        self.after(POLL_MS, self.while_hashing, playlists, hashes)
+
+
+    def while_hashing(self, playlists, hashes):
+        if not self.hashing.done():
+            self.after(POLL_MS, self.while_hashing, playlists, hashes)
+            return
+        future = self.hashing
+        self.hashing = None
+        try:
+            future.result()
+        except OSError as err:
+            self.set_status_message(f'Failed to compare: {err}',
+                                    fg=ERROR_FG)
+            return
+        # The playlists may have changed while hashing so the duplicates
+        # are found now (using the cached hashes)
+        self.remove_duplicates(dedupe.find(playlists, content=True,
+                                           hashes=hashes))
+
+
+    def remove_duplicates(self, groups):
+        across = self.dedupe_across_var.get()
+        doomed = dedupe.removable(groups, across=across)
+        if not doomed:
+            self.set_status_message('No duplicates found')
+            return
+        changed = {id(entry.tracks) for entry in doomed}
+        kept = ('The first occurrence of each is kept.' if across else
+                'Only duplicates within the same playlist are removed.')
+        if tkinter.messagebox.askyesno(
+                f'Duplicates — {APPNAME}',
+                f'Remove {len(doomed):,} duplicate tracks from '
+                f'{len(changed):,} playlists?\n\n{kept}', parent=self):
+            count = dedupe.remove(groups, across=across)
+            if self.tracks is not None and id(self.tracks) in changed:
+                self.a_playlist_pane.clear_filter()
+                self.a_playlist_pane.sync()
+                self.update_undo_ui()
+            self.set_status_message(f'Removed {count:,} duplicate tracks')
+        self.focus_set()
+
+
+    def on_used_in(self, _event=None):
+        if self.tracks is None:
+            return
+        treeview = self.a_playlist_pane.treeview
+        iid = treeview.focus()
+        if not iid:
+            return
+        track = self.tracks[self.a_playlist_pane.index(iid)]
+        form = UsedInForm.Form(self, self.refreshed_catalog(), track)
+        if form.chosen is not None:
+            self.goto_track(form.chosen, form.filename)
+        elif form.changed:
+            self.on_playlists_select() # reload the changed playlist
+        self.focus_set()
+
+
+    def on_search(self, _event=None):
+        tracks_catalog = self.refreshed_catalog(refresh=False)
+        if self.search_index is None:
+            self.search_index = search.SearchIndex(tracks_catalog)
+        top = self.winfo_toplevel()
+        try:
+            top.config(cursor='watch')
+            top.update_idletasks()
+            self.search_index.update() # also refreshes the catalog
+        finally:
+            top.config(cursor='arrow')
+        form = SearchForm.Form(self, self.search_index)
+        if form.chosen is not None:
+            self.goto_track(form.chosen.playlist, form.chosen.filename)
+        self.focus_set()
+
+
+    def refreshed_catalog(self, *, refresh=True):
+        if self.tracks_catalog is None:
+            self.tracks_catalog = catalog.Catalog(
+                Config.config.playlists_path)
+        if refresh:
+            top = self.winfo_toplevel()
+            try:
+                top.config(cursor='watch')
+                top.update_idletasks()
+                self.tracks_catalog.refresh()
+            finally:
+                top.config(cursor='arrow')
+        return self.tracks_catalog
+
+
+    def goto_track(self, playlist_name, filename):
+        config = Config.config
+        config.current_playlist = playlist_name
+        config.current_track = filename
+        self.startup_or_bookmark = True
+        if playlist_name == self.playlists_pane.treeview.focus():
+            self.on_playlists_select()
+        else:
+            self.playlists_pane.treeview.select(playlist_name)
+
+
     def on_options(self, _event=None):
         OptionsForm.Form(self)
         self.focus_set()
@@ -133,15 +352,17 @@ class ActionMixin:
         filename = tkinter.filedialog.askopenfilename(
             parent=self, title=f'Add Track — {APPNAME}',
             initialdir=self.music_path,
-            filetypes=(('Ogg', '*.ogg'), ('Ogg audio', '*.oga'),
-                       ('MP3', '*.mp3')))
+            filetypes=(('Music', ' '.join(
+                f'*{suffix.lower()}' for suffix in sorted(
+                    formats.suffixes()))),) + formats.filetypes())
         if filename:
+            self.a_playlist_pane.clear_filter()
             self.music_path = os.path.dirname(filename)
-            track = playlist.Track(playlist.normalize_name(filename),
-                                   filename)
+            track = playlist.titled_tracks([filename])[0]
             self.tracks += track
-            self.a_playlist_pane.append(track)
-            self.a_playlist_pane.treeview.select(filename)
+            self.a_playlist_pane.treeview.select(
+                self.a_playlist_pane.insert('', tk.END, track))
+            self.update_undo_ui()
         self.a_playlist_pane.treeview.focus_set()
 
 
@@ -152,15 +373,15 @@ class ActionMixin:
         treeview = self.a_playlist_pane.treeview
         iid = treeview.focus()
         if iid:
-            index = treeview.index(iid)
+            index = self.a_playlist_pane.index(iid)
             if index > -1:
                 track = self.tracks[index]
                 form = TrackForm.Form(self, track)
                 if (form.edited_track is not None and
-                        form.edited_track.title != track.title):
-                    track.title = form.edited_track.title
-                    self.tracks.save()
+                        self.tracks.retitle(index,
+                                            form.edited_track.title)):
                     self.a_playlist_pane.update(iid, track)
+                    self.update_undo_ui()
             treeview.focus_set()
             treeview.select(iid)
 
@@ -168,54 +389,149 @@ class ActionMixin:
     def on_move_track_up(self, _event=None):
         if self.tracks is None:
             return
-        treeview = self.a_playlist_pane.treeview
-        iid = treeview.focus()
-        if iid:
-            index = treeview.index(iid)
+        pane = self.a_playlist_pane
+        treeview = pane.treeview
+        pane.clear_filter()
+        indexes = pane.selected_indexes()
+        if len(indexes) > 1:
+            self.move_tracks(indexes, self.tracks.move_up)
+        elif indexes:
+            index = indexes[0]
+            iid = treeview.selection()[0] # the focus may be elsewhere
             if self.tracks.moveup(index):
                 treeview.move(iid, '', index - 1)
+                self.update_undo_ui()
 
 
     def on_move_track_down(self, _event=None):
         if self.tracks is None:
             return
-        treeview = self.a_playlist_pane.treeview
-        iid = treeview.focus()
-        if iid:
-            index = treeview.index(iid)
+        pane = self.a_playlist_pane
+        treeview = pane.treeview
+        pane.clear_filter()
+        indexes = pane.selected_indexes()
+        if len(indexes) > 1:
+            self.move_tracks(indexes, self.tracks.move_down)
+        elif indexes:
+            index = indexes[0]
+            iid = treeview.selection()[0] # the focus may be elsewhere
             if self.tracks.movedown(index):
                 treeview.move(iid, '', index + 1)
+                self.update_undo_ui()
+
+
+    def on_move_tracks_to(self, _event=None):
+        if self.tracks is None:
+            return
+        pane = self.a_playlist_pane
+        pane.clear_filter()
+        indexes = pane.selected_indexes()
+        if not indexes:
+            return
+        count = len(self.tracks) - len(indexes) + 1 # the last position
+        position = tkinter.simpledialog.askinteger(
+            f'Move To — {APPNAME}',
+            f'Move the selected tracks to position (1-{count:,}):',
+            parent=self, minvalue=1, maxvalue=count,
+            initialvalue=min(indexes[0] + 1, count))
+        if position is not None:
+            self.move_tracks(indexes, lambda indexes: self.tracks.move_to(
+                indexes, position - 1))
+        pane.treeview.focus_set()
+
+
+    def move_tracks(self, indexes, mover):
+        pane = self.a_playlist_pane
+        tracks = [self.tracks[index] for index in indexes]
+        if mover(indexes): # one playlist rewrite and one save
+            pane.reorder() # one Treeview update
+            pane.select_tracks(tracks)
+            self.update_undo_ui()
 
 
     def on_remove_track(self, _event=None):
         if self.tracks is None:
             return
-        treeview = self.a_playlist_pane.treeview
-        iid = treeview.focus()
-        if iid:
-            self.deleted_index = treeview.index(iid)
-            focus_iid = treeview.next(iid)
+        pane = self.a_playlist_pane
+        treeview = pane.treeview
+        pane.clear_filter()
+        iids = treeview.selection()
+        if iids:
+            focus_iid = treeview.next(iids[-1])
             if not focus_iid:
-                focus_iid = treeview.prev(iid)
-            treeview.delete(iid)
+                focus_iid = treeview.prev(iids[0])
+            self.tracks.remove(pane.selected_indexes())
+            pane.delete_many(iids)
             if focus_iid:
                 treeview.select(focus_iid)
-            self.deleted_track = self.tracks.pop(self.deleted_index)
-            self.update_ui()
+            self.update_undo_ui()
+
+
+    def on_undo(self, _event=None):
+        if self.tracks is not None and self.tracks.journal is not None:
+            self.replay(self.tracks.journal.undo)
+
+
+    def on_redo(self, _event=None):
+        if self.tracks is not None and self.tracks.journal is not None:
+            self.replay(self.tracks.journal.redo)
+
+
+    def replay(self, action):
+        pane = self.a_playlist_pane
+        pane.clear_filter()
+        if action(self.tracks): # one playlist change and one save
+            changed = pane.sync()
+            if changed:
+                pane.select_tracks(changed)
+            elif pane.treeview.focus():
+                pane.treeview.see(pane.treeview.focus())
+            self.update_undo_ui()
+        pane.treeview.focus_set()
+
+
+    def on_cut_tracks(self, _event=None):
+        if self.on_copy_tracks():
+            self.on_remove_track() # so Undo can undo the cut
+
+
+    def on_copy_tracks(self, _event=None):
+        if self.tracks is None:
+            return False
+        indexes = self.a_playlist_pane.selected_indexes()
+        if indexes:
+            self.clipboard = [playlist.Track(track.title, track.filename,
+                                             track.secs)
+                              for track in (self.tracks[index]
+                                            for index in indexes)]
+            count = len(self.clipboard)
+            self.set_status_message(
+                f'{count:,} track{"" if count == 1 else "s"} on the '
+                'clipboard')
+        return bool(indexes)
 
 
-    def on_unremove_track(self, _event=None):
-        if self.tracks is None or self.deleted_track is None:
+    def on_paste_tracks(self, _event=None):
+        if self.tracks is None or not self.clipboard:
             return
-        self.tracks.insert(self.deleted_index, self.deleted_track)
-        treeview = self.a_playlist_pane.treeview
-        treeview.insert(
-            '', self.deleted_index, iid=self.deleted_track.filename,
-            text=self.deleted_track.title, image=self.a_playlist_pane.image)
-        treeview.select(self.deleted_track.filename)
-        self.deleted_track = None
-        self.deleted_index = -1
-        self.update_ui()
+        pane = self.a_playlist_pane
+        pane.clear_filter()
+        index = pane.index(pane.treeview.focus())
+        index = len(self.tracks) if index == -1 else index + 1
+        # Paste copies so that the clipboard can be pasted again
+        tracks = [playlist.Track(track.title, track.filename, track.secs)
+                  for track in self.clipboard]
+        self.tracks.insert_many(index, tracks) # one save
+        pane.insert_many(tracks) # one Treeview reorder
+        pane.select_tracks(tracks)
+        self.update_undo_ui()
+
+
+    def on_filter_focus(self, _event=None):
+        if self.tracks is not None:
+            entry = self.a_playlist_pane.filter_entry
+            entry.focus_set()
+            entry.select_range(0, 'end')
 
 
     def on_previous_track(self, _event=None):
@@ -224,7 +540,8 @@ class ActionMixin:
         treeview = self.a_playlist_pane.treeview
         iid = treeview.focus()
         if iid:
-            prev_iid = treeview.prev(iid)
+            prev_iid = (self.play_order_iid(forward=False)
+                        if self.shuffling else treeview.prev(iid))
             if not prev_iid:
                 return # Can't go before first one
             if self.playing is not None:
@@ -236,11 +553,12 @@ class ActionMixin:
     def on_play_or_pause_track(self, _event=None):
         if self.tracks is None:
             return
-        treeview = self.a_playlist_pane.treeview
+        pane = self.a_playlist_pane
+        treeview = pane.treeview
         iid = treeview.focus()
         if iid:
             if self.playing is None:
-                if iid == Player.player.filename:
+                if pane.filename(iid) == Player.player.filename:
                     Player.player.resume()
                 else:
                     if not self.play_track(treeview, iid):
@@ -253,21 +571,22 @@ class ActionMixin:
                 icon = PLAY_ICON
                 self.playing = None
                 self.winfo_toplevel().title(f'{APPNAME} v{VERSION}')
-            self.play_pause_button.config(image=self.images[icon])
+            self.play_pause_button.config(image=Images.get(icon))
 
 
     def play_track(self, treeview, iid):
         self.position_var.set(0)
-        ok, err = Player.player.play(iid)
+        ok, err = Player.player.play(self.a_playlist_pane.filename(iid))
         if ok:
             length = Player.player.length
             self.position_progressbar.configure(maximum=length)
-            track = self.tracks[treeview.index(iid)]
+            track = self.tracks[self.a_playlist_pane.index(iid)]
             length = round(length)
             if track.secs != length:
                 track.secs = length
                 self.tracks.save()
                 self.a_playlist_pane.update(iid, track)
+            self.play_counts.add(track.filename)
             self.update_volume()
             self.set_status_message(track.title, millisec=None)
             self.winfo_toplevel().title(f'{track.title} • {APPNAME}')
@@ -285,8 +604,9 @@ class ActionMixin:
 
 
     def add_to_history(self):
+        pane = self.a_playlist_pane
         new_item = Bookmark(self.playlists_pane.treeview.focus(),
-                            self.a_playlist_pane.treeview.focus())
+                            pane.filename(pane.treeview.focus()))
         config = Config.config
         history = list(config.history)
         config.history.clear()
@@ -305,7 +625,8 @@ class ActionMixin:
         treeview = self.a_playlist_pane.treeview
         iid = treeview.focus()
         if iid:
-            next_iid = treeview.next(iid)
+            next_iid = (self.play_order_iid() if self.shuffling else
+                        treeview.next(iid))
             if not next_iid:
                 return # Can't go after last one
             if self.playing is not None:
@@ -314,6 +635,48 @@ class ActionMixin:
             self.on_play_or_pause_track() # Play
 
 
+    def on_sort(self, by):
+        if self.tracks is None:
+            return
+        pane = self.a_playlist_pane
+        pane.clear_filter()
+        if self.tracks.sort(by): # one save
+            pane.reorder()
+            self.update_undo_ui()
+            self.set_status_message(f'Sorted by {by.value}')
+        iid = pane.treeview.focus()
+        if iid:
+            pane.treeview.see(iid)
+
+
+    @property
+    def shuffling(self):
+        return Config.config.play_order is not shuffle.Mode.IN_ORDER
+
+
+    def play_order_iid(self, *, forward=True):
+        '''returns the iid of the next (or previous) track in the play
+        order or None'''
+        order = self.play_order
+        if order is None or not order.is_current(self.tracks):
+            order = self.play_order = shuffle.Order(
+                self.tracks, Config.config.play_order,
+                plays=self.play_counts)
+        index = order.next() if forward else order.previous()
+        if index is None:
+            return None
+        pane = self.a_playlist_pane
+        pane.clear_filter() # the track may be filtered out
+        return pane.iid(self.tracks[index])
+
+
+    def on_play_order(self):
+        config = Config.config
+        config.play_order = shuffle.Mode[self.play_order_var.get()]
+        self.play_order = None # start afresh
+        self.set_status_message(f'Play Order: {config.play_order.value}')
+
+
     def on_history_track(self, item):
         config = Config.config
         config.current_playlist = item.playlist
@@ -322,6 +685,52 @@ class ActionMixin:
         self.playlists_pane.treeview.select(item.playlist)
 
 
+    def open_arguments(self, args):
+        '''opens the playlist args[0] (if given) and plays its track
+        args[1] (if given; a filename or a number counting from 1); used
+        for ple.pyw's arguments including those forwarded by later
+        instances'''
+        top = self.winfo_toplevel()
+        top.deiconify()
+        top.lift()
+        if not args:
+            return
+        name = os.path.abspath(args[0])
+        if not playlist.is_playlist(name):
+            self.set_status_message(f'Not a playlist: {name}', fg=ERROR_FG)
+            return
+        if self.playing is not None:
+            self.on_play_or_pause_track() # Pause/Stop
+        treeview = self.playlists_pane.treeview
+        if treeview.exists(name):
+            # on_playlists_select() loads it before any idle callback
+            treeview.select(name)
+        else: # outside the playlists path
+            self.a_playlist_pane.clear()
+            self.playlist_selected(name)
+            self.update_ui()
+        if len(args) > 1:
+            self.after_idle(lambda: self.play_argument(args[1]))
+
+
+    def play_argument(self, track):
+        if self.tracks is None:
+            return
+        if track.isdecimal():
+            index = int(track) - 1
+        else:
+            index = self.tracks.index_of(os.path.abspath(track))
+        if not 0 <= index < len(self.tracks):
+            self.set_status_message(f'No track {track} in '
+                                    f'{self.tracks.filename}', fg=ERROR_FG)
+            return
+        pane = self.a_playlist_pane
+        pane.clear_filter() # the track may be filtered out
+        pane.select_tracks([self.tracks[index]])
+        if self.playback:
+            self.on_play_or_pause_track() # Play
+
+
     def on_volume_down(self, _event=None):
         self.volume_var.set(max(self.volume_var.get() - 0.05, 0))
 
@@ -346,18 +755,35 @@ class ActionMixin:
                 self.playing_timer_id = self.after(1000, self.while_playing)
 
 
-    def maybe_update_times(self, name):
-        if not Player.player.valid:
+    def maybe_update_times(self, name, tracks=None):
+        if tracks is not None and tracks is not self.tracks:
+            return # another playlist has been selected since
+        untimed = [track for track in self.tracks if track.secs <= 0]
+        if not untimed:
             return
         top = self.winfo_toplevel()
         try:
             top.config(cursor='watch')
             top.update_idletasks()
-            self.volume_var.set(0.0)
             changed = 0
-            for track in self.tracks:
-                if track.secs <= 0:
-                    changed += self.update_time(track)
+            # Read what durations we can from the files' headers and
+            # only play those whose format has no duration reader
+            pane = self.a_playlist_pane
+            for track in untimed:
+                secs = formats.duration(track.filename)
+                if secs is not None:
+                    track.secs = secs
+                    pane.update(pane.iid(track), track)
+                    changed += 1
+            untimed = [track for track in untimed if track.secs <= 0]
+            if untimed and self.playback:
+                self.volume_var.set(0.0)
+                try:
+                    for track in untimed:
+                        changed += self.update_time(track)
+                finally:
+                    self.volume_var.set(Config.config.current_volume or
+                                        0.5)
             if changed:
                 self.tracks.save()
                 self.set_status_message(
@@ -365,7 +791,6 @@ class ActionMixin:
                     f'{self.tracks.humanized_length}', millisec=None)
         finally:
             top.config(cursor='arrow')
-            self.volume_var.set(Config.config.current_volume or 0.5)
 
 
     def update_time(self, track):
@@ -375,7 +800,8 @@ class ActionMixin:
             Player.player.stop()
             if length > 0:
                 track.secs = length
-                self.a_playlist_pane.update(track.filename, track)
+                self.a_playlist_pane.update(
+                    self.a_playlist_pane.iid(track), track)
                 return 1
         return 0
 
@@ -389,3 +815,7 @@ class ActionMixin:
         if data.title != title:
             message = f'{data.title} {message}'
         self.set_status_message(message, millisec=None)
+
+
+SCAN_PROGRESS_FOLDERS = 100 # update the status bar this often
+POLL_MS = 100 # how often to check whether background work has finished
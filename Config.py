@@ -8,9 +8,10 @@ import enum
 import pathlib
 import re
 
-import Player
 from Const import HISTORY_LEN, Bookmark
-from playlist import M3U, PLS, XSPF
+import shuffle
+import undo
+from playlist import M3U, SUFFIXES
 
 
 class _Config:
@@ -19,13 +20,16 @@ class _Config:
         self.base_font_size = None
         self.current_playlist = ''
         self.current_track = ''
-        self.current_volume = (Player.player.volume if Player.player.valid
-                               else 0.5)
+        self.current_volume = 0.5
         self.default_playlist_suffix = M3U
         self.geometry = None
         self.music_path = None
         self.playlists_path = None
         self.cursor_blink_rate = None
+        self.undo_levels = undo.DEPTH
+        self.relative_paths = False
+        self.follow_symlinks = False
+        self.play_order = shuffle.Mode.IN_ORDER
         self.history = collections.deque()
         self._filename = None
         self.load()
@@ -48,6 +52,10 @@ class _Config:
 {_Key.MUSICPATH.value} = {self.music_path}
 {_Key.PLAYLISTSPATH.value} = {self.playlists_path}
 {_Key.CURSORBLINKRATE.value} = {self.cursor_blink_rate}
+{_Key.UNDOLEVELS.value} = {self.undo_levels}
+{_Key.RELATIVEPATHS.value} = {self.relative_paths}
+{_Key.FOLLOWSYMLINKS.value} = {self.follow_symlinks}
+{_Key.PLAYORDER.value} = {self.play_order.name}
 ''')
             for i, item in enumerate(self.history, 1):
                 file.write(f'History{i} = {item.playlist} | {item.track}\n')
@@ -123,7 +131,7 @@ class _Config:
                         value = value.upper()
                         if not value.startswith('.'):
                             value = '.' + value
-                        if value in {M3U, PLS, XSPF}:
+                        if value in SUFFIXES:
                             self.default_playlist_suffix = value
                         else:
                             err = 'unrecognized playlist suffix'
@@ -148,6 +156,33 @@ class _Config:
                             self.cursor_blink_rate = int(value)
                         else:
                             err = 'invalid integer for'
+                    elif key is _Key.UNDOLEVELS:
+                        if value.isdecimal() and int(value) > 0:
+                            self.undo_levels = int(value)
+                        else:
+                            err = 'invalid positive integer for'
+                    elif key is _Key.RELATIVEPATHS:
+                        value = value.lower()
+                        if value in {'true', 'yes', 'on', '1'}:
+                            self.relative_paths = True
+                        elif value in {'false', 'no', 'off', '0'}:
+                            self.relative_paths = False
+                        else:
+                            err = 'invalid bool for'
+                    elif key is _Key.FOLLOWSYMLINKS:
+                        value = value.lower()
+                        if value in {'true', 'yes', 'on', '1'}:
+                            self.follow_symlinks = True
+                        elif value in {'false', 'no', 'off', '0'}:
+                            self.follow_symlinks = False
+                        else:
+                            err = 'invalid bool for'
+                    elif key is _Key.PLAYORDER:
+                        mode = shuffle.Mode.from_name(value.upper())
+                        if mode is not None:
+                            self.play_order = mode
+                        else:
+                            err = 'unrecognized'
                     elif key.name.startswith('HISTORY'):
                         playlist, track = value.split('|')
                         history.append((key.name[-1],
@@ -178,10 +213,21 @@ _Key = enum.unique(enum.Enum('_Key', [
     ('GEOMETRY', 'Geometry'),
     ('MUSICPATH', 'Music Path'),
     ('PLAYLISTSPATH', 'Playlists Path'),
-    ('CURSORBLINKRATE', 'Cursor Blink Rate')] +
+    ('CURSORBLINKRATE', 'Cursor Blink Rate'),
+    ('UNDOLEVELS', 'Undo Levels'),
+    ('RELATIVEPATHS', 'Relative Paths'),
+    ('FOLLOWSYMLINKS', 'Follow Symlinks'),
+    ('PLAYORDER', 'Play Order')] +
     [(f'HISTORY{n}', f'History{n}') for n in range(1, HISTORY_LEN + 1)],
     type=_KeyBase))
 
 
-config = _Config()
-atexit.register(config.save)
+def __getattr__(name):
+    # Creates (and loads) the config when Config.config is first used
+    # rather than when this module is imported
+    global config
+    if name == 'config':
+        config = _Config()
+        atexit.register(config.save)
+        return config
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -3,7 +3,6 @@
 # License: GPLv3
 
 import collections
-import tkinter as tk
 
 APPNAME = 'PLE'
 VERSION = '1.4.1'
@@ -17,8 +16,8 @@ ERROR_FG = 'red'
 
 PAD = '1m'
 PAD3 = '3m'
-NSWE = tk.N + tk.S + tk.W + tk.E
-WE = tk.W + tk.E
+NSWE = 'nswe' # i.e., tk.N + tk.S + tk.W + tk.E without importing tk
+WE = 'we'
 
 HISTORY_LEN = 9
 
@@ -106,7 +106,7 @@ class Form(tk.Toplevel):
         add('Alt+D', 'row', 'key')
         add(' or ', 'row', 'italic')
         add('Ctrl+D', 'row', 'key')
-        add('\tMove the current track down\n', 'row', 'col1')
+        add('\tMove the selected tracks down\n', 'row', 'col1')
         add('Alt+E', 'row', 'key')
         add(' or ', 'row', 'italic')
         add('Ctrl+E', 'row', 'key')
@@ -121,10 +121,10 @@ class Form(tk.Toplevel):
         add(' or ', 'row', 'italic')
         add('Ctrl+I', 'row', 'key')
         add('\tPop up the history menu\n', 'row', 'col1')
-        add('Alt+M', 'row', 'key')
+        add('Alt+L', 'row', 'key')
         add(' or ', 'row', 'italic')
-        add('Ctrl+M', 'row', 'key')
-        add('\tUnremove the last removed track\n', 'row', 'col1')
+        add('Ctrl+F', 'row', 'key')
+        add('\tFilter the current playlist as you type\n', 'row', 'col1')
         add('Alt+N', 'row', 'key')
         add(' or ', 'row', 'italic')
         add('Ctrl+N', 'row', 'key')
@@ -145,14 +145,35 @@ class Form(tk.Toplevel):
         add('Alt+R', 'row', 'key')
         add(' or ', 'row', 'italic')
         add('Ctrl+R', 'row', 'key')
-        add('\tRemove the current track\n', 'row', 'col1')
+        add('\tRemove the selected tracks\n', 'row', 'col1')
+        add('Alt+T', 'row', 'key')
+        add('\tPop up the tools menu\n', 'row', 'col1')
         if Player.player.valid:
             add('Ctrl+T', 'row', 'key')
             add('\tPlay the next track\n', 'row', 'col1')
         add('Alt+U', 'row', 'key')
         add(' or ', 'row', 'italic')
         add('Ctrl+U', 'row', 'key')
-        add('\tMove the current track up\n', 'row', 'col1')
+        add('\tMove the selected tracks up\n', 'row', 'col1')
+        add('Ctrl+X', 'row', 'key')
+        add(' or ', 'row', 'italic')
+        add('Ctrl+C', 'row', 'key')
+        add('\tCut or copy the selected tracks\n', 'row', 'col1')
+        add('Ctrl+V', 'row', 'key')
+        add('\tPaste tracks after the current track\n', 'row', 'col1')
+        add('Ctrl+Y', 'row', 'key')
+        add(' or ', 'row', 'italic')
+        add('Ctrl+Shift+Z', 'row', 'key')
+        add('\tRedo the last undone change\n', 'row', 'col1')
+        add('Ctrl+Z', 'row', 'key')
+        add('\tUndo the last change to the current playlist\n', 'row',
+            'col1')
+        add('Shift+Click', 'row', 'key')
+        add(' or ', 'row', 'italic')
+        add('Ctrl+Click', 'row', 'key')
+        add('\tExtend the selection\n', 'row', 'col1')
+        add('Right-Click', 'row', 'key')
+        add('\tPop up the track menu\n', 'row', 'col1')
 
 
     def quit(self, _event=None):
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# Copyright © 2021 Mark Summerfield. All rights reserved.
+# License: GPLv3
+
+'''
+A process-wide registry of icons: each is decoded once, when first used,
+and the same tk.PhotoImage is shared by every window, pane and dialog
+(so reopening a dialog reads nothing from disk).
+
+If the optional bundle (images/images.bin, built by running this module)
+exists, every icon's data is read from it with one read when the first
+icon is needed; any icon that isn't in it is read from its own file.
+Rebuild the bundle after changing any icon.
+
+Usage:
+    button = ttk.Button(master, image=Images.get('dialog-ok.png'))
+
+    Images.py # (re)builds the bundle from the images folder
+'''
+
+import base64
+import marshal
+import pathlib
+import tkinter as tk
+
+
+def get(name):
+    '''returns the shared tk.PhotoImage for the named icon, e.g.,
+    'dialog-ok.png' (Tk must already have been initialized)'''
+    image = _images.get(name)
+    if image is None:
+        data = _data(name)
+        if data is None:
+            image = tk.PhotoImage(file=PATH / name)
+        else: # PNG data must be base64-encoded text for Tk
+            image = tk.PhotoImage(
+                data=base64.b64encode(data).decode('ascii'))
+        _images[name] = image
+    return image
+
+
+def _data(name):
+    # Returns the icon's data from the bundle or None
+    global _bundle
+    if _bundle is None:
+        try:
+            with open(BUNDLE, 'rb') as file:
+                data = marshal.loads(file.read())
+            _bundle = (data['images'] if data.get('version') == _VERSION
+                       else {})
+        except (OSError, EOFError, ValueError, TypeError, KeyError):
+            _bundle = {}
+    return _bundle.get(name)
+
+
+def bundle():
+    '''writes the bundle of every .png in the images folder; returns the
+    number of images bundled'''
+    images = {path.name: path.read_bytes()
+              for path in sorted(PATH.glob('*.png'))}
+    data = dict(version=_VERSION, images=images)
+    BUNDLE.write_bytes(marshal.dumps(data))
+    return len(images)
+
+
+PATH = pathlib.Path(__file__).resolve().parent / 'images'
+BUNDLE = PATH / 'images.bin'
+_VERSION = 1
+_images = {} # name: tk.PhotoImage
+_bundle = None # name: PNG data; loaded when first needed
+
+
+if __name__ == '__main__':
+    print(f'bundled {bundle()} images in {BUNDLE}')
@@ -2,13 +2,13 @@
 # Copyright © 2021 Mark Summerfield. All rights reserved.
 # License: GPLv3
 
-import pathlib
 import tkinter as tk
 import tkinter.filedialog
 import tkinter.simpledialog as tkdialog
 import tkinter.ttk as ttk
 
 import Config
+import Images
 import playlist
 from Const import APPNAME, PAD, PAD3, WE
 
@@ -16,7 +16,7 @@ from Const import APPNAME, PAD, PAD3, WE
 class Form(tkdialog.Dialog):
 
     def __init__(self, master):
-        self.suffixes = [playlist.M3U, playlist.PLS, playlist.XSPF]
+        self.suffixes = list(playlist.SUFFIXES) # e.g., .M3U and .M3U.GZ
         super().__init__(master, f'Options — {APPNAME}')
 
 
@@ -28,8 +28,7 @@ class Form(tkdialog.Dialog):
 
 
     def make_body_widgets(self, master):
-        path = pathlib.Path(__file__).parent
-        self.folder_icon = tk.PhotoImage(file=path / 'images/folder.png')
+        self.folder_icon = Images.get('folder.png')
         config = Config.config
         self.filename_name_label = ttk.Label(master, text='Filename')
         self.filename_label = ttk.Label(master, text=config.filename,
@@ -65,6 +64,19 @@ class Form(tkdialog.Dialog):
         self.cursor_blink_rate_spinbox = ttk.Spinbox(master, from_=0,
                                                      to=1000)
         self.cursor_blink_rate_spinbox.set(config.cursor_blink_rate)
+        self.undo_levels_label = ttk.Label(master, text='Undo Levels',
+                                           underline=0)
+        self.undo_levels_spinbox = ttk.Spinbox(master, from_=1, to=1000)
+        self.undo_levels_spinbox.set(config.undo_levels)
+        self.relative_paths_var = tk.BooleanVar(value=config.relative_paths)
+        self.relative_paths_checkbutton = ttk.Checkbutton(
+            master, text='Relative Paths in New Playlists',
+            underline=0, variable=self.relative_paths_var)
+        self.follow_symlinks_var = tk.BooleanVar(
+            value=config.follow_symlinks)
+        self.follow_symlinks_checkbutton = ttk.Checkbutton(
+            master, text='Follow Symlinks when Scanning Folders',
+            underline=2, variable=self.follow_symlinks_var)
         self.label = ttk.Label(
             master, text=f'Changes will be applied the next time {APPNAME} '
             'is started.', foreground='darkgreen')
@@ -88,16 +100,28 @@ class Form(tkdialog.Dialog):
                                           **common)
         self.cursor_blink_rate_spinbox.grid(row=5, column=1, sticky=WE,
                                             **common)
-        self.label.grid(row=6, column=0, columnspan=2, sticky=WE, **common)
+        self.undo_levels_label.grid(row=6, column=0, sticky=tk.W, **common)
+        self.undo_levels_spinbox.grid(row=6, column=1, sticky=WE, **common)
+        self.relative_paths_checkbutton.grid(row=7, column=0, columnspan=2,
+                                             sticky=tk.W, **common)
+        self.follow_symlinks_checkbutton.grid(row=8, column=0, columnspan=2,
+                                              sticky=tk.W, **common)
+        self.label.grid(row=9, column=0, columnspan=2, sticky=WE, **common)
 
 
     def make_body_bindings(self, master):
         self.bind('<Alt-b>',
                   lambda *_: self.cursor_blink_rate_spinbox.focus_set())
         self.bind('<Alt-f>', lambda *_: self.fontsize_spinbox.focus_set())
+        self.bind('<Alt-l>',
+                  lambda *_: self.follow_symlinks_checkbutton.invoke())
         self.bind('<Alt-m>', lambda *_: self.music_path_button.invoke())
         self.bind('<Alt-p>', lambda *_: self.playlists_path_button.invoke())
+        self.bind('<Alt-r>',
+                  lambda *_: self.relative_paths_checkbutton.invoke())
         self.bind('<Alt-s>', lambda *_: self.suffix_combobox.focus_set())
+        self.bind('<Alt-u>',
+                  lambda *_: self.undo_levels_spinbox.focus_set())
 
 
     def buttonbox(self):
@@ -107,10 +131,8 @@ class Form(tkdialog.Dialog):
 
 
     def make_buttons(self):
-        path = pathlib.Path(__file__).parent
-        self.ok_icon = tk.PhotoImage(file=path / 'images/dialog-ok.png')
-        self.close_icon = tk.PhotoImage(
-            file=path / 'images/dialog-close.png')
+        self.ok_icon = Images.get('dialog-ok.png')
+        self.close_icon = Images.get('dialog-close.png')
         self.box = ttk.Frame(self)
         self.ok_button = ttk.Button(
             self.box, text='OK', underline=0, command=self.ok,
@@ -150,6 +172,12 @@ class Form(tkdialog.Dialog):
                 self.cursor_blink_rate_spinbox.get())
         except ValueError:
             pass # just leave it as-is
+        try:
+            config.undo_levels = max(1, int(self.undo_levels_spinbox.get()))
+        except ValueError:
+            pass # just leave it as-is
+        config.relative_paths = self.relative_paths_var.get()
+        config.follow_symlinks = self.follow_symlinks_var.get()
         return True
 
 
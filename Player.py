@@ -8,14 +8,7 @@ import collections
 import pathlib
 import threading
 
-try: # 1..4 order must be preserved
-    import gi  # 1
-    gi.require_version('Gst', '1.0') # 2
-    from gi.repository import Gst, GObject  # 3
-    Gst.init() # 4
-    _GST = True
-except (ImportError, ValueError):
-    _GST = False
+Gst = GObject = None # imported by _gst() when playback is first needed
 
 
 TrackData = collections.namedtuple(
@@ -23,127 +16,152 @@ TrackData = collections.namedtuple(
     defaults=['', '?', 'Album?', 'Artist?'])
 
 
-if not _GST:
-    class _Player:
+class _NoPlayer:
+
+    @property
+    def valid(self):
+        return False
 
-        @property
-        def valid(self):
-            return False
 
+    def close(self):
+        pass
 
-        def close(self):
-            pass
-else:
-    class _Player:
 
-        _gloop_thread = None
+class _Player:
 
-        def __init__(self):
-            self._volume = 0.5
-            self._uri = None
-            self._track_data = None
-            self._playbin = Gst.ElementFactory.make('playbin', None)
-            self._bus = self._playbin.get_bus()
-            self._bus.add_signal_watch()
-            self._bus.connect('message', self.on_bus_call)
-            if _Player._gloop_thread is None:
-                _Player._gloop_thread = threading.Thread(
-                    target=GObject.MainLoop().run)
-                _Player._gloop_thread.daemon = True
-                _Player._gloop_thread.start()
+    _gloop_thread = None
 
+    def __init__(self):
+        self._volume = 0.5
+        self._uri = None
+        self._track_data = None
+        self.on_finished = None # called in the GLib thread at EOS
+        self._playbin = Gst.ElementFactory.make('playbin', None)
+        self._bus = self._playbin.get_bus()
+        self._bus.add_signal_watch()
+        self._bus.connect('message', self.on_bus_call)
+        if _Player._gloop_thread is None:
+            _Player._gloop_thread = threading.Thread(
+                target=GObject.MainLoop().run)
+            _Player._gloop_thread.daemon = True
+            _Player._gloop_thread.start()
 
-        @property
-        def valid(self):
-            return True
 
+    @property
+    def valid(self):
+        return True
 
-        @property
-        def filename(self): # strip leading file://
-            return self._uri[7:] if self._uri is not None else None
 
+    @property
+    def filename(self): # strip leading file://
+        return self._uri[7:] if self._uri is not None else None
 
-        @property
-        def track_data(self):
-            return self._track_data
 
+    @property
+    def track_data(self):
+        return self._track_data
 
-        @property
-        def volume(self):
-            return self._volume
 
+    @property
+    def volume(self):
+        return self._volume
 
-        @volume.setter
-        def volume(self, value):
-            self._volume = max(0.0, min(1.0, value))
-            self._playbin.set_property('volume', self._volume)
 
+    @volume.setter
+    def volume(self, value):
+        self._volume = max(0.0, min(1.0, value))
+        self._playbin.set_property('volume', self._volume)
 
-        @property
-        def pos(self):
-            ok, time_pos = self._playbin.query_position(Gst.Format.TIME)
-            return (time_pos / Gst.SECOND) if ok else 0
 
+    @property
+    def pos(self):
+        ok, time_pos = self._playbin.query_position(Gst.Format.TIME)
+        return (time_pos / Gst.SECOND) if ok else 0
 
-        @pos.setter
-        def pos(self, value):
-            if value >= 0:
-                self._playbin.seek_simple(
-                    Gst.Format.TIME, Gst.SeekFlags.FLUSH,
-                    value * Gst.SECOND)
 
+    @pos.setter
+    def pos(self, value):
+        if value >= 0:
+            self._playbin.seek_simple(
+                Gst.Format.TIME, Gst.SeekFlags.FLUSH,
+                value * Gst.SECOND)
 
-        @property
-        def length(self):
-            ok, duration = self._playbin.query_duration(Gst.Format.TIME)
-            return (duration / Gst.SECOND) if ok else 0
 
+    @property
+    def length(self):
+        ok, duration = self._playbin.query_duration(Gst.Format.TIME)
+        return (duration / Gst.SECOND) if ok else 0
 
-        def play(self, filename):
-            self._track_data = None
-            self._uri = (filename if filename.startswith('file://') else
-                         f'file://{filename}')
-            self._playbin.set_state(Gst.State.READY)
-            self._playbin.set_property('uri', self._uri)
-            self._playbin.set_state(Gst.State.PLAYING)
-            status = self._playbin.get_state(Gst.CLOCK_TIME_NONE)
-            if status[0] == Gst.StateChangeReturn.FAILURE:
-                word = 'play' if pathlib.Path(filename).exists() else 'find'
-                return False, f'Failed to {word} {filename}'
-            return True, None
 
+    def play(self, filename):
+        self._track_data = None
+        self._uri = (filename if filename.startswith('file://') else
+                     f'file://{filename}')
+        self._playbin.set_state(Gst.State.READY)
+        self._playbin.set_property('uri', self._uri)
+        self._playbin.set_state(Gst.State.PLAYING)
+        status = self._playbin.get_state(Gst.CLOCK_TIME_NONE)
+        if status[0] == Gst.StateChangeReturn.FAILURE:
+            word = 'play' if pathlib.Path(filename).exists() else 'find'
+            return False, f'Failed to {word} {filename}'
+        return True, None
 
-        def pause(self):
-            self._playbin.set_state(Gst.State.PAUSED)
 
+    def pause(self):
+        self._playbin.set_state(Gst.State.PAUSED)
 
-        def resume(self):
-            self._playbin.set_state(Gst.State.PLAYING)
 
+    def resume(self):
+        self._playbin.set_state(Gst.State.PLAYING)
 
-        def stop(self):
-            self._playbin.set_state(Gst.State.NULL)
 
+    def stop(self):
+        self._playbin.set_state(Gst.State.NULL)
 
-        def on_bus_call(self, _bus, message):
-            if message.type == Gst.MessageType.TAG:
-                tags = message.parse_tag()
-                d = {}
-                for i in range(tags.n_tags()):
-                    tag = tags.nth_tag_name(i)
-                    value = tags.get_value_index(tag, 0)
-                    if tag == 'track-number':
-                        tag = 'number'
-                    if tag in TrackData._fields:
-                        d[tag] = value
-                if d.get('title', ''):
-                    self._track_data = TrackData(**d)
 
+    def on_bus_call(self, _bus, message):
+        if message.type == Gst.MessageType.TAG:
+            tags = message.parse_tag()
+            d = {}
+            for i in range(tags.n_tags()):
+                tag = tags.nth_tag_name(i)
+                value = tags.get_value_index(tag, 0)
+                if tag == 'track-number':
+                    tag = 'number'
+                if tag in TrackData._fields:
+                    d[tag] = value
+            if d.get('title', ''):
+                self._track_data = TrackData(**d)
+        elif message.type == Gst.MessageType.EOS:
+            if self.on_finished is not None:
+                self.on_finished()
 
-        def close(self):
-            self._uri = None
-            self._playbin.set_state(Gst.State.NULL)
 
+    def close(self):
+        self._uri = None
+        self._playbin.set_state(Gst.State.NULL)
 
-player = _Player()
-atexit.register(player.close)
+
+def _gst():
+    # Returns True if GStreamer could be imported and initialized
+    global Gst, GObject
+    if Gst is None:
+        try: # 1..4 order must be preserved
+            import gi  # 1
+            gi.require_version('Gst', '1.0') # 2
+            from gi.repository import Gst, GObject  # 3
+            Gst.init() # 4
+        except (ImportError, ValueError):
+            return False
+    return True
+
+
+def __getattr__(name):
+    # Creates the player (and so loads GStreamer) when Player.player is
+    # first used rather than when this module is imported
+    global player
+    if name == 'player':
+        player = _Player() if _gst() else _NoPlayer()
+        atexit.register(player.close)
+        return player
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -2,37 +2,74 @@
 # Copyright © 2021 Mark Summerfield. All rights reserved.
 # License: GPLv3
 
-import pathlib
+import bisect
 import tkinter as tk
 import tkinter.ttk as ttk
 
+import Images
+import playlist
 import Treeview
-from Const import NSWE, PAD
+from Const import NSWE, PAD, WE
 
 
 class PlaylistPane(ttk.Frame):
 
     def __init__(self, master):
         super().__init__(master, padding=PAD)
-        self.treeview = Treeview.Treeview(self, selectmode=tk.BROWSE)
+        self.treeview = Treeview.Treeview(self, selectmode=tk.EXTENDED)
         self.treeview.heading('#0', text='Playlist', anchor=tk.CENTER)
         self.treeview.grid(row=0, column=0, sticky=NSWE)
+        self._tracks = None # playlist.Playlist
+        # Rows are looked up by their tracks' locations (which share the
+        # tracks' strings) rather than by iid, so no filename is kept
+        self._tracks_at = {} # track location: list of track (or None)
+        self._counts = {} # id(track): index in its _tracks_at list
+        self._keys = {} # id(track): casefolded title and filename
+        self._iids = () # the iids in playlist order when filtering began
+        self._row_keys = [] # the _keys of the tracks of _iids
+        self._positions = {} # iid: index in _iids
+        self._visible = [] # the indexes of the iids matching _query
+        self._query = ''
+        self.filter_var = tk.StringVar()
+        self.filter_var.trace_add('write', self.on_filter)
+        self.filter_frame = ttk.Frame(self)
+        self.filter_label = ttk.Label(self.filter_frame, text='Filter:',
+                                      underline=2)
+        self.filter_entry = ttk.Entry(self.filter_frame,
+                                      textvariable=self.filter_var)
+        # Omit the toplevel so that the main window's shortcuts (e.g.,
+        # Space, +, -) don't fire while typing
+        self.filter_entry.bindtags((str(self.filter_entry), 'TEntry',
+                                    'all'))
+        self.filter_entry.bind('<Escape>', self.on_filter_escape)
+        self.filter_entry.bind('<Return>', self.on_filter_done)
+        self.filter_entry.bind('<Down>', self.on_filter_done)
+        self.filter_label.grid(row=0, column=0, padx=PAD)
+        self.filter_entry.grid(row=0, column=1, sticky=WE)
+        self.filter_frame.grid_columnconfigure(1, weight=1)
+        self.filter_frame.grid(row=2, column=0, columnspan=2, sticky=WE,
+                               pady=PAD)
         self.grid_columnconfigure(0, weight=1)
         self.grid_rowconfigure(0, weight=1)
-        self.image = tk.PhotoImage(
-            file=pathlib.Path(__file__).parent / f'images/{TRACK_ICON}')
+        self.image = Images.get(TRACK_ICON)
 
 
     def clear(self):
+        self.clear_filter()
         self.treeview.clear()
+        self._tracks = None
+        self._tracks_at.clear()
+        self._counts.clear()
+        self._keys.clear()
 
 
     def set_tracks(self, tracks):
         self.clear()
+        self._tracks = tracks
         if tracks:
             for track in tracks:
                 self.append(track)
-            self.treeview.select(tracks[0].filename)
+            self.treeview.select(self.iid(tracks[0]))
 
 
     def append(self, track):
@@ -40,12 +77,219 @@ class PlaylistPane(ttk.Frame):
 
 
     def insert(self, parent, index, track):
-        self.treeview.insert(parent, index, iid=track.filename,
+        # A track's iid is its filename unless the filename is already in
+        # use (i.e., the track is a duplicate) in which case it is made
+        # unique by appending a newline and a number
+        tracks = self._tracks_at.setdefault(track.location, [])
+        count = next((i for i, other in enumerate(tracks) if other is None),
+                     len(tracks))
+        if count == len(tracks):
+            tracks.append(track)
+        else:
+            tracks[count] = track
+        self._counts[id(track)] = count
+        self._keys[id(track)] = _key(track)
+        iid = _iid(track, count)
+        self.treeview.insert(parent, index, iid=iid,
                              text=self._title(track), image=self.image)
+        return iid
+
+
+    def insert_many(self, tracks):
+        '''adds rows for the given tracks (which must already be in the
+        playlist) at the end and then puts every row in playlist order
+        with a single Tk call'''
+        for track in tracks:
+            self.insert('', tk.END, track)
+        self.reorder()
+
+
+    def delete(self, iid):
+        self.delete_many((iid,))
+
+
+    def delete_many(self, iids):
+        self.treeview.delete(*iids)
+        for iid in iids:
+            self._forget(self.track(iid))
+
+
+    def _forget(self, track):
+        count = self._counts.pop(id(track))
+        del self._keys[id(track)]
+        location = track.location
+        tracks = self._tracks_at[location]
+        tracks[count] = None
+        while tracks and tracks[-1] is None:
+            tracks.pop()
+        if not tracks:
+            del self._tracks_at[location]
+
+
+    def reorder(self):
+        '''puts every row in the same order as the playlist's tracks with a
+        single Tk call'''
+        counts = self._counts
+        self.treeview.set_children('', *(_iid(track, counts[id(track)])
+                                         for track in self._tracks))
+
+
+    def sync(self):
+        '''brings the rows into line with the playlist's tracks (e.g., after
+        an undo or redo) touching only the rows that changed; returns the
+        tracks whose rows were added or changed'''
+        tracks = self._tracks
+        gone = [_iid(track, count)
+                for locations in self._tracks_at.values()
+                for count, track in enumerate(locations)
+                if track is not None and tracks.index_of_track(track) == -1]
+        if gone:
+            self.delete_many(gone)
+        changed = []
+        for track in tracks:
+            iid = self.iid(track)
+            if iid is None:
+                self.insert('', tk.END, track)
+                changed.append(track)
+            elif self._keys[id(track)] != _key(track):
+                self.update(iid, track)
+                changed.append(track)
+        self.reorder()
+        return changed
+
+
+    def selected_indexes(self):
+        '''returns a sorted list of the selected tracks' playlist indexes'''
+        return sorted(self.index(iid) for iid in self.treeview.selection())
+
+
+    def select_tracks(self, tracks):
+        iids = [self.iid(track) for track in tracks]
+        if iids:
+            self.treeview.selection_set(iids)
+            self.treeview.focus(iids[0])
+            self.treeview.see(iids[0])
 
 
     def update(self, iid, track):
         self.treeview.item(iid, text=self._title(track))
+        key = self._keys[id(track)] = _key(track)
+        i = self._positions.get(iid)
+        if i is not None: # keep the filter's snapshot current
+            self._row_keys[i] = key
+            if (self._query in key) != self._is_visible(iid):
+                self._show_matches()
+
+
+    def iid(self, track):
+        '''returns the given track's iid or None'''
+        count = self._counts.get(id(track))
+        return None if count is None else _iid(track, count)
+
+
+    def track(self, iid):
+        '''returns the track with the given iid or None'''
+        filename, _, count = iid.partition('\n')
+        tracks = self._tracks_at.get(playlist.location(filename))
+        count = int(count or 0)
+        if tracks is None or count >= len(tracks):
+            return None
+        return tracks[count]
+
+
+    def filename(self, iid):
+        '''returns the filename of the track with the given iid or None'''
+        track = self.track(iid)
+        return None if track is None else track.filename
+
+
+    def index(self, iid):
+        '''returns the index of iid's track in the playlist (even if the
+        playlist is filtered) or -1'''
+        track = self.track(iid)
+        if track is None or self._tracks is None:
+            return -1
+        return self._tracks.index_of_track(track)
+
+
+    @property
+    def filtered(self):
+        return bool(self._query)
+
+
+    def clear_filter(self):
+        '''shows every row; must be called before rows are added, removed
+        or moved'''
+        if self._query or self.filter_var.get():
+            self.filter_var.set('') # calls on_filter()
+
+
+    def on_filter(self, *_):
+        query = self.filter_var.get().casefold()
+        if query == self._query:
+            return
+        treeview = self.treeview
+        if not query:
+            treeview.set_children('', *self._iids)
+            self._iids = ()
+            self._row_keys = []
+            self._positions = {}
+            self._visible = []
+        else:
+            if not self._query: # snapshot the unfiltered order
+                self._iids = treeview.get_children()
+                self._row_keys = [self._keys[id(self.track(iid))]
+                                  for iid in self._iids]
+                self._positions = {iid: i for i, iid in
+                                   enumerate(self._iids)}
+                self._visible = range(len(self._iids))
+            narrowing = self._query and query.startswith(self._query)
+            self._query = query
+            if narrowing: # only the currently visible rows can match
+                keys = self._row_keys
+                visible = [i for i in self._visible if query in keys[i]]
+                hidden = set(self._visible).difference(visible)
+                if hidden:
+                    treeview.detach(*(self._iids[i] for i in sorted(hidden)))
+                self._visible = visible
+            else:
+                self._show_matches()
+        self._query = query
+        focus = treeview.focus()
+        if focus and self._is_visible(focus):
+            treeview.see(focus)
+        else:
+            children = treeview.get_children()
+            if children:
+                treeview.select(children[0])
+
+
+    def _show_matches(self):
+        # Shows only the rows that match the query with a single Tk call
+        query = self._query
+        self._visible = [i for i, key in enumerate(self._row_keys)
+                         if query in key]
+        self.treeview.set_children('', *(self._iids[i]
+                                         for i in self._visible))
+
+
+    def _is_visible(self, iid):
+        if not self._query:
+            return True
+        i = self._positions.get(iid, -1)
+        j = bisect.bisect_left(self._visible, i)
+        return j < len(self._visible) and self._visible[j] == i
+
+
+    def on_filter_escape(self, _event=None):
+        self.clear_filter()
+        self.treeview.focus_set()
+        return 'break'
+
+
+    def on_filter_done(self, _event=None):
+        self.treeview.focus_set()
+        return 'break'
 
 
     def _title(self, track):
@@ -53,4 +297,14 @@ class PlaylistPane(ttk.Frame):
         return f'{track.title} • {secs}' if secs else track.title
 
 
+def _iid(track, count):
+    # A track's iid is its filename or, for the count-th duplicate of the
+    # filename, its filename plus a newline and count
+    return track.filename if not count else f'{track.filename}\n{count}'
+
+
+def _key(track):
+    return f'{track.title}\0{track.filename}'.casefold()
+
+
 TRACK_ICON = 'gmusicbrowser.png'
@@ -3,27 +3,28 @@
 # License: GPLv3
 
 import os
-import pathlib
 import tkinter as tk
 import tkinter.ttk as ttk
 
+import Images
 import playlist
 import Treeview
+import walk
 from Const import NSWE, PAD
 
 
 class PlaylistsPane(ttk.Frame):
 
-    def __init__(self, master, *, path):
+    def __init__(self, master, *, path=None, follow_symlinks=True):
         super().__init__(master, padding=PAD)
-        self.images = {}
-        self._make_images()
+        self.follow_symlinks = follow_symlinks
         self.treeview = Treeview.Treeview(self, selectmode=tk.BROWSE)
         self.treeview.heading('#0', text='Playlists', anchor=tk.CENTER)
         self.treeview.grid(row=0, column=0, sticky=NSWE)
         self.grid_columnconfigure(0, weight=1)
         self.grid_rowconfigure(0, weight=1)
-        self.set_path(path)
+        if path is not None:
+            self.set_path(path)
 
 
     def focus_first_child(self):
@@ -37,42 +38,29 @@ class PlaylistsPane(ttk.Frame):
             self.treeview.select(iid)
 
 
-    def _make_images(self):
-        path = pathlib.Path(__file__).parent / 'images'
-        for name in (FOLDER_ICON, PLAYLIST_ICON, FOLDER_HOME_ICON):
-            self.images[name] = tk.PhotoImage(file=path / name)
-
-
     def set_path(self, path):
         self.treeview.clear()
         self.treeview.insert('', tk.END, path, text=path, open=True,
-                             image=self.images[FOLDER_HOME_ICON])
+                             image=Images.get(FOLDER_HOME_ICON))
         self._populate_tree(path)
 
 
-    def _populate_tree(self, root):
-        if not os.path.isdir(root):
+    def _populate_tree(self, top):
+        if not os.path.isdir(top):
             return
-        folders = []
-        files = []
-        with os.scandir(root) as entries:
-            for entry in entries:
-                if not entry.name.startswith('.'):
-                    if entry.is_dir():
-                        folders.append((entry.path, entry.name))
-                    elif playlist.is_playlist(entry.name):
-                        files.append((entry.path, entry.name))
-
-        def by_entry(entry):
-            return entry[0].upper()
-
-        for path, name in sorted(folders, key=by_entry):
-            self.treeview.insert(root, tk.END, path, text=name,
-                                 image=self.images[FOLDER_ICON])
-            self._populate_tree(path)
-        for path, name in sorted(files, key=by_entry):
-            self.treeview.insert(root, tk.END, path, text=name,
-                                 image=self.images[PLAYLIST_ICON])
+        # Every folder's node is inserted before the folder is walked;
+        # symlinked folders are shown (as os.walk() listed them) and walk()
+        # skips any folder it has already walked so links can't loop
+        for root, folders, files in walk.walk(
+                top, follow_symlinks=self.follow_symlinks):
+            for name in sorted(folders, key=str.upper):
+                self.treeview.insert(root, tk.END, os.path.join(root, name),
+                                     text=name, image=Images.get(FOLDER_ICON))
+            for name in sorted(files, key=str.upper):
+                if not name.startswith('.') and playlist.is_playlist(name):
+                    self.treeview.insert(
+                        root, tk.END, os.path.join(root, name), text=name,
+                        image=Images.get(PLAYLIST_ICON))
 
 
 FOLDER_HOME_ICON = 'folder_home.png'
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# Copyright © 2021 Mark Summerfield. All rights reserved.
+# License: GPLv3
+
+import os
+import tkinter as tk
+import tkinter.simpledialog as tkdialog
+import tkinter.ttk as ttk
+
+import Images
+import Treeview
+from Const import APPNAME, INFO_FG, NSWE, PAD, PAD3, WE
+
+
+class Form(tkdialog.Dialog):
+
+    def __init__(self, master, index):
+        self.index = index # search.SearchIndex
+        self.hits = []
+        self.chosen = None # the search.Hit to go to
+        self.query_var = tk.StringVar()
+        self.query_var.trace_add('write', self.on_search)
+        super().__init__(master, f'Search — {APPNAME}')
+
+
+    def body(self, master):
+        self.make_body_widgets(master)
+        self.make_body_layout(master)
+        self.make_body_bindings(master)
+        return self.query_entry
+
+
+    def make_body_widgets(self, master):
+        self.query_label = ttk.Label(master, text='Search:', underline=0)
+        self.query_entry = tk.Entry(master, textvariable=self.query_var,
+                                    width=60)
+        self.tree_frame = ttk.Frame(master)
+        self.treeview = Treeview.Treeview(
+            self.tree_frame, selectmode=tk.BROWSE, columns=('playlist',),
+            height=15)
+        self.treeview.heading('#0', text='Track', anchor=tk.CENTER)
+        self.treeview.heading('playlist', text='Playlist', anchor=tk.CENTER)
+        self.status_label = ttk.Label(master, foreground=INFO_FG)
+
+
+    def make_body_layout(self, master):
+        common = dict(padx=PAD, pady=PAD)
+        self.query_label.grid(row=0, column=0, sticky=tk.W, **common)
+        self.query_entry.grid(row=0, column=1, sticky=WE, **common)
+        self.treeview.grid(row=0, column=0, sticky=NSWE)
+        self.tree_frame.grid_columnconfigure(0, weight=1)
+        self.tree_frame.grid_rowconfigure(0, weight=1)
+        self.tree_frame.grid(row=1, column=0, columnspan=2, sticky=NSWE,
+                             **common)
+        self.status_label.grid(row=2, column=0, columnspan=2, sticky=WE,
+                               **common)
+        master.grid_columnconfigure(1, weight=1)
+        master.grid_rowconfigure(1, weight=1)
+
+
+    def make_body_bindings(self, master):
+        self.bind('<Alt-s>', lambda *_: self.query_entry.focus_set())
+        self.bind('<Down>', lambda *_: self.treeview.focus_set())
+        self.treeview.bind('<Double-Button-1>', self.ok)
+
+
+    def on_search(self, *_):
+        self.treeview.clear()
+        self.hits = self.index.search(self.query_var.get(), limit=LIMIT)
+        folder = self.index.tracks_catalog.folder
+        for i, hit in enumerate(self.hits):
+            self.treeview.insert(
+                '', tk.END, iid=str(i), text=hit.title,
+                values=(os.path.relpath(hit.playlist, folder),))
+        if self.hits:
+            self.treeview.select('0')
+        count = len(self.hits)
+        more = '+' if count == LIMIT else ''
+        self.status_label.config(
+            text=f'{count:,}{more} match{"" if count == 1 else "es"}')
+
+
+    def buttonbox(self):
+        self.make_buttons()
+        self.make_button_layout()
+        self.make_button_bindings()
+
+
+    def make_buttons(self):
+        self.ok_icon = Images.get('go-jump.png')
+        self.close_icon = Images.get('dialog-close.png')
+        self.box = ttk.Frame(self)
+        self.ok_button = ttk.Button(
+            self.box, text='Go To', underline=0, command=self.ok,
+            image=self.ok_icon, compound=tk.LEFT)
+        self.close_button = ttk.Button(
+            self.box, text='Close', underline=0, command=self.cancel,
+            image=self.close_icon, compound=tk.LEFT)
+
+
+    def make_button_layout(self):
+        self.ok_button.pack(side=tk.LEFT, padx=PAD)
+        ttk.Frame(self.box, width=PAD).pack(side=tk.LEFT) # Padding
+        self.close_button.pack(side=tk.RIGHT, padx=PAD)
+        self.box.pack(pady=PAD3)
+
+
+    def make_button_bindings(self):
+        self.bind('<Return>', lambda *_: self.ok_button.invoke())
+        self.bind('<Alt-g>', lambda *_: self.ok_button.invoke())
+        self.bind('<Escape>', lambda *_: self.close_button.invoke())
+        self.bind('<Alt-c>', lambda *_: self.close_button.invoke())
+
+
+    def validate(self):
+        iid = self.treeview.focus()
+        self.chosen = self.hits[int(iid)] if iid else None
+        return self.chosen is not None
+
+
+LIMIT = 500
@@ -2,11 +2,11 @@
 # Copyright © 2021 Mark Summerfield. All rights reserved.
 # License: GPLv3
 
-import pathlib
 import tkinter as tk
 import tkinter.simpledialog as tkdialog
 import tkinter.ttk as ttk
 
+import Images
 import playlist
 from Const import APPNAME, INFO_FG, PAD, PAD3, WE
 
@@ -64,10 +64,8 @@ class Form(tkdialog.Dialog):
 
 
     def make_buttons(self):
-        path = pathlib.Path(__file__).parent
-        self.ok_icon = tk.PhotoImage(file=path / 'images/dialog-ok.png')
-        self.close_icon = tk.PhotoImage(
-            file=path / 'images/dialog-close.png')
+        self.ok_icon = Images.get('dialog-ok.png')
+        self.close_icon = Images.get('dialog-close.png')
         self.box = ttk.Frame(self)
         self.ok_button = ttk.Button(
             self.box, text='OK', underline=0, command=self.ok,
@@ -5,37 +5,27 @@
 import tkinter as tk
 import tkinter.ttk as ttk
 
-import Config
-import Player
+import Images
 import PlaylistPane
+import playlist
 import PlaylistsPane
+import shuffle
 import Tooltip
-from Const import APPNAME, NSWE, PAD, PAUSE_ICON, PLAY_ICON, WE
+from Const import APPNAME, NSWE, PAD, PLAY_ICON, WE
 
 
 class UiMixin:
 
     __slots__ = ()
 
-    def make_images(self, imagepath):
-        for name in (ABOUT_ICON, ADD_ICON, EDIT_ICON, FILENEW_ICON,
-                     HELP_ICON, HISTORY_ICON, MOVE_DOWN_ICON, MOVE_UP_ICON,
-                     NEXT_ICON, OPTIONS_ICON, PAUSE_ICON, PLAY_ICON,
-                     PREVIOUS_ICON, QUIT_ICON, REMOVE_ICON, UNREMOVE_ICON):
-            self.images[name] = tk.PhotoImage(file=imagepath / name)
-
-
     def make_widgets(self):
         self.splitter = ttk.PanedWindow(self.master, orient=tk.HORIZONTAL)
-        self.playlists_pane = PlaylistsPane.PlaylistsPane(
-            self.splitter, path=Config.config.playlists_path)
+        # The playlists tree is populated by Window.start_playlists()
+        self.playlists_pane = PlaylistsPane.PlaylistsPane(self.splitter)
         self.a_playlist_pane = PlaylistPane.PlaylistPane(self.splitter)
         self.button_frame = ttk.Frame(self.master)
         self.make_main_buttons()
         self.make_playlist_buttons()
-        if Player.player.valid:
-            self.make_player_buttons()
-            self.make_scales()
         self.status_label = ttk.Label(self.master, foreground='navy',
                                       relief=tk.SUNKEN)
 
@@ -43,28 +33,28 @@ class UiMixin:
     def make_main_buttons(self):
         self.file_new_button = ttk.Button(
             self.button_frame, text='New…', underline=0, takefocus=False,
-            image=self.images[FILENEW_ICON], command=self.on_new_playlist,
+            image=Images.get(FILENEW_ICON), command=self.on_new_playlist,
             compound=tk.LEFT)
         Tooltip.Tooltip(self.file_new_button,
                         'Create New Playlist • Ctrl+N')
         self.options_button = ttk.Button(
             self.button_frame, text='Options…', takefocus=False,
-            underline=0, image=self.images[OPTIONS_ICON],
+            underline=0, image=Images.get(OPTIONS_ICON),
             command=self.on_options, compound=tk.LEFT)
         Tooltip.Tooltip(self.options_button, 'Options • Ctrl+O')
         self.about_button = ttk.Button(
             self.button_frame, text='About', takefocus=False, underline=1,
-            image=self.images[ABOUT_ICON], command=self.on_about,
+            image=Images.get(ABOUT_ICON), command=self.on_about,
             compound=tk.LEFT)
         Tooltip.Tooltip(self.about_button, f'About {APPNAME} • Ctrl+B')
         self.help_button = ttk.Button(
             self.button_frame, text='Help', takefocus=False, underline=0,
-            image=self.images[HELP_ICON], command=self.on_help,
+            image=Images.get(HELP_ICON), command=self.on_help,
             compound=tk.LEFT)
         Tooltip.Tooltip(self.help_button, 'Show Help • F1')
         self.quit_button = ttk.Button(
             self.button_frame, text='Quit', takefocus=False, underline=0,
-            image=self.images[QUIT_ICON], command=self.on_close,
+            image=Images.get(QUIT_ICON), command=self.on_close,
             compound=tk.LEFT)
         Tooltip.Tooltip(self.quit_button,
                         f'Quit {APPNAME} • Esc or Ctrl+Q')
@@ -73,60 +63,105 @@ class UiMixin:
     def make_playlist_buttons(self):
         self.add_button = ttk.Button(
             self.button_frame, text='Add…', underline=0, takefocus=False,
-            image=self.images[ADD_ICON], command=self.on_add_track,
+            image=Images.get(ADD_ICON), command=self.on_add_track,
             compound=tk.LEFT)
         Tooltip.Tooltip(self.add_button, 'Add Track to Playlist • Ctrl+A')
         self.edit_button = ttk.Button(
             self.button_frame, text='Edit…', underline=0, takefocus=False,
-            image=self.images[EDIT_ICON], command=self.on_edit_track,
+            image=Images.get(EDIT_ICON), command=self.on_edit_track,
             compound=tk.LEFT)
         Tooltip.Tooltip(self.edit_button, 'Edit Track\'s Name • Ctrl+E')
         self.move_up_button = ttk.Button(
             self.button_frame, text='Move Up', underline=5, takefocus=False,
-            image=self.images[MOVE_UP_ICON], command=self.on_move_track_up,
+            image=Images.get(MOVE_UP_ICON), command=self.on_move_track_up,
             compound=tk.LEFT)
-        Tooltip.Tooltip(self.move_up_button, 'Move Track Up • Ctrl+U')
+        Tooltip.Tooltip(self.move_up_button,
+                        'Move Selected Tracks Up • Ctrl+U')
         self.move_down_button = ttk.Button(
             self.button_frame, text='Move Down', underline=5,
-            takefocus=False, image=self.images[MOVE_DOWN_ICON],
+            takefocus=False, image=Images.get(MOVE_DOWN_ICON),
             command=self.on_move_track_down, compound=tk.LEFT)
-        Tooltip.Tooltip(self.move_down_button, 'Move Track Down • Ctrl+D')
+        Tooltip.Tooltip(self.move_down_button,
+                        'Move Selected Tracks Down • Ctrl+D')
         self.remove_button = ttk.Button(
             self.button_frame, text='Remove', underline=0, takefocus=False,
-            image=self.images[REMOVE_ICON], command=self.on_remove_track,
+            image=Images.get(REMOVE_ICON), command=self.on_remove_track,
+            compound=tk.LEFT)
+        Tooltip.Tooltip(self.remove_button,
+                        'Remove Selected Tracks • Ctrl+R')
+        self.undo_button = ttk.Button(
+            self.button_frame, text='Undo', takefocus=False,
+            image=Images.get(UNDO_ICON), command=self.on_undo,
             compound=tk.LEFT)
-        Tooltip.Tooltip(self.remove_button, 'Remove Track • Ctrl+R')
-        self.unremove_button = ttk.Button(
-            self.button_frame, text='Unremove', underline=4,
-            takefocus=False, image=self.images[UNREMOVE_ICON],
-            command=self.on_unremove_track, compound=tk.LEFT)
-        Tooltip.Tooltip(self.unremove_button,
-                        'Unremove Last Removed Track • Ctrl+M')
+        Tooltip.Tooltip(self.undo_button,
+                        'Undo the Last Change to the Playlist • Ctrl+Z')
+        self.redo_button = ttk.Button(
+            self.button_frame, text='Redo', takefocus=False,
+            image=Images.get(REDO_ICON), command=self.on_redo,
+            compound=tk.LEFT)
+        Tooltip.Tooltip(self.redo_button,
+                        'Redo the Last Undone Change • Ctrl+Y')
         self.history_button = ttk.Menubutton(
             self.button_frame, text='History', underline=1, takefocus=False,
-            image=self.images[HISTORY_ICON], compound=tk.LEFT)
+            image=Images.get(HISTORY_ICON), compound=tk.LEFT)
         Tooltip.Tooltip(self.history_button,
                         'Switch to a Bookmarked Track • Ctrl+I')
+        self.tools_button = ttk.Menubutton(
+            self.button_frame, text='Tools', underline=0, takefocus=False,
+            image=Images.get(TOOLS_ICON), compound=tk.LEFT)
+        self.make_tools_menu()
+        Tooltip.Tooltip(self.tools_button, 'Playlist Tools • Alt+T')
+
+
+    def make_tools_menu(self):
+        menu = tk.Menu(self.tools_button)
+        menu.add_command(label='Repair Missing Tracks…', underline=0,
+                         command=self.on_repair)
+        menu.add_command(label='Duplicates…', underline=0,
+                         command=self.on_dedupe)
+        menu.add_command(label='Duplicates by Content…', underline=14,
+                         command=lambda: self.on_dedupe(content=True))
+        menu.add_checkbutton(label='Remove Duplicates Across Playlists',
+                             underline=18,
+                             variable=self.dedupe_across_var)
+        menu.add_command(label='Move Selected To…', underline=0,
+                         command=self.on_move_tracks_to)
+        order_menu = tk.Menu(menu)
+        for mode in shuffle.Mode:
+            order_menu.add_radiobutton(
+                label=mode.value, value=mode.name,
+                variable=self.play_order_var, command=self.on_play_order)
+        menu.add_cascade(label='Play Order', underline=0, menu=order_menu)
+        sort_menu = tk.Menu(menu)
+        for by in playlist.Sort:
+            sort_menu.add_command(
+                label=by.value, command=lambda by=by: self.on_sort(by))
+        menu.add_cascade(label='Sort By', underline=1, menu=sort_menu)
+        menu.add_command(label='Search…', underline=0,
+                         command=self.on_search)
+        menu.add_command(label='Used In…', underline=0,
+                         command=self.on_used_in)
+        self.tools_button.config(menu=menu)
 
 
     def make_player_buttons(self):
         self.player_frame = ttk.Frame(self.button_frame)
         self.previous_button = ttk.Button(
             self.player_frame, takefocus=False,
-            image=self.images[PREVIOUS_ICON],
+            image=Images.get(PREVIOUS_ICON),
             command=self.on_previous_track)
         Tooltip.Tooltip(self.previous_button,
                         'Play Previous Track • Ctrl+P')
         self.play_pause_button = ttk.Button(
             self.player_frame, takefocus=False,
-            image=self.images[PLAY_ICON],
+            image=Images.get(PLAY_ICON),
             command=self.on_play_or_pause_track)
         Tooltip.Tooltip(
             self.play_pause_button,
             'Play or Pause the Current Track • Spacebar or Double-Click')
         self.next_button = ttk.Button(
             self.player_frame, takefocus=False,
-            image=self.images[NEXT_ICON], command=self.on_next_track)
+            image=Images.get(NEXT_ICON), command=self.on_next_track)
         Tooltip.Tooltip(self.next_button, 'Play Next Track • Ctrl+T')
 
 
@@ -152,9 +187,6 @@ class UiMixin:
         self.splitter.grid(row=0, column=0, sticky=NSWE)
         self.button_frame.grid(row=0, column=2, **common)
         self.make_button_layout()
-        if Player.player.valid:
-            self.make_player_layout()
-            self.make_scales_layout()
         self.status_label.grid(row=2, column=0, columnspan=4, padx=PAD,
                                pady=PAD, sticky=WE)
         top = self.winfo_toplevel()
@@ -172,19 +204,21 @@ class UiMixin:
         self.move_up_button.grid(row=3, **common)
         self.move_down_button.grid(row=4, **common)
         self.remove_button.grid(row=5, **common)
-        self.unremove_button.grid(row=6, **common)
-        self.history_button.grid(row=7, **common)
+        self.undo_button.grid(row=6, **common)
+        self.redo_button.grid(row=7, **common)
+        self.history_button.grid(row=8, **common)
+        self.tools_button.grid(row=9, **common)
         common['sticky'] = WE + tk.S
-        self.options_button.grid(row=9, **common)
-        self.about_button.grid(row=10, **common)
-        self.help_button.grid(row=11, **common)
-        self.quit_button.grid(row=12, **common)
-        self.button_frame.rowconfigure(9, weight=1)
+        self.options_button.grid(row=11, **common)
+        self.about_button.grid(row=12, **common)
+        self.help_button.grid(row=13, **common)
+        self.quit_button.grid(row=14, **common)
+        self.button_frame.rowconfigure(11, weight=1)
 
 
     def make_player_layout(self):
         common = dict(sticky=WE, pady=PAD, padx=PAD)
-        self.player_frame.grid(row=8, sticky=WE)
+        self.player_frame.grid(row=10, sticky=WE)
         self.previous_button.grid(row=2, column=0, **common)
         self.play_pause_button.grid(row=2, column=1, **common)
         self.next_button.grid(row=2, column=2, **common)
@@ -199,9 +233,43 @@ class UiMixin:
         self.position_progressbar.grid(row=4, **common)
 
 
+    def make_context_menu(self):
+        self.context_menu = tk.Menu(self.a_playlist_pane.treeview)
+        self.context_menu.add_command(label='Cut', underline=2,
+                                      accelerator='Ctrl+X',
+                                      command=self.on_cut_tracks)
+        self.context_menu.add_command(label='Copy', underline=0,
+                                      accelerator='Ctrl+C',
+                                      command=self.on_copy_tracks)
+        self.context_menu.add_command(label='Paste', underline=0,
+                                      accelerator='Ctrl+V',
+                                      command=self.on_paste_tracks)
+        self.context_menu.add_separator()
+        self.context_menu.add_command(label='Move To…', underline=0,
+                                      command=self.on_move_tracks_to)
+        self.context_menu.add_command(label='Remove', underline=0,
+                                      accelerator='Ctrl+R',
+                                      command=self.on_remove_track)
+
+
+    def on_context_menu(self, event):
+        if self.tracks is not None:
+            treeview = self.a_playlist_pane.treeview
+            iid = treeview.identify_row(event.y)
+            if iid and iid not in treeview.selection():
+                treeview.select(iid)
+            self.context_menu.tk_popup(event.x_root, event.y_root)
+
+
     def make_bindings(self):
         self.playlists_pane.treeview.bind('<<TreeviewSelect>>',
                                           self.on_playlists_select)
+        self.make_context_menu()
+        treeview = self.a_playlist_pane.treeview
+        treeview.bind('<Button-3>', self.on_context_menu)
+        treeview.bind('<Control-x>', self.on_cut_tracks)
+        treeview.bind('<Control-c>', self.on_copy_tracks)
+        treeview.bind('<Control-v>', self.on_paste_tracks)
         self.master.bind('+', self.on_volume_up)
         self.master.bind('=', self.on_volume_up)
         self.master.bind('-', self.on_volume_down)
@@ -229,10 +297,8 @@ class UiMixin:
         self.master.bind(
             '<Alt-i>',
             lambda *_: self.history_button.event_generate('<<Invoke>>'))
-        self.master.bind('<Alt-m>',
-                         lambda *_: self.unremove_button.invoke())
-        self.master.bind('<Control-m>',
-                         lambda *_: self.unremove_button.invoke())
+        self.master.bind('<Alt-l>', self.on_filter_focus)
+        self.master.bind('<Control-f>', self.on_filter_focus)
         self.master.bind('<Alt-n>',
                          lambda *_: self.file_new_button.invoke())
         self.master.bind('<Control-n>',
@@ -246,11 +312,15 @@ class UiMixin:
         self.master.bind('<Alt-r>', lambda *_: self.remove_button.invoke())
         self.master.bind('<Control-r>',
                          lambda *_: self.remove_button.invoke())
+        self.master.bind(
+            '<Alt-t>',
+            lambda *_: self.tools_button.event_generate('<<Invoke>>'))
         self.master.bind('<Alt-u>', lambda *_: self.move_up_button.invoke())
         self.master.bind('<Control-u>',
                          lambda *_: self.move_up_button.invoke())
-        if Player.player.valid:
-            self.make_player_bindings()
+        self.master.bind('<Control-y>', lambda *_: self.redo_button.invoke())
+        self.master.bind('<Control-z>', lambda *_: self.undo_button.invoke())
+        self.master.bind('<Control-Z>', lambda *_: self.redo_button.invoke())
 
 
     def make_player_bindings(self):
@@ -282,5 +352,7 @@ NEXT_ICON = 'media-seek-forward.png'
 OPTIONS_ICON = 'gtk-properties.png'
 PREVIOUS_ICON = 'media-seek-backward.png'
 QUIT_ICON = 'exit.png'
+REDO_ICON = 'edit-redo.png'
 REMOVE_ICON = 'list-remove.png'
-UNREMOVE_ICON = 'edit-undo.png'
+TOOLS_ICON = 'playlist.png'
+UNDO_ICON = 'edit-undo.png'
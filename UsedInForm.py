@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# Copyright © 2021 Mark Summerfield. All rights reserved.
+# License: GPLv3
+
+import os
+import tkinter as tk
+import tkinter.filedialog
+import tkinter.simpledialog as tkdialog
+import tkinter.ttk as ttk
+
+import Images
+import Treeview
+from Const import APPNAME, INFO_FG, NSWE, PAD, PAD3, WE
+
+
+class Form(tkdialog.Dialog):
+
+    def __init__(self, master, tracks_catalog, track):
+        self.tracks_catalog = tracks_catalog
+        self.track_title = track.title
+        self.filename = track.filename
+        self.chosen = None # the playlist to go to
+        self.changed = 0 # the number of playlists retitled or relocated
+        super().__init__(master, f'Used In — {APPNAME}')
+
+
+    def body(self, master):
+        self.make_body_widgets(master)
+        self.make_body_layout(master)
+        self.populate()
+        return self.treeview
+
+
+    def make_body_widgets(self, master):
+        self.filename_name_label = ttk.Label(master, text='Track:')
+        self.filename_label = tk.Label(master, text=self.filename,
+                                       foreground=INFO_FG)
+        self.tree_frame = ttk.Frame(master)
+        self.treeview = Treeview.Treeview(self.tree_frame,
+                                          selectmode=tk.BROWSE)
+        self.treeview.heading('#0', text='Playlists', anchor=tk.CENTER)
+        self.treeview.bind('<Double-Button-1>', self.ok)
+        self.status_label = ttk.Label(master, foreground=INFO_FG)
+
+
+    def make_body_layout(self, master):
+        common = dict(padx=PAD, pady=PAD)
+        self.filename_name_label.grid(row=0, column=0, sticky=tk.W,
+                                      **common)
+        self.filename_label.grid(row=0, column=1, sticky=tk.W, **common)
+        self.treeview.grid(row=0, column=0, sticky=NSWE)
+        self.tree_frame.grid_columnconfigure(0, weight=1)
+        self.tree_frame.grid_rowconfigure(0, weight=1)
+        self.tree_frame.grid(row=1, column=0, columnspan=2, sticky=NSWE,
+                             **common)
+        self.status_label.grid(row=2, column=0, columnspan=2, sticky=WE,
+                               **common)
+        master.grid_columnconfigure(1, weight=1)
+        master.grid_rowconfigure(1, weight=1)
+
+
+    def populate(self):
+        self.treeview.clear()
+        folder = self.tracks_catalog.folder
+        names = self.tracks_catalog.where(self.filename)
+        for name in names:
+            self.treeview.insert('', tk.END, iid=name,
+                                 text=os.path.relpath(name, folder))
+        if names:
+            self.treeview.select(names[0])
+        count = len(names)
+        self.status_label.config(
+            text=f'Used in {count:,} playlist{"" if count == 1 else "s"}')
+
+
+    def buttonbox(self):
+        self.make_buttons()
+        self.make_button_layout()
+        self.make_button_bindings()
+
+
+    def make_buttons(self):
+        self.ok_icon = Images.get('go-jump.png')
+        self.edit_icon = Images.get('stock_edit.png')
+        self.folder_icon = Images.get('folder.png')
+        self.close_icon = Images.get('dialog-close.png')
+        self.box = ttk.Frame(self)
+        self.ok_button = ttk.Button(
+            self.box, text='Go To', underline=0, command=self.ok,
+            image=self.ok_icon, compound=tk.LEFT)
+        self.retitle_button = ttk.Button(
+            self.box, text='Retitle…', underline=0, command=self.on_retitle,
+            image=self.edit_icon, compound=tk.LEFT)
+        self.relocate_button = ttk.Button(
+            self.box, text='Relocate…', underline=2,
+            command=self.on_relocate, image=self.folder_icon,
+            compound=tk.LEFT)
+        self.close_button = ttk.Button(
+            self.box, text='Close', underline=0, command=self.cancel,
+            image=self.close_icon, compound=tk.LEFT)
+
+
+    def make_button_layout(self):
+        for button in (self.ok_button, self.retitle_button,
+                       self.relocate_button, self.close_button):
+            button.pack(side=tk.LEFT, padx=PAD)
+        self.box.pack(pady=PAD3)
+
+
+    def make_button_bindings(self):
+        self.bind('<Return>', lambda *_: self.ok_button.invoke())
+        self.bind('<Alt-g>', lambda *_: self.ok_button.invoke())
+        self.bind('<Alt-r>', lambda *_: self.retitle_button.invoke())
+        self.bind('<Alt-l>', lambda *_: self.relocate_button.invoke())
+        self.bind('<Escape>', lambda *_: self.close_button.invoke())
+        self.bind('<Alt-c>', lambda *_: self.close_button.invoke())
+
+
+    def validate(self):
+        self.chosen = self.treeview.focus() or None
+        return self.chosen is not None
+
+
+    def on_retitle(self, _event=None):
+        title = tkdialog.askstring(
+            f'Retitle — {APPNAME}', 'Title for every occurrence:',
+            initialvalue=self.track_title, parent=self)
+        if title is not None:
+            title = title.strip()
+            if title and title != self.track_title:
+                count = self.tracks_catalog.retitle(self.filename, title)
+                self.track_title = title
+                self.changed += count
+                self.status_label.config(
+                    text=f'Retitled in {count:,} playlists')
+
+
+    def on_relocate(self, _event=None):
+        filename = tkinter.filedialog.askopenfilename(
+            parent=self, title=f'Relocate — {APPNAME}',
+            initialdir=os.path.dirname(self.filename))
+        if filename and filename != self.filename:
+            count = self.tracks_catalog.relocate(self.filename, filename)
+            self.filename = filename
+            self.changed += count
+            self.filename_label.config(text=filename)
+            self.populate()
+            self.status_label.config(
+                text=f'Relocated in {count:,} playlists')
@@ -3,64 +3,104 @@
 # License: GPLv3
 
 import os
+import time
 import tkinter as tk
 import tkinter.ttk as ttk
 
 import ActionMixin
 import Config
+import formats
 import Player
 import playlist
+import shuffle
 import UiMixin
 from Const import INFO_FG, PAD, WARN_FG
 
 
 class Window(ttk.Frame, UiMixin.UiMixin, ActionMixin.ActionMixin):
 
-    def __init__(self, master, imagepath):
+    def __init__(self, master):
         super().__init__(master, padding=PAD)
-        self.images = {}
         self.startup_or_bookmark = True
         self.playing = None
         self.tracks = None # playlist.Playlist
+        self.recent_playlists = playlist.RecentPlaylists()
+        self.tracks_catalog = None # catalog.Catalog; created when needed
+        self.search_index = None # search.SearchIndex; created when needed
+        self.play_order = None # shuffle.Order; created when needed
+        self.play_counts = shuffle.PlayCounts()
         config = Config.config
+        self.play_order_var = tk.StringVar(value=config.play_order.name)
         self.music_path = config.music_path
-        self.deleted_track = None # for Undelete
-        self.deleted_index = -1 # for Undelete
+        self.clipboard = [] # tracks for Paste
+        self.dedupe_across_var = tk.BooleanVar(value=False)
+        self.hashing = None # the future of a content dedupe's hashing
         self.status_timer_id = None
         self.playing_timer_id = None
         self.track_data_timer_id = None
         self.volume_var = tk.DoubleVar(value=config.current_volume)
         self.volume_var.trace_add('write', self.update_volume)
         self.position_var = tk.DoubleVar()
-        self.make_images(imagepath)
+        self.playback = False # True once the player has started if valid
+        self.startup_times = [] # (stage name, time.perf_counter())
         self.make_widgets()
         self.make_layout()
         self.make_bindings()
-        self.initialize()
-        self.update_history()
-        self.playlists_pane.treeview.focus_set()
+        self.update_ui()
+        self.set_status_message('Starting…', millisec=None)
+
+
+    def start(self, on_started=None):
+        '''does the rest of the startup in priority order, each stage in
+        its own idle callback, so that the window has already appeared
+        and stays responsive; calls on_started() when it is complete'''
+        stages = [self.start_playlists, self.start_player,
+                  self.update_history]
 
+        def next_stage():
+            stage = stages.pop(0)
+            stage()
+            self.startup_times.append((stage.__name__, time.perf_counter()))
+            if stages:
+                self.after_idle(next_stage)
+            elif on_started is not None:
+                on_started()
 
-    def initialize(self):
+        self.after_idle(next_stage)
+
+
+    def start_playlists(self):
         config = Config.config
+        self.set_status_message('Ready') # replaced if a playlist is loaded
+        self.playlists_pane.set_path(config.playlists_path)
         if config.current_playlist:
             self.playlists_pane.treeview.select(config.current_playlist)
         else:
             self.playlists_pane.focus_first_child()
-        self.update_ui()
-        if Player.player.valid:
-            Player.player.volume = config.current_volume
-            self.set_status_message('Ready')
+        self.playlists_pane.treeview.focus_set()
+
+
+    def start_player(self):
+        # Loading GStreamer is the slowest part of startup
+        self.playback = Player.player.valid
+        if self.playback:
+            self.make_player_buttons()
+            self.make_scales()
+            self.make_player_layout()
+            self.make_scales_layout()
+            self.make_player_bindings()
+            Player.player.volume = Config.config.current_volume
         else:
             self.set_status_message('Playback unsupported: did not find a '
                                     'usable player library', fg=WARN_FG)
+        self.update_ui()
 
 
     def update_ui(self, _event=None):
         widgets = [self.add_button, self.edit_button, self.move_up_button,
                    self.move_down_button, self.remove_button,
-                   self.unremove_button]
-        if Player.player.valid:
+                   self.undo_button, self.redo_button]
+        if self.playback:
             widgets += [self.previous_button, self.play_pause_button,
                         self.next_button, self.position_label,
                         self.position_progressbar, self.volume_label,
@@ -70,8 +110,15 @@ class Window(ttk.Frame, UiMixin.UiMixin, ActionMixin.ActionMixin):
             state = '!' + state
         for widget in widgets:
             widget.state([state])
-        if self.deleted_track is None:
-            self.unremove_button.state([tk.DISABLED])
+        self.update_undo_ui()
+
+
+    def update_undo_ui(self):
+        journal = None if self.tracks is None else self.tracks.journal
+        can_undo = journal is not None and journal.can_undo
+        can_redo = journal is not None and journal.can_redo
+        self.undo_button.state([('!' if can_undo else '') + tk.DISABLED])
+        self.redo_button.state([('!' if can_redo else '') + tk.DISABLED])
 
 
     def set_status_message(self, message, *, millisec=10_000, fg=INFO_FG):
@@ -85,14 +132,14 @@ class Window(ttk.Frame, UiMixin.UiMixin, ActionMixin.ActionMixin):
 
 
     def set_progress(self, secs, total_secs):
-        if Player.player.valid:
+        if self.playback:
             secs = playlist.humanized_length(secs)
             total_secs = playlist.humanized_length(total_secs)
             self.position_label.configure(text=f'{secs}/{total_secs}')
 
 
     def update_volume(self, *_):
-        if Player.player.valid:
+        if self.playback:
             volume = self.volume_var.get()
             Player.player.volume = volume
             self.volume_label.configure(text=f'Volume {volume * 100:.0f}%')
@@ -103,8 +150,8 @@ class Window(ttk.Frame, UiMixin.UiMixin, ActionMixin.ActionMixin):
         for i, item in enumerate(Config.config.history, 1):
             name = (os.path.basename(item.track).lstrip(' -_0123456789')
                     .replace('_', ' '))
-            if name[-4:].upper().endswith('.OGG'):
-                name = name[:-4]
+            if formats.is_track(name):
+                name = os.path.splitext(name)[0]
             menu.add_command(
                 label=f'{i} {name}', underline=0,
                 command=lambda item=item: self.on_history_track(item))
@@ -114,8 +161,9 @@ class Window(ttk.Frame, UiMixin.UiMixin, ActionMixin.ActionMixin):
     def on_close(self, _event=None):
         config = Config.config
         config.current_playlist = self.playlists_pane.treeview.focus()
-        config.current_track = self.a_playlist_pane.treeview.focus()
-        if Player.player.valid:
+        config.current_track = self.a_playlist_pane.filename(
+            self.a_playlist_pane.treeview.focus()) or ''
+        if self.playback:
             config.current_volume = Player.player.volume
         config.geometry = self.winfo_toplevel().geometry()
         self.quit()
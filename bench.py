@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# Copyright © 2021 Mark Summerfield. All rights reserved.
+# License: GPLv3
+
+'''
+Benchmarks for the per-file work done when scanning a music library.
+
+Usage:
+    bench.py [count]
+
+Checks that normalize_name() and formats.is_track() give the same
+results as their original implementations over count (default 1,000,000)
+synthetic filenames and then times them against the originals.
+
+The one intended difference is that the original normalize_name() only
+removed the track number prefix from .mp3, .ogg and .oga names whereas
+the new one removes it whatever the suffix (since the formats registry
+has other music formats); so for other names the new result is checked
+against the original's result for the same name with an .mp3 suffix.
+'''
+
+import os
+import random
+import re
+import sys
+import time
+
+import formats
+import playlist
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else COUNT
+    filenames = synthetic_filenames(count)
+    print(f'{count:,} synthetic filenames')
+    check('normalize_name', expected_normalize_name,
+          playlist.normalize_name, filenames)
+    check('is_track', original_is_track, formats.is_track, filenames)
+    report('normalize_name', lambda: [original_normalize_name(name)
+                                      for name in filenames],
+           lambda: list(playlist.normalize_names(filenames)), count)
+    report('is_track', lambda: [original_is_track(name)
+                                for name in filenames],
+           lambda: [formats.is_track(name) for name in filenames], count)
+
+
+def synthetic_filenames(count):
+    rnd = random.Random(1)
+    suffixes = ('.mp3', '.ogg', '.oga', '.MP3', '.jpg', '.txt')
+    return [os.path.join(
+        '/home/user/Music', f'Artist {rnd.randrange(1000)}',
+        f'Album_{rnd.randrange(10_000)}',
+        f'{rnd.randrange(1, 30):02}-Track_Name_{i}{rnd.choice(suffixes)}')
+        for i in range(count)]
+
+
+def check(name, original, new, filenames):
+    for filename in filenames:
+        expected = original(filename)
+        actual = new(filename)
+        if actual != expected:
+            raise SystemExit(f'{name}({filename!r}) returned {actual!r} '
+                             f'instead of {expected!r}')
+
+
+def report(name, original, new, count):
+    original_secs = timed(original)
+    new_secs = timed(new)
+    print(f'{name:>15}: {count / original_secs:12,.0f}/sec original '
+          f'{count / new_secs:12,.0f}/sec new '
+          f'({original_secs / new_secs:.1f}x)')
+
+
+def timed(function):
+    # Returns the best of REPEATS runs to discount scheduling noise
+    best = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        function()
+        secs = time.perf_counter() - start
+        if best is None or secs < best:
+            best = secs
+    return best
+
+
+def original_normalize_name(name):
+    normalize_rx = re.compile(
+        r'^(?:[a-z]*\d+-)?(?P<name>.*)\.(?i:mp3|og[ga])$')
+    i = name.rfind('/')
+    if i == -1:
+        i = name.rfind('\\')
+    if i != -1:
+        name = name[i + 1:]
+    match = normalize_rx.match(name)
+    if match is not None:
+        name = match.group('name')
+    else:
+        i = name.rfind('.')
+        if i > -1:
+            name = name[:i]
+    return name.replace('_', ' ')
+
+
+def expected_normalize_name(name):
+    if not original_is_track(name):
+        name = os.path.splitext(name)[0] + '.mp3'
+    return original_normalize_name(name)
+
+
+def original_is_track(filename):
+    return filename.upper().endswith(('.MP3', '.OGG', '.OGA'))
+
+
+COUNT = 1_000_000
+REPEATS = 3
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# Copyright © 2021 Mark Summerfield. All rights reserved.
+# License: GPLv3
+
+'''
+A persistent catalog of every playlist in a folder tree.
+
+Usage:
+    tracks_catalog = catalog.Catalog(playlists_path)
+    tracks_catalog.refresh() # only rereads playlists that have changed
+    for name in tracks_catalog.where(filename):
+        print(name)
+'''
+
+import hashlib
+import marshal
+import os
+
+import playlist
+import walk
+
+
+class Catalog:
+    '''Records the track filenames and titles of every playlist in folder
+    (and its subfolders) and maps each track filename to the playlists
+    that contain it
+
+    The catalog is kept on disk and refresh() only rereads those
+    playlists whose size or modification time has changed.
+    '''
+
+    def __init__(self, folder, filename=None):
+        self.folder = os.path.abspath(str(folder))
+        if filename is None:
+            key = hashlib.sha1(self.folder.encode('utf-8')).hexdigest()
+            filename = os.path.join(playlist.cache_path(),
+                                    f'catalog-{key[:16]}.bin')
+        self.filename = str(filename)
+        self._entries = {} # name: (size, mtime_ns, filenames, titles)
+        self._where = None # track filename: set of playlist names
+        self._load()
+
+
+    def __len__(self):
+        return len(self._entries)
+
+
+    def __iter__(self):
+        return iter(sorted(self._entries))
+
+
+    def stamp(self, name):
+        '''returns the (size, mtime_ns) of the named playlist when it was
+        last read or None if it isn't in the catalog'''
+        entry = self._entries.get(name)
+        return None if entry is None else entry[:2]
+
+
+    def tracks(self, name):
+        '''returns a tuple of the named playlist's filenames and a tuple of
+        its titles'''
+        entry = self._entries.get(name)
+        return ((), ()) if entry is None else entry[2:]
+
+
+    def refresh(self):
+        '''rereads new and changed playlists and forgets deleted ones;
+        returns the number of playlists that were (re)read or forgotten'''
+        seen = set()
+        changed = 0
+        for name in walk.files(self.folder, _is_playlist):
+            seen.add(name)
+            try:
+                stat = os.stat(name)
+            except OSError:
+                continue
+            entry = self._entries.get(name)
+            if (entry is None or entry[0] != stat.st_size or
+                    entry[1] != stat.st_mtime_ns):
+                try:
+                    # Don't fill the parsed cache with every playlist
+                    self._update(name, playlist.Playlist(
+                        name, cache=False), stat)
+                except (OSError, playlist.Error):
+                    self._update(name, (), stat)
+                changed += 1
+        for name in set(self._entries) - seen:
+            self._discard(name)
+            changed += 1
+        if changed:
+            self.save()
+        return changed
+
+
+    def where(self, filename):
+        '''returns a sorted list of the playlists that contain filename'''
+        if self._where is None: # only built when first needed
+            self._where = {}
+            for name, entry in self._entries.items():
+                for filename_ in entry[2]:
+                    self._where.setdefault(filename_, set()).add(name)
+        return sorted(self._where.get(filename, ()))
+
+
+    def retitle(self, filename, title):
+        '''sets the title of every occurrence of filename in every playlist
+        that contains it; returns the number of playlists changed'''
+        def change(track):
+            if track.title != title:
+                track.title = title
+                return True
+            return False
+
+        return self._apply(filename, change)
+
+
+    def relocate(self, filename, new_filename):
+        '''changes every occurrence of filename to new_filename in every
+        playlist that contains it; returns the number of playlists changed
+        '''
+        def change(track):
+            track.filename = new_filename
+            return True
+
+        return self._apply(filename, change)
+
+
+    def _apply(self, filename, change):
+        count = 0
+        for name in self.where(filename):
+            tracks = playlist.Playlist(name)
+            changed = False
+            for track in tracks:
+                if track.filename == filename:
+                    changed |= change(track)
+            if changed:
+                tracks.save() # one save per playlist
+                self._update(name, tracks, os.stat(name))
+                count += 1
+        if count:
+            self.save()
+        return count
+
+
+    def _update(self, name, tracks, stat):
+        self._discard(name)
+        filenames = tuple(track.filename for track in tracks)
+        titles = tuple(track.title for track in tracks)
+        self._entries[name] = (stat.st_size, stat.st_mtime_ns, filenames,
+                               titles)
+        if self._where is not None:
+            for filename in filenames:
+                self._where.setdefault(filename, set()).add(name)
+
+
+    def _discard(self, name):
+        entry = self._entries.pop(name, None)
+        if entry is not None and self._where is not None:
+            for filename in entry[2]:
+                names = self._where.get(filename)
+                if names is not None:
+                    names.discard(name)
+                    if not names:
+                        del self._where[filename]
+
+
+    def _load(self):
+        try:
+            with open(self.filename, 'rb') as file:
+                data = marshal.loads(file.read()) # much faster than load()
+            if (data.get('version') == _VERSION and
+                    data.get('folder') == self.folder):
+                self._entries = data['entries']
+            # else stale or foreign: refresh() will rebuild it
+        except (OSError, EOFError, ValueError, TypeError, KeyError):
+            self._entries = {}
+
+
+    def save(self):
+        data = dict(version=_VERSION, folder=self.folder,
+                    entries=self._entries)
+        playlist.write_atomically(self.filename, marshal.dumps(data))
+
+
+def _is_playlist(name):
+    return not name.startswith('.') and playlist.is_playlist(name)
+
+
+_VERSION = 2
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+# Copyright © 2021 Mark Summerfield. All rights reserved.
+# License: GPLv3
+
+'''
+A headless player (i.e., without Tk) controlled through a Unix domain
+socket, e.g., from scripts or keybindings.
+
+Each request is a JSON list of a command and its arguments on one line,
+e.g., ["load", "/home/mark/data/playlists/jazz.m3u", 3], and each reply
+is a JSON object on one line with "ok" true (plus any results) or false
+(plus an "error" message). The requests are served by an asyncio loop;
+GStreamer's messages are handled by Player's GLib main loop thread which
+hands the end of each track over to the asyncio loop.
+
+Usage:
+    player = daemon.Daemon(Player.player)
+    asyncio.run(player.serve())
+    # and elsewhere
+    reply = daemon.request('status')
+    print(reply['title'], reply['pos'], reply['length'])
+'''
+
+import asyncio
+import json
+import os
+import socket
+import sys
+import tempfile
+
+import playlist
+import shuffle
+
+
+class Error(Exception):
+    pass
+
+
+class Daemon:
+    '''Plays playlists with the given Player._Player while serving
+    requests on the Unix domain socket at path (which defaults to
+    socket_path())'''
+
+    def __init__(self, player, *, path=None):
+        self.player = player
+        self.path = str(path or socket_path())
+        self.tracks = None
+        self.index = -1 # of the current track in tracks
+        self.state = STOPPED
+        self.play_counts = shuffle.PlayCounts()
+        self._loop = None
+        self._done = None
+        self._commands = dict(
+            load=self.load, play=self.play, pause=self.pause,
+            resume=self.resume, toggle=self.toggle, stop=self.stop,
+            next=self.next, previous=self.previous, seek=self.seek,
+            volume=self.volume, status=self.status, quit=self.quit)
+
+
+    async def serve(self):
+        '''serves requests until a quit request is received; raises Error
+        if another daemon is already serving on path'''
+        if not self.player.valid:
+            raise Error('playback unsupported: did not find GStreamer')
+        self._loop = asyncio.get_running_loop()
+        self._done = self._loop.create_future()
+        self.player.on_finished = lambda: self._loop.call_soon_threadsafe(
+            self._on_finished)
+        _remove_stale(self.path)
+        server = await asyncio.start_unix_server(self._on_connection,
+                                                 path=self.path)
+        os.chmod(self.path, 0o600)
+        try:
+            async with server:
+                await self._done
+        finally:
+            self.player.on_finished = None
+            self.player.stop()
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+
+    async def _on_connection(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                writer.write(self._reply(line))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass # the client has gone
+        finally:
+            writer.close()
+
+
+    def _reply(self, line):
+        try:
+            request = json.loads(line)
+            if not isinstance(request, list) or not request:
+                raise Error('invalid request: expected [command, ...]')
+            command = self._commands.get(str(request[0]).lower())
+            if command is None:
+                raise Error(f'unrecognized command: {request[0]}')
+            reply = dict(ok=True)
+            reply.update(command(*request[1:]) or {})
+        except TypeError:
+            reply = dict(ok=False, error=f'wrong arguments for {request[0]}')
+        except (Error, playlist.Error, OSError, ValueError) as err:
+            reply = dict(ok=False, error=str(err))
+        return json.dumps(reply).encode('utf-8') + b'\n'
+
+
+    def load(self, filename, number=None):
+        '''loads the given playlist and if number is given plays its
+        number-th track (counting from 1)'''
+        filename = os.path.abspath(filename)
+        if not os.path.isfile(filename):
+            raise Error(f'no such playlist: {filename}')
+        tracks = playlist.Playlist(filename)
+        self.stop()
+        self.tracks = tracks
+        self.index = -1
+        if number is not None:
+            return self.play(number)
+
+
+    def play(self, number=None):
+        '''plays the number-th track (counting from 1), or the current
+        track (from the start), or the first track'''
+        if self.tracks is None:
+            raise Error('no playlist loaded')
+        if number is not None:
+            index = int(number) - 1
+            if not 0 <= index < len(self.tracks):
+                raise Error(f'no track #{number}: the playlist has '
+                            f'{len(self.tracks):,} tracks')
+            self.index = index
+        elif self.index == -1:
+            self.index = 0
+        self._play_current()
+        return self.status()
+
+
+    def pause(self):
+        if self.state == PLAYING:
+            self.player.pause()
+            self.state = PAUSED
+
+
+    def resume(self):
+        if self.state == PAUSED:
+            self.player.resume()
+            self.state = PLAYING
+        elif self.state == STOPPED and self.tracks is not None:
+            return self.play()
+
+
+    def toggle(self):
+        if self.state == PLAYING:
+            return self.pause()
+        return self.resume()
+
+
+    def stop(self):
+        self.player.stop()
+        self.state = STOPPED
+
+
+    def next(self):
+        '''plays the next track or stops if there isn't one'''
+        if self.tracks is None:
+            raise Error('no playlist loaded')
+        if self.index + 1 >= len(self.tracks):
+            self.stop()
+        else:
+            self.index += 1
+            self._play_current()
+        return self.status()
+
+
+    def previous(self):
+        if self.tracks is None:
+            raise Error('no playlist loaded')
+        self.index = max(0, self.index - 1)
+        self._play_current()
+        return self.status()
+
+
+    def seek(self, secs):
+        '''seeks to secs, or by secs if it is a string starting with + or
+        -'''
+        if self.state == STOPPED:
+            raise Error('not playing')
+        pos = float(secs)
+        if isinstance(secs, str) and secs[:1] in {'+', '-'}:
+            pos += self.player.pos
+        self.player.pos = max(0.0, min(pos, self.player.length))
+
+
+    def volume(self, value=None):
+        '''sets the volume if value (0.0 to 1.0) is given and returns it'''
+        if value is not None:
+            self.player.volume = float(value)
+        return dict(volume=self.player.volume)
+
+
+    def status(self):
+        reply = dict(state=self.state, volume=self.player.volume,
+                     playlist=None, tracks=0, number=None, title=None,
+                     filename=None, pos=0.0, length=0.0)
+        if self.tracks is not None:
+            reply.update(playlist=self.tracks.filename,
+                         tracks=len(self.tracks))
+            if 0 <= self.index < len(self.tracks):
+                track = self.tracks[self.index]
+                reply.update(number=self.index + 1, title=track.title,
+                             filename=track.filename)
+        if self.state != STOPPED:
+            reply.update(pos=self.player.pos, length=self.player.length)
+        return reply
+
+
+    def quit(self):
+        if not self._done.done():
+            self._done.set_result(None)
+
+
+    def _play_current(self):
+        track = self.tracks[self.index]
+        ok, err = self.player.play(track.filename)
+        if not ok:
+            self.state = STOPPED
+            raise Error(err)
+        self.state = PLAYING
+        self.play_counts.add(track.filename)
+
+
+    def _on_finished(self):
+        if self.state == PLAYING:
+            try:
+                self.next()
+            except Error as err: # e.g., the next track is missing
+                print(err, file=sys.stderr)
+                self.state = STOPPED
+
+
+def socket_path():
+    '''returns the default socket path (in the user's runtime folder)'''
+    folder = os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir()
+    return os.path.join(folder, f'ple-{os.getuid()}.sock')
+
+
+def request(command, *args, path=None, timeout=None):
+    '''sends the command and its args to the daemon serving on path (which
+    defaults to socket_path()) and returns its reply (a dict); raises
+    OSError if no daemon is serving'''
+    if command == 'load' and args: # resolve against the client's folder
+        args = (os.path.abspath(args[0]), *args[1:])
+    data = json.dumps([command, *args]).encode('utf-8') + b'\n'
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout or TIMEOUT)
+        sock.connect(str(path or socket_path()))
+        sock.sendall(data)
+        with sock.makefile('rb') as file:
+            line = file.readline()
+    if not line:
+        raise ConnectionError('the daemon closed the connection')
+    return json.loads(line)
+
+
+def _remove_stale(path):
+    # Removes the socket left by a daemon that didn't shut down cleanly
+    if os.path.exists(path):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            try:
+                sock.connect(path)
+            except OSError:
+                os.remove(path)
+            else:
+                raise Error(f'already running: {path}')
+
+
+def main():
+    usage = USAGE.format(name=os.path.basename(sys.argv[0]))
+    if len(sys.argv) == 1 or sys.argv[1] in {'h', 'help', '-h', '--help'}:
+        raise SystemExit(usage)
+    command, *args = sys.argv[1:]
+    if command == 'serve':
+        if len(args) > 2:
+            raise SystemExit(usage)
+        try: # before starting a player that may start playing
+            _remove_stale(socket_path())
+        except (Error, OSError) as err:
+            raise SystemExit(err)
+        import Player
+
+        if not Player.player.valid:
+            raise SystemExit('playback unsupported: did not find GStreamer')
+        player = Daemon(Player.player)
+        try:
+            if args:
+                player.load(*args)
+            asyncio.run(player.serve())
+        except (Error, playlist.Error, OSError) as err:
+            raise SystemExit(err)
+        except KeyboardInterrupt:
+            pass
+    else:
+        try:
+            reply = request(command, *args)
+        except OSError as err:
+            raise SystemExit(f'failed to reach the daemon: {err}')
+        if not reply.pop('ok', False):
+            raise SystemExit(reply.get('error', 'failed'))
+        for key, value in reply.items():
+            print(f'{key}: {value}')
+
+
+STOPPED = 'stopped'
+PLAYING = 'playing'
+PAUSED = 'paused'
+TIMEOUT = 5 # secs to wait for a reply
+
+USAGE = '''usage:
+{name} serve [playlist [number]]
+    Run the player (without a GUI) until sent quit, optionally loading
+    the playlist and playing its number-th track (counting from 1).
+{name} <command> [args]
+    Send the command to the running player and output its reply, where
+    command is one of:
+        load <playlist> [number]    play [number]    pause    resume
+        toggle    stop    next    previous    seek <[+|-]secs>
+        volume [0.0-1.0]    status    quit
+    (A seek of +secs or -secs is relative to the current position.)
+'''
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+# Copyright © 2021 Mark Summerfield. All rights reserved.
+# License: GPLv3
+
+'''
+Find (and optionally remove) duplicate tracks within and across
+playlists.
+
+Usage:
+    playlists = [playlist.Playlist(name) for name in names]
+    groups = dedupe.find(playlists, content=True)
+    for group in groups:
+        print(group.kind, [entry.filename for entry in group.entries])
+    dedupe.remove(groups) # only removes duplicates within a playlist
+    dedupe.remove(groups, across=True) # keeps each group's first entry
+'''
+
+import collections
+import concurrent.futures
+import hashlib
+import marshal
+import multiprocessing
+import os
+
+import playlist
+
+
+Entry = collections.namedtuple('Entry', 'tracks index filename')
+Group = collections.namedtuple('Group', 'kind entries')
+
+PATH = 'path' # the same file
+SIZE = 'size' # different files of the same size and known duration
+CONTENT = 'content' # different files with the same audio
+
+
+def find(playlists, *, content=False, hashes=None):
+    '''returns a list of Groups of duplicate entries in the given
+    playlists (in the order they were first encountered)
+
+    Duplicates are found in up to three tiers, each by grouping on a key
+    rather than by comparing tracks pairwise: first tracks with the same
+    path, then different files with the same size and known duration
+    (files of unknown duration are never grouped on size alone), and then,
+    if content is True, different files whose audio (i.e., ignoring any
+    ID3 or FLAC metadata) has the same hash. In this last case the
+    second tier's groups are only reported if their content matches too,
+    and files that have the same duration are also compared (since they
+    may be copies that differ only in their tags). The hashes are
+    computed in parallel and cached in hashes (a Hashes) which defaults
+    to the one in playlist.cache_path(); see candidates() for computing
+    them in advance (e.g., in another thread).
+
+    Each group's entries include every entry for each of its files, and
+    every entry belongs to at most one group.
+    '''
+    playlists = list(playlists)
+    by_path, stats, by_size = _tiers(playlists)
+    if content:
+        paths = _candidates(by_size)
+        if hashes is None:
+            hashes = Hashes()
+        digests = hashes.digests(paths, stats)
+        by_digest = {} # digest: list of normalized filenames
+        for path in paths:
+            digest = digests.get(path)
+            if digest is not None:
+                by_digest.setdefault(digest, []).append(path)
+        kind, groups = CONTENT, by_digest.values()
+    else:
+        kind, groups = SIZE, [paths for (_, secs), paths in by_size.items()
+                              if secs > 0]
+    order = {id(tracks): i for i, tracks in enumerate(playlists)}
+
+    def position(entry):
+        return order[id(entry.tracks)], entry.index
+
+    found = []
+    grouped = set()
+    for paths in groups:
+        if len(paths) > 1:
+            grouped.update(paths)
+            entries = []
+            for path in paths:
+                entries += by_path[path]
+            found.append(Group(kind, sorted(entries, key=position)))
+    for path, entries in by_path.items():
+        if len(entries) > 1 and path not in grouped:
+            found.append(Group(PATH, entries))
+    found.sort(key=lambda group: position(group.entries[0]))
+    return found
+
+
+def candidates(playlists):
+    '''returns the filenames whose hashes find(playlists, content=True)
+    needs and a dict of their os.stat_results, i.e., the arguments for
+    Hashes.digests()'''
+    _, stats, by_size = _tiers(list(playlists))
+    paths = _candidates(by_size)
+    return paths, {path: stats[path] for path in paths}
+
+
+def _tiers(playlists):
+    # Returns the entries grouped by (normalized) path, the paths' stats,
+    # and the paths that exist grouped by (size, secs)
+    by_path = {} # normalized filename: list of Entry
+    for tracks in playlists:
+        for index, track in enumerate(tracks):
+            filename = track.filename
+            by_path.setdefault(os.path.normcase(filename), []).append(
+                Entry(tracks, index, filename))
+    stats = {} # normalized filename: os.stat_result
+    for path in by_path:
+        try:
+            stats[path] = os.stat(path)
+        except OSError:
+            pass # missing files can still be path duplicates
+    by_size = {} # (size, secs): list of normalized filenames
+    for path, stat in stats.items():
+        entry = by_path[path][0]
+        secs = entry.tracks[entry.index].secs
+        by_size.setdefault((stat.st_size, secs), []).append(path)
+    return by_path, stats, by_size
+
+
+def _candidates(by_size):
+    # Returns the paths that share a size or a known duration with others
+    by_secs = {} # secs: list of normalized filenames
+    for (_, secs), paths in by_size.items():
+        if secs > 0:
+            by_secs.setdefault(secs, []).extend(paths)
+    return _grouped(by_size.values(), by_secs.values())
+
+
+def removable(groups, *, across=False):
+    '''returns the entries that remove() would remove from the given
+    groups: by default only the later entries in each playlist that
+    duplicate an earlier one in the same playlist, or if across is True,
+    every entry except each group's first (so a track is only kept in the
+    first playlist that has it)'''
+    doomed = []
+    for group in groups:
+        if across:
+            doomed += group.entries[1:]
+        else:
+            seen = set()
+            for entry in group.entries:
+                if id(entry.tracks) in seen:
+                    doomed.append(entry)
+                else:
+                    seen.add(id(entry.tracks))
+    return doomed
+
+
+def remove(groups, *, across=False):
+    '''removes the removable() entries of the given groups with one save
+    per changed playlist; returns the number of entries removed'''
+    doomed = {} # id(tracks): (tracks, indexes)
+    for entry in removable(groups, across=across):
+        _, indexes = doomed.setdefault(id(entry.tracks), (entry.tracks, []))
+        indexes.append(entry.index)
+    count = 0
+    for tracks, indexes in doomed.values():
+        count += len(tracks.remove(indexes))
+    return count
+
+
+class Hashes:
+    '''A persistent cache of the hashes of music files' audio
+
+    A file's hash is only (re)computed if its size or modification time
+    has changed since it was cached. Missing hashes are computed in a
+    process pool since hashing big files is CPU as well as I/O bound, or if
+    processes is False (e.g., in the GUI, whose Tk and GLib threads make
+    starting processes risky), in a thread pool (hashlib and file reads
+    release the GIL). The process pool's workers are spawned rather than
+    forked.
+    '''
+
+    def __init__(self, filename=None, *, workers=None, processes=True):
+        if filename is None:
+            filename = os.path.join(playlist.cache_path(), 'hashes.bin')
+        self.filename = str(filename)
+        self.workers = workers
+        self.processes = processes
+        self._entries = None # filename: (size, mtime_ns, digest)
+
+
+    def __len__(self):
+        if self._entries is None:
+            self._load()
+        return len(self._entries)
+
+
+    def digests(self, filenames, stats):
+        '''returns a dict of filename: digest for each of the given
+        filenames that could be read; stats maps each filename to its
+        os.stat_result'''
+        if self._entries is None:
+            self._load()
+        digests = {}
+        missing = []
+        for filename in filenames:
+            stat = stats[filename]
+            entry = self._entries.get(filename)
+            if (entry is not None and entry[0] == stat.st_size and
+                    entry[1] == stat.st_mtime_ns):
+                digests[filename] = entry[2]
+            else:
+                missing.append(filename)
+        if missing:
+            for filename, digest in zip(missing, self._computed(missing)):
+                if digest is not None:
+                    stat = stats[filename]
+                    self._entries[filename] = (stat.st_size,
+                                               stat.st_mtime_ns, digest)
+                    digests[filename] = digest
+            self.save()
+        return digests
+
+
+    def sizes(self):
+        '''returns a dict of filename: size for every file with a cached
+        hash (including files that have since been moved or deleted)'''
+        if self._entries is None:
+            self._load()
+        return {filename: entry[0]
+                for filename, entry in self._entries.items()}
+
+
+    def _computed(self, filenames):
+        if len(filenames) == 1: # not worth starting a pool
+            return [payload_digest(filenames[0])]
+        if not self.processes:
+            with concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.workers) as executor:
+                return list(executor.map(payload_digest, filenames))
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn')) as executor:
+            return list(executor.map(payload_digest, filenames,
+                                     chunksize=CHUNK_FILES))
+
+
+    def discard_missing(self):
+        '''forgets the hashes of files that no longer exist; returns the
+        number forgotten'''
+        if self._entries is None:
+            self._load()
+        missing = [filename for filename in self._entries
+                   if not os.path.exists(filename)]
+        for filename in missing:
+            del self._entries[filename]
+        if missing:
+            self.save()
+        return len(missing)
+
+
+    def _load(self):
+        try:
+            with open(self.filename, 'rb') as file:
+                data = marshal.loads(file.read())
+            self._entries = (data['entries'] if data.get('version') ==
+                             _VERSION else {})
+        except (OSError, EOFError, ValueError, TypeError, KeyError):
+            self._entries = {}
+
+
+    def save(self):
+        data = dict(version=_VERSION, entries=self._entries)
+        playlist.write_atomically(self.filename, marshal.dumps(data))
+
+
+def payload_digest(filename):
+    '''returns the SHA-1 digest of filename's audio (i.e., excluding any
+    ID3v2 or ID3v1 tags or FLAC metadata blocks) or None if it can't be
+    read'''
+    digest = hashlib.sha1()
+    try:
+        with open(filename, 'rb') as file:
+            start, end = _payload_span(file, os.fstat(file.fileno()).st_size)
+            file.seek(start)
+            remaining = end - start
+            while remaining > 0:
+                data = file.read(min(CHUNK_SIZE, remaining))
+                if not data:
+                    break
+                digest.update(data)
+                remaining -= len(data)
+    except OSError:
+        return None
+    return digest.digest()
+
+
+def _payload_span(file, size):
+    # Returns the (start, end) offsets of the file's audio
+    start = 0
+    header = file.read(10)
+    if header[:3] == b'ID3' and len(header) == 10: # ID3v2
+        start = 10 + _synchsafe(header[6:10])
+        if header[5] & 0x10: # has a footer
+            start += 10
+    elif header[:4] == b'fLaC':
+        start = 4
+        while start + 4 <= size:
+            file.seek(start)
+            block = file.read(4)
+            start += 4 + int.from_bytes(block[1:4], 'big')
+            if block[0] & 0x80: # the last metadata block
+                break
+    end = size
+    if size - start >= 128:
+        file.seek(size - 128)
+        if file.read(3) == b'TAG': # ID3v1
+            end -= 128
+    return min(start, end), end
+
+
+def _synchsafe(data):
+    value = 0
+    for byte in data:
+        value = (value << 7) | (byte & 0x7F)
+    return value
+
+
+def _grouped(*groupings):
+    # Returns the unique paths in every group (of every grouping) that
+    # has more than one, in the order they were first encountered
+    paths = {}
+    for groups in groupings:
+        for group in groups:
+            if len(group) > 1:
+                paths.update(dict.fromkeys(group))
+    return list(paths)
+
+
+CHUNK_SIZE = 1024 * 1024
+CHUNK_FILES = 8 # per process pool task
+_VERSION = 1
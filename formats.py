@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# Copyright © 2021 Mark Summerfield. All rights reserved.
+# License: GPLv3
+
+'''
+The registry of the audio formats that ple recognizes.
+
+Each Format has its suffixes and optionally a function that reads a
+file's duration from its headers (without decoding any audio) and a
+function that reads its tags. Scanning, filtering, the file dialogs and
+duration probing are all driven by the registry, so supporting another
+format only needs a register() call.
+
+Usage:
+    if formats.is_track(filename):
+        secs = formats.duration(filename) # None if it can't be read
+        found = formats.read_tags(filename) # None if it can't be read
+    formats.register(formats.Format('WavPack', ('.wv',)))
+'''
+
+import collections
+import os
+
+import tags
+
+
+Format = collections.namedtuple('Format', 'name suffixes duration tags',
+                                defaults=(None, None))
+
+
+def register(format):
+    '''adds (or replaces) the given Format for each of its suffixes'''
+    global _suffixes, _tails, _other_lengths
+    for suffix in format.suffixes:
+        _formats[suffix.upper()] = format
+    _suffixes = frozenset(suffix for suffix in _formats if len(suffix) == 4)
+    _tails = frozenset(suffix[1:] for suffix in _formats
+                       if len(suffix) == 5)
+    _other_lengths = any(len(suffix) not in {4, 5} for suffix in _formats)
+
+
+def format_for(filename):
+    '''returns the Format registered for filename's suffix or None'''
+    return _formats.get(filename[filename.rfind('.'):].upper())
+
+
+def is_track(filename):
+    '''returns True if filename has a registered music suffix'''
+    # This is called for every file scanned so the usual suffix lengths
+    # (e.g., '.mp3', '.flac') are checked with one slice of the last four
+    # characters rather than by searching for the '.'
+    end = filename[-4:].upper()
+    if end in _suffixes:
+        return True
+    if end in _tails:
+        return filename[-5:-4] == '.'
+    return _other_lengths and format_for(filename) is not None
+
+
+def suffixes():
+    '''returns the registered (uppercase) suffixes'''
+    return set(_formats)
+
+
+def filetypes():
+    '''returns a tuple of (name, pattern) pairs for file dialogs, e.g.,
+    (('FLAC', '*.flac'), ('MP3', '*.mp3'), ...)'''
+    names = {} # name: suffixes
+    for suffix, format in _formats.items():
+        names.setdefault(format.name, []).append(f'*{suffix.lower()}')
+    return tuple((name, ' '.join(patterns))
+                 for name, patterns in sorted(names.items()))
+
+
+def duration(filename):
+    '''returns filename's duration in seconds read from its headers or
+    None if its format has no duration reader or it can't be read'''
+    format = format_for(filename)
+    if format is None or format.duration is None:
+        return None
+    try:
+        with open(filename, 'rb') as file:
+            secs = format.duration(file, os.fstat(file.fileno()).st_size)
+    except (OSError, ValueError, IndexError, ZeroDivisionError):
+        return None
+    return secs if secs is not None and secs > 0 else None
+
+
+def read_tags(filename):
+    '''returns filename's tags.Tags or None if its format has no tag
+    reader or they can't be read'''
+    format = format_for(filename)
+    if format is None or format.tags is None:
+        return None
+    return format.tags(filename)
+
+
+def _mp3_duration(file, size):
+    start = 0
+    header = file.read(10)
+    if header[:3] == b'ID3':
+        start = 10 + tags.synchsafe(header[6:10])
+        if header[5] & 0x10: # has a footer
+            start += 10
+    file.seek(start)
+    data = file.read(MAX_MP3_SCAN)
+    i = _mp3_frame(data)
+    if i == -1:
+        return None
+    frame = int.from_bytes(data[i:i + 4], 'big')
+    version = (frame >> 19) & 0x3 # 3 = MPEG-1, 2 = MPEG-2, 0 = MPEG-2.5
+    bitrate = _MP3_BITRATES[version == 3][(frame >> 12) & 0xF] * 1000
+    rate = _MP3_RATES[version][(frame >> 10) & 0x3]
+    mono = (frame >> 6) & 0x3 == 3
+    samples = 1152 if version == 3 else 576
+    # A VBR file's first frame holds a Xing (or Info) or VBRI header
+    side = (17 if mono else 32) if version == 3 else (9 if mono else 17)
+    xing = data[i + 4 + side:i + 12 + side]
+    if xing[:4] in {b'Xing', b'Info'} and xing[7] & 0x1: # has frames
+        frames = int.from_bytes(data[i + 12 + side:i + 16 + side], 'big')
+        return round(frames * samples / rate)
+    if data[i + 36:i + 40] == b'VBRI':
+        frames = int.from_bytes(data[i + 50:i + 54], 'big')
+        return round(frames * samples / rate)
+    audio = size - start - i
+    file.seek(-128, os.SEEK_END)
+    if file.read(3) == b'TAG': # ID3v1
+        audio -= 128
+    return round(audio * 8 / bitrate)
+
+
+def _mp3_frame(data):
+    # Returns the index of the first valid frame header in data or -1
+    i = data.find(b'\xFF')
+    while -1 < i < len(data) - 4:
+        frame = int.from_bytes(data[i:i + 4], 'big')
+        if ((frame >> 21) & 0x7FF == 0x7FF and # sync
+                (frame >> 19) & 0x3 != 1 and # version
+                (frame >> 17) & 0x3 == 1 and # layer III
+                0 < (frame >> 12) & 0xF < 15 and # bitrate
+                (frame >> 10) & 0x3 != 3): # sample rate
+            return i
+        i = data.find(b'\xFF', i + 1)
+    return -1
+
+
+def _flac_duration(file, _size):
+    file.seek(4)
+    header = file.read(4)
+    if header[0] & 0x7F != 0: # STREAMINFO must come first
+        return None
+    info = file.read(34)
+    value = int.from_bytes(info[10:18], 'big')
+    rate = value >> 44
+    samples = value & 0xFFFFFFFFF
+    return round(samples / rate) if rate and samples else None
+
+
+def _ogg_duration(file, size):
+    file.seek(0)
+    header = file.read(27)
+    if header[:4] != b'OggS':
+        return None
+    lacing = file.read(header[26])
+    packet = file.read(lacing[0] if lacing else 0)
+    if packet[:7] == b'\x01vorbis':
+        rate = int.from_bytes(packet[12:16], 'little')
+        skip = 0
+    elif packet[:8] == b'OpusHead':
+        rate = 48000 # Opus granule positions are always at 48kHz
+        skip = int.from_bytes(packet[10:12], 'little')
+    else:
+        return None
+    # The last page's granule position is the total number of samples
+    tail = min(size, MAX_OGG_TAIL)
+    file.seek(size - tail)
+    data = file.read(tail)
+    i = data.rfind(b'OggS')
+    if i == -1 or i + 14 > len(data):
+        return None
+    granule = int.from_bytes(data[i + 6:i + 14], 'little')
+    return round((granule - skip) / rate)
+
+
+def _mp4_duration(file, size):
+    # The duration is in moov/mvhd; moov may be at either end
+    atom = _mp4_atom(file, 0, size, b'moov')
+    if atom is None:
+        return None
+    atom = _mp4_atom(file, atom[0], atom[1], b'mvhd')
+    if atom is None:
+        return None
+    file.seek(atom[0])
+    data = file.read(32)
+    if data[0] == 1: # version 1: 64-bit times and duration
+        timescale = int.from_bytes(data[20:24], 'big')
+        length = int.from_bytes(data[24:32], 'big')
+    else:
+        timescale = int.from_bytes(data[12:16], 'big')
+        length = int.from_bytes(data[16:20], 'big')
+    return round(length / timescale)
+
+
+def _mp4_atom(file, start, end, name):
+    # Returns the (start, end) of the named atom's content or None
+    while start + 8 <= end:
+        file.seek(start)
+        header = file.read(8)
+        if len(header) < 8:
+            return None
+        size = int.from_bytes(header[:4], 'big')
+        offset = 8
+        if size == 1: # 64-bit size
+            size = int.from_bytes(file.read(8), 'big')
+            offset = 16
+        elif size == 0: # extends to the end
+            size = end - start
+        if size < offset:
+            return None
+        if header[4:8] == name:
+            return start + offset, start + size
+        start += size
+    return None
+
+
+_MP3_BITRATES = ( # kbps indexed by [is MPEG-1][bitrate index]
+    (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320))
+_MP3_RATES = ((11025, 12000, 8000), None, (22050, 24000, 16000),
+              (44100, 48000, 32000)) # indexed by [version][rate index]
+MAX_MP3_SCAN = 64 * 1024 # bytes searched for the first frame
+MAX_OGG_TAIL = 64 * 1024 # bytes searched for the last page
+
+_formats = {} # uppercase suffix: Format
+_suffixes = frozenset() # of _formats' 4 character keys, e.g., '.MP3'
+_tails = frozenset() # of the 5 character keys without the '.', e.g., 'FLAC'
+_other_lengths = False # True if any suffix isn't 4 or 5 characters long
+
+register(Format('MP3', ('.mp3',), _mp3_duration, tags.read))
+register(Format('Ogg', ('.ogg', '.oga'), _ogg_duration, tags.read))
+register(Format('Opus', ('.opus',), _ogg_duration, tags.read))
+register(Format('FLAC', ('.flac',), _flac_duration, tags.read))
+register(Format('MPEG-4 Audio', ('.m4a',), _mp4_duration))
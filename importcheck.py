@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# Copyright © 2021 Mark Summerfield. All rights reserved.
+# License: GPLv3
+
+'''
+Checks that the non-GUI modules import neither Tk nor GStreamer and that
+each imports within the startup budget (as measured by -X importtime).
+
+Usage:
+    importcheck.py [budget_ms]
+
+Outputs each module's cumulative import time and exits with status 1 if
+any module imports a GUI or playback module or exceeds budget_ms
+(default 150).
+'''
+
+import os
+import subprocess
+import sys
+
+
+def main():
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else BUDGET_MS
+    failures = 0
+    for module in MODULES:
+        usecs, forbidden = import_time(module)
+        msecs = usecs / 1000
+        problems = []
+        if forbidden:
+            problems.append('imports ' + ', '.join(sorted(forbidden)))
+        if msecs > budget:
+            problems.append(f'over the {budget:.0f}ms budget')
+        print(f'{module:>10}: {msecs:6.1f}ms', *problems, sep='  ')
+        if problems:
+            failures += 1
+    if failures:
+        raise SystemExit(1)
+
+
+def import_time(module):
+    '''returns the best cumulative import time in microseconds of REPEATS
+    imports of module (each in a fresh interpreter) and the set of
+    FORBIDDEN modules (if any) that it imported'''
+    best = None
+    forbidden = set()
+    folder = os.path.dirname(os.path.abspath(__file__))
+    for _ in range(REPEATS):
+        reply = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+            cwd=folder, capture_output=True, text=True, check=True)
+        usecs = 0
+        for line in reply.stderr.splitlines():
+            # e.g., 'import time:       298 |        298 | tkinter.font'
+            if not line.startswith('import time:'):
+                continue
+            parts = line[len('import time:'):].split('|')
+            if len(parts) != 3 or not parts[1].strip().isdecimal():
+                continue # the header
+            name = parts[2].strip()
+            if name.split('.', 1)[0] in FORBIDDEN:
+                forbidden.add(name)
+            if name == module:
+                usecs = int(parts[1])
+        if best is None or usecs < best:
+            best = usecs
+    return best, forbidden
+
+
+BUDGET_MS = 150
+REPEATS = 3 # the best is used to discount disk and scheduling noise
+FORBIDDEN = {'tkinter', '_tkinter', 'gi'}
+MODULES = ('Const', 'Config', 'Player', 'catalog', 'daemon', 'dedupe',
+           'formats', 'instance', 'playlist', 'repair', 'search', 'shuffle',
+           'tags', 'undo', 'walk')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# Copyright © 2021 Mark Summerfield. All rights reserved.
+# License: GPLv3
+
+'''
+Keep ple to a single GUI instance.
+
+The first instance listens on a Unix domain socket; later instances send
+it their command line arguments and exit before importing Tk, GStreamer
+or Config (so they neither pay for a full startup nor save over the
+first instance's configuration when they exit). Only the standard
+library is imported so that forwarding takes milliseconds.
+
+Usage:
+    if instance.forward(args):
+        return # the running instance has them
+    server = instance.listen() # None if another instance is listening
+    ...
+    instance.watch(app, server, window.open_arguments)
+    app.mainloop()
+    instance.close(server)
+'''
+
+import json
+import os
+import socket
+
+
+def forward(args, *, path=None):
+    '''sends args (with any filenames made absolute) to the running
+    instance; returns True if it received them or False if there's no
+    running instance'''
+    args = [arg if arg.isdecimal() else os.path.abspath(arg)
+            for arg in args]
+    data = json.dumps(args).encode('utf-8') + b'\n'
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(TIMEOUT)
+        try:
+            sock.connect(str(path or socket_path()))
+            sock.sendall(data)
+            return sock.recv(1) == b'\n' # acknowledged
+        except OSError:
+            return False
+
+
+def listen(*, path=None):
+    '''returns a non-blocking listening socket for this instance, or None
+    if another instance is already listening'''
+    path = str(path or socket_path())
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        try:
+            sock.bind(path)
+        except OSError: # in use or left by an instance that crashed
+            if _is_listening(path):
+                sock.close()
+                return None
+            os.remove(path)
+            sock.bind(path)
+        os.chmod(path, 0o600)
+        sock.listen()
+        sock.setblocking(False)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def watch(app, server, on_arguments):
+    '''calls on_arguments(args) in Tk's event loop for each list of
+    arguments forwarded to server (a socket returned by listen())
+
+    Nothing blocks: each client's request is read as it arrives (by its
+    own file handler) so a slow client can't freeze the GUI, and a client
+    that hasn't sent its request within TIMEOUT is dropped.'''
+    import tkinter as tk
+
+    def on_connection(*_):
+        try:
+            client, _ = server.accept()
+        except OSError:
+            return # e.g., the client gave up
+        client.setblocking(False)
+        data = bytearray()
+        timer_id = None
+
+        def finish(args=None):
+            app.tk.deletefilehandler(client)
+            if timer_id is not None:
+                app.after_cancel(timer_id)
+            if args is not None:
+                try:
+                    client.send(b'\n') # acknowledge
+                except OSError:
+                    pass
+            client.close()
+            if isinstance(args, list):
+                on_arguments([str(arg) for arg in args])
+
+        def on_data(*_):
+            try:
+                chunk = client.recv(MAX_REQUEST)
+            except BlockingIOError:
+                return
+            except OSError:
+                chunk = b''
+            data.extend(chunk)
+            end = data.find(b'\n')
+            if end == -1:
+                if chunk and len(data) < MAX_REQUEST:
+                    return # wait for the rest
+                finish() # closed early or too long
+            else:
+                try:
+                    args = json.loads(data[:end])
+                except ValueError:
+                    args = None
+                finish(args)
+
+        app.tk.createfilehandler(client, tk.READABLE, on_data)
+        timer_id = app.after(TIMEOUT * 1000, finish)
+
+    app.tk.createfilehandler(server, tk.READABLE, on_connection)
+
+
+def close(server):
+    '''stops listening and removes server's socket'''
+    path = server.getsockname()
+    server.close()
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def socket_path():
+    '''returns the GUI's socket path (in the user's runtime folder)'''
+    folder = (os.environ.get('XDG_RUNTIME_DIR') or
+              os.environ.get('TMPDIR') or '/tmp')
+    return os.path.join(folder, f'ple-gui-{os.getuid()}.sock')
+
+
+def _is_listening(path):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(path)
+            return True
+        except OSError:
+            return False
+
+
+TIMEOUT = 2 # secs
+MAX_REQUEST = 64 * 1024 # bytes
@@ -2,28 +2,130 @@
 # Copyright © 2021 Mark Summerfield. All rights reserved.
 # License: GPLv3
 
+import array
+import bz2
+import collections
+import contextlib
 import enum
+import functools
+import gzip
+import hashlib
+import io
+import marshal
 import os
 import re
+import shutil
+import sys
 import xml.etree.ElementTree as etree
 
+import formats
+import tags
+import walk
+
+try:
+    import lzma
+except ImportError: # Python can be built without it
+    lzma = None
+
 
 M3U = '.M3U'
 PLS = '.PLS'
 XSPF = '.XSPF'
+FORMATS = (M3U, PLS, XSPF)
+GZ = '.GZ'
+BZ2 = '.BZ2'
+XZ = '.XZ'
+COMPRESSIONS = (GZ, BZ2) + ((XZ,) if lzma is not None else ())
+SUFFIXES = tuple(format + compression for format in FORMATS
+                 for compression in ('',) + COMPRESSIONS)
 
 
 class Playlist:
 
-    def __init__(self, filename):
+    def __init__(self, filename, *, cache=True, relative=False):
+        '''if cache is True the playlist is loaded from (or on a miss,
+        added to) the parsed_cache(); if relative is True the tracks'
+        filenames are saved relative to the playlist's folder (but a
+        loaded playlist saves them however it had them)'''
         self.filename = str(filename)
+        self.cache = cache
+        self.relative = relative
+        self._resolved = {} # relative folder: absolute folder while loading
         self._tracks = []
+        self._positions = None # id(track): index; None means rebuild
+        self._first = None # track location: index of first occurrence
+        self._batch = 0 # the depth of nested batch() calls
+        self._unsaved = False # True if a save was deferred by batch()
+        self._stamp = None # (filename, size, mtime_ns, signature) of I/O
+        self.journal = None # undo.Journal; if set every change is recorded
         if filename is not None and os.path.exists(filename):
             self.load()
 
 
     def clear(self):
         self._tracks.clear()
+        self._invalidate()
+
+
+    def index_of(self, filename):
+        '''returns the index of the first track with the given filename or
+        -1 if there isn't one'''
+        if self._first is None:
+            self._reindex()
+        return self._first.get(location(filename), -1)
+
+
+    def index_of_track(self, track):
+        '''returns the index of the given track (by identity, so this works
+        even if there are several tracks with the same filename) or -1 if
+        it isn't in the playlist'''
+        if self._positions is None:
+            self._reindex()
+        return self._positions.get(id(track), -1)
+
+
+    def _reindex(self):
+        self._positions = {}
+        self._first = {}
+        for index, track in enumerate(self._tracks):
+            self._positions[id(track)] = index
+            self._first.setdefault(track.location, index)
+
+
+    def _invalidate(self):
+        self._positions = None
+        self._first = None
+
+
+    def is_current(self):
+        '''returns True if the playlist's file hasn't changed since the
+        playlist was last loaded or saved (and no save is pending)'''
+        return (self._stamp is not None and not self._unsaved and
+                self._stamp[0] == self.filename and
+                self._stamp[1:3] == _stat(self.filename))
+
+
+    def _record(self, op):
+        if self.journal is not None:
+            self.journal.record(op)
+
+
+    @contextlib.contextmanager
+    def batch(self):
+        '''defers saving until the outermost batch ends (and then saves
+        once if anything changed); the changes made in a batch are
+        undone and redone as one step'''
+        self._batch += 1
+        if self.journal is not None:
+            self.journal.begin()
+        try:
+            yield self
+        finally:
+            self._batch -= 1
+            if self.journal is not None:
+                self.journal.end()
+            if not self._batch and self._unsaved:
+                self.save()
 
 
     @property
@@ -60,50 +162,307 @@ class Playlist:
         return False
 
 
-    def _move(self, a, b):
+    def _move(self, a, b): # a and b must be adjacent
         x = self._tracks[a]
         y = self._tracks[b]
         self._tracks[a] = y
         self._tracks[b] = x
+        if self._positions is not None:
+            self._positions[id(x)] = b
+            self._positions[id(y)] = a
+            x_location = x.location
+            y_location = y.location
+            if x_location != y_location:
+                # Since a and b are adjacent no other occurrence of either
+                # filename can lie between them
+                if self._first[x_location] == a:
+                    self._first[x_location] = b
+                if self._first[y_location] == b:
+                    self._first[y_location] = a
+        self._record(('move', a, b))
+        self.save()
+        return True
+
+
+    def move_track(self, index, new_index):
+        '''moves the track at index so that it ends up at new_index;
+        returns True if it moved'''
+        if index == new_index:
+            return False
+        self._tracks.insert(new_index, self._tracks.pop(index))
+        self._invalidate()
+        self._record(('move', index, new_index))
+        self.save()
+        return True
+
+
+    def move_up(self, indexes):
+        '''moves each of the tracks at the given indexes up one place
+        (unless blocked by the top or by a track that can't move) with a
+        single save; returns True if any track moved'''
+        selected = set(indexes)
+        order = list(range(len(self._tracks)))
+        for i in range(1, len(order)):
+            if order[i] in selected and order[i - 1] not in selected:
+                order[i - 1], order[i] = order[i], order[i - 1]
+        return self.reorder(order, block=sorted(selected))
+
+
+    def move_down(self, indexes):
+        '''moves each of the tracks at the given indexes down one place
+        (unless blocked by the bottom or by a track that can't move) with
+        a single save; returns True if any track moved'''
+        selected = set(indexes)
+        order = list(range(len(self._tracks)))
+        for i in range(len(order) - 2, -1, -1):
+            if order[i] in selected and order[i + 1] not in selected:
+                order[i], order[i + 1] = order[i + 1], order[i]
+        return self.reorder(order, block=sorted(selected))
+
+
+    def move_to(self, indexes, index):
+        '''moves the tracks at the given indexes (in order, as a block) so
+        that the first of them ends up at index (or as near as the block
+        fits, e.g., at the end if index is past it) with a single save;
+        returns True if any track moved'''
+        selected = set(indexes)
+        rest = [i for i in range(len(self._tracks)) if i not in selected]
+        i = _clamp(index, len(rest))
+        return self.reorder(rest[:i] + sorted(selected) + rest[i:])
+
+
+    def reorder(self, order, *, block=None):
+        '''puts the tracks in the given order (a permutation of their
+        current indexes) with a single save; returns True if any track
+        moved
+
+        block is given by move_up() and move_down(): it is the sorted
+        indexes of the tracks they move as a block, so that the journal
+        can undo repeated moves of the same block as one step.
+        '''
+        positions = [i for i, j in enumerate(order) if i != j]
+        sources = [order[i] for i in positions]
+        gesture = None
+        if block is not None:
+            moved_to = dict(zip(sources, positions))
+            gesture = (array.array('I', block),
+                       array.array('I', (moved_to.get(i, i) for i in block)))
+        return self.permute(positions, sources, gesture)
+
+
+    def permute(self, positions, sources, gesture=None):
+        '''moves the track at each of the sources indexes to the
+        corresponding positions index (together these must be a
+        permutation, e.g., from reorder()) with a single save; returns
+        True if any track moved; gesture is recorded for the journal (see
+        reorder())
+
+        Only the tracks that move are touched so this is proportional to
+        the number of positions rather than to the length of the
+        playlist.
+        '''
+        if not positions:
+            return False
+        tracks = self._tracks
+        moving = [tracks[i] for i in sources]
+        for i, track in zip(positions, moving):
+            tracks[i] = track
+        self._invalidate()
+        self._record(('order', array.array('I', positions),
+                      array.array('I', sources), gesture))
+        self.save()
+        return True
+
+
+    def remove(self, indexes):
+        '''removes the tracks at the given indexes with a single save;
+        returns a list of the removed (index, track) pairs in index order
+        (suitable for reinsert())'''
+        selected = set(indexes)
+        removed = [(i, track) for i, track in enumerate(self._tracks)
+                   if i in selected]
+        if removed:
+            self._tracks[:] = [track for i, track in enumerate(self._tracks)
+                               if i not in selected]
+            self._invalidate()
+            self._record(('remove', array.array('I', (i for i, _ in removed)),
+                          tuple(track for _, track in removed)))
+            self.save()
+        return removed
+
+
+    def reinsert(self, items):
+        '''inserts each track of the given (index, track) pairs so that it
+        ends up at its index with a single save'''
+        if not items:
+            return
+        items = sorted(items, key=lambda item: item[0])
+        tracks = []
+        rest = iter(self._tracks)
+        for index, track in items:
+            while len(tracks) < index:
+                try:
+                    tracks.append(next(rest))
+                except StopIteration:
+                    break
+            tracks.append(track)
+        tracks.extend(rest)
+        self._tracks[:] = tracks
+        self._invalidate()
+        self._record(('insert', array.array('I', (i for i, _ in items)),
+                      tuple(track for _, track in items)))
+        self.save()
+
+
+    def insert_many(self, index, tracks):
+        '''inserts the given tracks at index with a single save'''
+        index = _clamp(index, len(self._tracks))
+        tracks = list(tracks)
+        self._tracks[index:index] = tracks
+        self._invalidate()
+        self._record(('insert', array.array('I', range(index,
+                                                       index + len(tracks))),
+                      tuple(tracks)))
+        self.save()
+
+
+    def retitle(self, index, title):
+        '''sets the title of the track at index; returns True if it
+        changed'''
+        track = self._tracks[index]
+        if track.title == title:
+            return False
+        self._record(('title', index, track.title, title))
+        track.title = title
         self.save()
         return True
 
 
     def save(self, filename=None):
+        '''saves the playlist atomically (so a crash can't leave it half
+        written); returns True if it was written or False if the write was
+        skipped because the file already holds exactly this content (or
+        the save was deferred by batch())
+
+        If the only change to an M3U playlist since it was last loaded or
+        saved is that tracks were appended, just the new entries are
+        appended to the file. (A crash during an append can at worst
+        lose or truncate the appended entries.)
+        '''
         if filename is not None:
             self.filename = str(filename)
-        suffix = os.path.splitext(self.filename)[1].upper()
+        if self._batch:
+            self._unsaved = True
+            return False
+        self._unsaved = False
+        suffix, compression = split_suffix(self.filename)
         saver = {M3U: self._save_m3u,
                  PLS: self._save_pls,
                  XSPF: self._save_xspf}.get(suffix, None)
-        if saver is not None:
-            return saver()
-        raise Error(
-            f'can\'t save unrecognized playlist format: {self.filename}')
+        if saver is None:
+            raise Error(
+                f'can\'t save unrecognized playlist format: {self.filename}')
+        data = saver()
+        signature = _signature(data)
+        if self._stamp is not None and self._stamp[0] == self.filename:
+            _, size, mtime_ns, old_signature = self._stamp
+            if (size, mtime_ns) == _stat(self.filename): # not changed
+                if signature == old_signature:           # by others
+                    return False # unchanged since the last load or save
+                length = old_signature[0]
+                if (suffix == M3U and len(data) > length and
+                        _signature(memoryview(data)[:length]) ==
+                        old_signature): # the file's content prefixes data
+                    # Compressed files get a new gzip member or bz2 or xz
+                    # stream which their readers concatenate
+                    _append(self.filename, memoryview(data)[length:],
+                            compression)
+                    self._stamp = (self.filename, *_stat(self.filename),
+                                   signature)
+                    return True
+        write_atomically(self.filename, data, compression=compression)
+        self._stamp = (self.filename, *_stat(self.filename), signature)
+        return True
 
 
     def load(self, filename=None):
         if filename is not None:
             self.filename = str(filename)
-        suffix = os.path.splitext(self.filename)[1].upper()
+        if self.journal is not None:
+            self.journal.clear() # the recorded changes no longer apply
+        suffix, compression = split_suffix(self.filename)
         loader = {M3U: self._load_m3u,
                   PLS: self._load_pls,
                   XSPF: self._load_xspf}.get(suffix, None)
-        if loader is not None:
-            return loader()
-        raise Error(
-            f'can\'t load unrecognized playlist format: {self.filename}')
+        if loader is None:
+            raise Error(
+                f'can\'t load unrecognized playlist format: {self.filename}')
+        self._stamp = None
+        cache = parsed_cache() if self.cache else None
+        with open(self.filename, 'rb') as raw:
+            stat = os.fstat(raw.fileno())
+            cached = (None if cache is None else
+                      cache.get(self.filename, stat))
+            if cached is not None:
+                signature, self.relative, tracks = cached
+                self.clear()
+                self._tracks += tracks
+            else:
+                with _codec_file(raw, compression, 'rb') as file:
+                    data = file.read() # decompressed as it is read
+                self.relative = False # _absolute() sets it if needed
+                try:
+                    loader(data)
+                finally:
+                    self._resolved.clear()
+                signature = _signature(data)
+                if cache is not None:
+                    cache.put(self.filename, stat, signature, self.relative,
+                              self._tracks)
+        self._stamp = (self.filename, stat.st_size, stat.st_mtime_ns,
+                       signature)
+
+
+    def _absolute(self, filename):
+        # Returns the given filename as read from the playlist resolved
+        # against the playlist's folder if it is relative
+        if os.path.isabs(filename) or URL_SCHEME in filename:
+            return filename
+        self.relative = True
+        i = _folder_end(filename)
+        folder = self._resolved.get(filename[:i])
+        if folder is None:
+            base = os.path.dirname(os.path.abspath(self.filename))
+            folder = os.path.join(
+                os.path.normpath(os.path.join(base, filename[:i])), '')
+            self._resolved[filename[:i]] = folder
+        return folder + filename[i:]
+
+
+    def _filenames(self):
+        # Yields each track's filename as it should be saved
+        if not self.relative:
+            for track in self._tracks:
+                yield track.filename
+            return
+        base = os.path.dirname(os.path.abspath(self.filename))
+        folders = {} # absolute folder: relative folder
+        for track in self._tracks:
+            folder = folders.get(track._folder)
+            if folder is None:
+                folder = folders[track._folder] = _relative_folder(
+                    track._folder, base)
+            yield folder + track._name
 
 
     def _save_m3u(self):
-        with open(self.filename, 'wt', encoding='utf-8') as file:
-            file.write(f'{M3U_EXTM3U}\n\n')
-            for track in self._tracks:
-                file.write(f'{M3U_EXTINF}{track.secs},{track.title}\n'
-                           f'{track.filename}\n\n')
+        entries = zip(self._tracks, self._filenames())
+        return ''.join([f'{M3U_EXTM3U}\n\n'] + [
+            f'{M3U_EXTINF}{track.secs},{track.title}\n{filename}\n\n'
+            for track, filename in entries]).encode('utf-8')
 
 
-    def _load_m3u(self):
+    def _load_m3u(self, data):
         '''
         BNF:
             M3U      ::= '#EXTM3U' ENTRY+
@@ -127,7 +486,7 @@ class Playlist:
         self.clear()
         state = Want.M3U
         title, secs, prev = None, None, None # title, secs: doc; prev: errs
-        with open(self.filename, 'rt', encoding='utf-8') as file:
+        with _text(data) as file:
             for lino, line in enumerate(file, 1):
                 line = line.strip()
                 if not line:
@@ -150,7 +509,9 @@ class Playlist:
                     title = title.strip()
                     secs = int(secs.strip()) or -1
                     if title and line:
-                        self._tracks.append(Track(title, line, secs))
+                        self._tracks.append(Track(title,
+                                                  self._absolute(line),
+                                                  secs))
                     elif not title:
                         raise Error(f'{lino - 1}:missing title: {prev!r}')
                     elif not line:
@@ -160,17 +521,19 @@ class Playlist:
 
 
     def _save_pls(self):
-        with open(self.filename, 'wt', encoding='utf-8') as file:
+        with io.StringIO() as file:
             file.write(f'{PLS_PLAYLIST}\n\n')
-            for i, track in enumerate(self._tracks, start=1):
-                file.write(f'{PLS_FILE}{i}={track.filename}\n'
+            for i, (track, filename) in enumerate(
+                    zip(self._tracks, self._filenames()), start=1):
+                file.write(f'{PLS_FILE}{i}={filename}\n'
                            f'{PLS_TITLE}{i}={track.title}\n'
                            f'{PLS_LENGTH}{i}={track.secs}\n\n')
             file.write(f'{PLS_NUMENTRIES}={len(self._tracks)}\n')
             file.write(f'{PLS_VERSION}=2\n')
+            return file.getvalue().encode('utf-8')
 
 
-    def _load_pls(self):
+    def _load_pls(self, data):
         '''
         BNF:
             PLS      ::= '[playlist]' ENTRY+ NUMBEROF? VERSION?
@@ -199,7 +562,7 @@ class Playlist:
         filenames = {}
         titles = {}
         lengths = {}
-        with open(self.filename, 'rt', encoding='utf-8') as file:
+        with _text(data) as file:
             for lino, line in enumerate(file, 1):
                 line = line.strip()
                 if not line:
@@ -224,12 +587,13 @@ class Playlist:
             title = titles.get(n, None)
             secs = lengths.get(n, -1)
             if filename and title:
-                self._tracks.append(Track(title, filename, secs))
+                self._tracks.append(Track(title, self._absolute(filename),
+                                          secs))
 
 
-    def _load_xspf(self):
+    def _load_xspf(self, data):
         self.clear()
-        tree = etree.parse(self.filename)
+        tree = etree.parse(io.BytesIO(data))
         for track in tree.iter(f'{{{XSPF_NAMESPACE}}}{XSPF_TRACK}'):
             filename = track.find(f'{{{XSPF_NAMESPACE}}}{XSPF_LOCATION}')
             if filename is not None:
@@ -241,7 +605,8 @@ class Playlist:
             secs = track.find(f'{{{XSPF_NAMESPACE}}}{XSPF_DURATION}')
             secs = int(secs.text) // 1000 if secs is not None else -1
             if filename and title:
-                self._tracks.append(Track(title, filename, secs))
+                self._tracks.append(Track(title, self._absolute(filename),
+                                          secs))
 
 
     def _save_xspf(self):
@@ -249,10 +614,11 @@ class Playlist:
         builder.start(XSPF_PLAYLIST, dict(version='1',
                                           xmlns=XSPF_NAMESPACE))
         builder.start(XSPF_TRACKLIST) # pytype: disable=missing-parameter
-        for track in self._tracks:
+        for track, filename in zip(self._tracks, self._filenames()):
             builder.start(XSPF_TRACK) # pytype: disable=missing-parameter
             builder.start(XSPF_LOCATION) # pytype: disable=missing-parameter
-            builder.data(f'{FILE_SCHEME}{track.filename}')
+            builder.data(filename if not os.path.isabs(filename) else
+                         f'{FILE_SCHEME}{filename}')
             builder.end(XSPF_LOCATION)
             builder.start(XSPF_TITLE) # pytype: disable=missing-parameter
             builder.data(track.title)
@@ -266,16 +632,38 @@ class Playlist:
         builder.end(XSPF_TRACKLIST)
         builder.end(XSPF_PLAYLIST)
         tree = etree.ElementTree(builder.close())
-        tree.write(self.filename, encoding='utf-8', xml_declaration=True)
+        with io.BytesIO() as file:
+            tree.write(file, encoding='utf-8', xml_declaration=True)
+            return file.getvalue()
 
 
-    def sort(self):
-        self._tracks.sort(key=lambda track: track.filename.upper())
-        self.save()
+    def sort(self, by=None, *, reverse=False):
+        '''sorts the tracks by the given Sort (which defaults to FOLDER) in
+        natural order (e.g., "2-" before "10-") with a single save (or
+        none if they are already in order); returns True if any track
+        moved
+
+        Each track's sort key is cached so resorting is fast.
+        '''
+        if by is None:
+            by = Sort.FOLDER
+        if by is Sort.TAGS: # read the uncached tracks' tags in parallel
+            tracks = [track for track in self._tracks
+                      if track._cached_key(by) is None]
+            for track, found in zip(tracks, tags.read_many(
+                    (track.filename for track in tracks),
+                    reader=formats.read_tags)):
+                track.sort_key(by, found or NO_TAGS)
+        keys = [track.sort_key(by) for track in self._tracks]
+        return self.reorder(sorted(range(len(keys)), key=keys.__getitem__,
+                                   reverse=reverse))
 
 
     def insert(self, index, track):
+        index = _clamp(index, len(self._tracks))
         self._tracks.insert(index, track)
+        self._invalidate()
+        self._record(('insert', array.array('I', (index,)), (track,)))
         self.save()
 
 
@@ -284,6 +672,12 @@ class Playlist:
 
 
     def __iadd__(self, track):
+        if self._positions is not None:
+            index = len(self._tracks)
+            self._positions[id(track)] = index
+            self._first.setdefault(track.location, index)
+        self._record(('insert', array.array('I', (len(self._tracks),)),
+                      (track,)))
         self._tracks.append(track)
         self.save()
         return self
@@ -294,13 +688,20 @@ class Playlist:
 
 
     def __setitem__(self, index, track):
-        if self._tracks[index] != track:
+        old = self._tracks[index]
+        if old != track:
+            index = range(len(self._tracks))[index] # as recorded
             self._tracks[index] = track
+            self._invalidate()
+            self._record(('replace', index, old, track))
             self.save()
 
 
     def pop(self, index):
+        index = range(len(self._tracks))[index] # as recorded
         track = self._tracks.pop(index)
+        self._invalidate()
+        self._record(('remove', array.array('I', (index,)), (track,)))
         self.save()
         return track
 
@@ -311,7 +712,9 @@ class Playlist:
 
 class Track:
 
-    __slots__ = ('title', 'filename', 'secs')
+    # A track's filename is held as its folder (which is shared by every
+    # track in the same folder; see _interned()) and its name
+    __slots__ = ('title', '_folder', '_name', 'secs', '_key')
 
     def __init__(self, title, filename, secs=-1):
         self.title = title
@@ -319,6 +722,71 @@ class Track:
         self.secs = secs
 
 
+    @property
+    def filename(self):
+        return self._folder + self._name
+
+
+    @filename.setter
+    def filename(self, filename):
+        i = _folder_end(filename)
+        self._folder = _interned(filename[:i])
+        self._name = filename[i:]
+        self._key = None
+
+
+    @property
+    def folder(self):
+        '''returns the track's folder (with a trailing separator); this
+        is the same string object for every track in the same folder'''
+        return self._folder
+
+
+    @property
+    def location(self):
+        '''returns (folder, name), a hashable key equal to
+        location(filename) that reuses the track's strings rather than
+        building its filename'''
+        return self._folder, self._name
+
+
+    def sort_key(self, by, found=None):
+        '''returns the track's natural order key for the given Sort; the
+        key is cached until the track's title, secs or filename change
+
+        For Sort.TAGS found may be the track's tags.Tags (if they have
+        already been read).
+        '''
+        key = self._cached_key(by)
+        if key is not None:
+            return key
+        if by is Sort.FOLDER:
+            key = (_folder_key(self._folder), natural_key(self._name))
+        elif by is Sort.FILENAME:
+            key = (natural_key(self._name), _folder_key(self._folder))
+        elif by is Sort.TITLE:
+            key = (natural_key(self.title), _folder_key(self._folder),
+                   natural_key(self._name))
+        elif by is Sort.DURATION:
+            key = (self.secs, natural_key(self.title))
+        else: # Sort.TAGS
+            if found is None:
+                found = formats.read_tags(self.filename) or NO_TAGS
+            key = (natural_key(found.artist or ''),
+                   natural_key(found.album or ''), found.track or 0,
+                   natural_key(found.title or self.title))
+        self._key = (by, self.title, self.secs, key)
+        return key
+
+
+    def _cached_key(self, by):
+        cached = self._key
+        if (cached is not None and cached[0] is by and
+                cached[1] is self.title and cached[2] == self.secs):
+            return cached[3]
+        return None
+
+
     @property
     def humanized_length(self, *, min_sign='′', sec_sign='″'):
         if self.secs <= 0:
@@ -341,56 +809,464 @@ class Track:
                 f'{self.filename!r}, {self.secs!r})')
 
 
+class ParsedCache:
+    '''An on-disk cache of parsed playlists
+
+    Each playlist is kept in its own marshalled file (with each distinct
+    folder stored once and its tracks' folder indexes and lengths packed
+    into arrays' bytes) and is only used if the
+    playlist's path, size and modification time all match. Reading an
+    entry marks it as recently used; whenever an entry is added the least
+    recently used entries are evicted until the cache fits in max_bytes.
+    '''
+
+    def __init__(self, folder=None, *, max_bytes=None):
+        if folder is None:
+            folder = os.path.join(cache_path(), 'parsed')
+        self.folder = str(folder)
+        self.max_bytes = MAX_PARSED_CACHE if max_bytes is None else max_bytes
+        os.makedirs(self.folder, exist_ok=True)
+
+
+    def get(self, filename, stat):
+        '''returns the (signature, relative, tracks) of the given playlist
+        if its cache entry is valid for stat, otherwise None'''
+        filename = os.path.abspath(filename)
+        name = self._name(filename)
+        try:
+            with open(name, 'rb') as file:
+                data = marshal.loads(file.read()) # much faster than load()
+            (version, path, size, mtime_ns, signature, relative, titles,
+             folders, indexes, names, secs) = data
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        if (version != _VERSION or path != filename or
+                size != stat.st_size or mtime_ns != stat.st_mtime_ns):
+            return None
+        lengths = array.array('l')
+        lengths.frombytes(secs)
+        folder_indexes = array.array('I')
+        folder_indexes.frombytes(indexes)
+        folders = [_interned(folder) for folder in folders]
+        with contextlib.suppress(OSError):
+            os.utime(name) # mark as recently used
+        return signature, relative, [
+            _track(title, folders[i], name, secs) for title, i, name, secs
+            in zip(titles, folder_indexes, names, lengths)]
+
+
+    def put(self, filename, stat, signature, relative, tracks):
+        filename = os.path.abspath(filename)
+        folders = {}
+        indexes = array.array('I', (folders.setdefault(track._folder,
+                                                       len(folders))
+                                    for track in tracks))
+        data = (_VERSION, filename, stat.st_size, stat.st_mtime_ns, signature,
+                relative, tuple(track.title for track in tracks),
+                tuple(folders), indexes.tobytes(),
+                tuple(track._name for track in tracks),
+                array.array('l', (track.secs for track in tracks)).tobytes())
+        try:
+            write_atomically(self._name(filename), marshal.dumps(data),
+                             durable=False)
+            self._evict()
+        except OSError:
+            pass # the cache is only an optimization
+
+
+    def clear(self):
+        for entry in os.scandir(self.folder):
+            with contextlib.suppress(OSError):
+                os.remove(entry.path)
+
+
+    def _name(self, filename):
+        key = hashlib.sha1(filename.encode('utf-8', 'surrogateescape'))
+        return os.path.join(self.folder, f'{key.hexdigest()[:16]}.bin')
+
+
+    def _evict(self):
+        entries = []
+        total = 0
+        for entry in os.scandir(self.folder):
+            stat = entry.stat()
+            entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+            total += stat.st_size
+        if total > self.max_bytes:
+            entries.sort() # least recently used first
+            for _, size, name in entries:
+                with contextlib.suppress(OSError):
+                    os.remove(name)
+                    total -= size
+                if total <= self.max_bytes:
+                    break
+
+
+class RecentPlaylists:
+    '''An in-memory LRU cache of recently used Playlist objects
+
+    A cached playlist is only returned if its file hasn't changed since
+    it was last loaded or saved (which costs a stat but no reading or
+    parsing). Each playlist's memory use is estimated when it is added
+    and the least recently used playlists are evicted to keep the total
+    within max_bytes (although the most recent is always kept).
+    '''
+
+    def __init__(self, *, max_bytes=None):
+        self.max_bytes = MAX_RECENT if max_bytes is None else max_bytes
+        self._playlists = collections.OrderedDict() # path: (tracks, size)
+        self._total = 0
+
+
+    def __len__(self):
+        return len(self._playlists)
+
+
+    def get(self, filename):
+        '''returns the Playlist for filename from memory if it is current
+        or else loads (and remembers) it'''
+        key = os.path.abspath(str(filename))
+        entry = self._playlists.get(key)
+        if entry is not None:
+            tracks = entry[0]
+            if tracks.is_current():
+                self._playlists.move_to_end(key)
+                return tracks
+            self.discard(key)
+        tracks = Playlist(filename)
+        size = _footprint(tracks)
+        self._playlists[key] = (tracks, size)
+        self._total += size
+        while self._total > self.max_bytes and len(self._playlists) > 1:
+            _, (_, size) = self._playlists.popitem(last=False)
+            self._total -= size
+        return tracks
+
+
+    def discard(self, filename):
+        entry = self._playlists.pop(os.path.abspath(str(filename)), None)
+        if entry is not None:
+            self._total -= entry[1]
+
+
+    def clear(self):
+        self._playlists.clear()
+        self._total = 0
+
+
 class Error(Exception):
     pass
 
 
 def is_playlist(filename):
-    return filename.upper().endswith((M3U, PLS, XSPF))
+    return split_suffix(filename)[0] in FORMATS
+
+
+def split_suffix(filename):
+    '''returns filename's uppercased format suffix and compression suffix
+    (which is '' if it isn't compressed), e.g., ('.M3U', '.GZ') for
+    'jazz.m3u.gz' and ('.XSPF', '') for 'jazz.xspf'
+    '''
+    root, suffix = os.path.splitext(filename)
+    suffix = suffix.upper()
+    if suffix in COMPRESSIONS:
+        return os.path.splitext(root)[1].upper(), suffix
+    return suffix, ''
 
 
 def is_track(filename):
-    return filename.upper().endswith(('.MP3', '.OGG', '.OGA'))
+    '''returns True if filename has a suffix in the formats registry'''
+    return formats.is_track(filename)
 
 
-def filter(folder):
-    '''yield all the supported music files in folder'''
-    for root, _, files in os.walk(folder):
-        for filename in files:
-            if is_track(filename):
-                yield os.path.join(root, filename)
+def location(filename):
+    '''returns filename as a (folder, name) key like Track.location'''
+    i = _folder_end(filename)
+    return filename[:i], filename[i:]
 
 
-def build(folder, *, format=M3U):
+def filter(folder, *, follow_symlinks=False, progress=None):
+    '''yield all the supported music files in folder (and its non-hidden
+    subfolders) in sorted order; see walk.walk() for the arguments'''
+    yield from walk.files(folder, formats.is_track,
+                          follow_symlinks=follow_symlinks, progress=progress)
+
+
+def build(folder, *, format=M3U, relative=False, use_tags=False):
     '''build a playlist for the given folder (and subfolders)
 
     The filename is set to <folder>.m3u or to <folder>.<format> if
-    format is not None.
+    format is not None. If relative is True the tracks' filenames are
+    saved relative to the playlist. If use_tags is True each track's
+    title is read from its tags (see titled_tracks()) and the tracks are
+    sorted by their tags.
     '''
     playlist_filename = os.path.basename(str(folder)) + format.lower()
-    tracks = Playlist(playlist_filename)
-    for filename in filter(folder):
-        tracks += Track(normalize_name(filename), filename)
-    tracks.sort()
+    tracks = Playlist(playlist_filename, relative=relative)
+    with tracks.batch(): # save once rather than once per track
+        if use_tags:
+            for track in titled_tracks(filter(folder)):
+                tracks += track
+            tracks.sort(Sort.TAGS) # the tags are already cached
+        else:
+            for filename in filter(folder):
+                tracks += Track(normalize_name(filename), filename)
+            tracks.sort()
+    return tracks
+
+
+def titled_tracks(filenames):
+    '''returns a list of a Track for each filename titled from its title
+    tag, or from its filename if it has none
+
+    The tags are read in parallel and each Track caches the Sort.TAGS
+    key derived from them (i.e., from its artist, album and track number
+    tags) so that sorting by tags doesn't reread them.
+    '''
+    filenames = list(filenames)
+    tracks = []
+    for filename, found in zip(filenames, tags.read_many(
+            filenames, reader=formats.read_tags)):
+        title = found.title if found is not None else None
+        track = Track(title or normalize_name(filename), filename)
+        track.sort_key(Sort.TAGS, found or NO_TAGS)
+        tracks.append(track)
     return tracks
 
 
+@enum.unique
+class Sort(enum.Enum):
+    FOLDER = 'Folder and Track Number'
+    FILENAME = 'Filename'
+    TITLE = 'Title'
+    DURATION = 'Duration'
+    TAGS = 'Artist, Album and Track Number Tags'
+
+
+def natural_key(text):
+    '''returns a key for text that sorts it case-insensitively with its
+    numbers in numeric order (e.g., "Track 2" before "track 10")'''
+    parts = DIGITS_RX.split(text.casefold())
+    parts[1::2] = map(int, parts[1::2])
+    return tuple(parts)
+
+
+@functools.lru_cache(maxsize=4096)
+def _folder_key(folder):
+    return natural_key(folder)
+
+
+class Normalizer:
+    '''Turns music filenames into track titles by applying the given
+    rules (which default to DEFAULT_RULES) in RULES order
+
+    Every title has its folder and suffix removed and then, depending on
+    the rules:
+        DISC        a disc prefix is removed (e.g., 'cd2-' or '2-' in
+                    '2-07-Song' but not the '07-' in '07-Song')
+        TRACK       a track number prefix is removed (e.g., '07-' or
+                    'a7-')
+        UNDERSCORES each underscore is replaced by a space
+
+    The prefix rules are compiled into a single regex when the
+    Normalizer is created so each title costs one match plus a few
+    partitions and slices (see bench.py).
+
+    normalizer = Normalizer((TRACK, DISC, UNDERSCORES))
+    titles = list(normalizer.names(filenames))
+    '''
+
+    def __init__(self, rules=None):
+        self.rules = frozenset(DEFAULT_RULES if rules is None else rules)
+        unknown = self.rules - set(RULES)
+        if unknown:
+            raise Error(f'unknown normalization rules: {sorted(unknown)}')
+        prefix = ''.join(RULES[rule] for rule in RULES
+                         if rule in self.rules and RULES[rule])
+        self._prefix_rx = re.compile(prefix) if prefix else None
+        self._underscores = UNDERSCORES in self.rules
+
+
+    def __call__(self, name):
+        name = name.rpartition('/')[2].rpartition('\\')[2]
+        name = name.rpartition('.')[0] or name
+        if self._prefix_rx is not None:
+            end = self._prefix_rx.match(name).end() # always matches
+            if 0 < end < len(name):
+                name = name[end:]
+        if self._underscores:
+            name = name.replace('_', ' ')
+        return name
+
+
+    def names(self, names):
+        '''yields the title for each of the given names'''
+        return map(self, names)
+
+
 def normalize_name(name):
-    normalize_rx = re.compile(
-        r'^(?:[a-z]*\d+-)?(?P<name>.*)\.(?i:mp3|og[ga])$')
-    i = name.rfind('/')
-    if i == -1:
-        i = name.rfind('\\')
-    if i != -1:
-        name = name[i + 1:]
-    match = normalize_rx.match(name)
-    if match is not None:
-        name = match.group('name')
-    else:
-        i = name.rfind('.')
-        if i > -1:
-            name = name[:i]
-    return name.replace('_', ' ')
+    '''returns a title for the given music filename using the default
+    Normalizer'''
+    return _normalizer(name)
+
+
+def normalize_names(names):
+    '''yields a title for each of the given music filenames using the
+    default Normalizer'''
+    return map(_normalizer, names)
+
+
+def write_atomically(filename, data, *, durable=True, compression=''):
+    '''writes data (bytes) to filename so that after a crash filename
+    holds either its old or its new content but never a mixture
+
+    The data is written (and compressed as it is written if compression
+    is one of the COMPRESSIONS) to a temporary file in the same folder
+    (so that it is on the same filesystem), flushed to disk (unless
+    durable is False, e.g., for caches) and only then renamed over
+    filename.
+    '''
+    filename = os.path.abspath(filename)
+    temp = f'{filename}.{os.getpid()}.tmp'
+    try:
+        with open(temp, 'wb') as raw:
+            with _codec_file(raw, compression, 'wb') as file:
+                file.write(data)
+            if durable:
+                raw.flush()
+                os.fsync(raw.fileno())
+        try:
+            shutil.copymode(filename, temp) # keep the original permissions
+        except OSError:
+            pass # filename is new
+        os.replace(temp, filename)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(temp)
+        raise
+    if durable:
+        _fsync_folder(os.path.dirname(filename)) # make the rename durable
+
+
+def _append(filename, data, compression=''):
+    with open(filename, 'ab') as raw:
+        with _codec_file(raw, compression, 'wb') as file:
+            file.write(data)
+        raw.flush()
+        os.fsync(raw.fileno())
+
+
+def _codec_file(file, compression, mode):
+    # Returns a file object that (de)compresses as it reads or writes the
+    # given (open binary) file without closing it
+    if compression == GZ:
+        return gzip.GzipFile(fileobj=file, mode=mode, mtime=0)
+    if compression == BZ2:
+        return bz2.BZ2File(file, mode)
+    if compression == XZ:
+        return lzma.LZMAFile(file, mode)
+    return contextlib.nullcontext(file)
+
+
+def _signature(data):
+    # The length and digest of a playlist's (uncompressed) content
+    return len(data), hashlib.sha1(data).digest()
+
+
+def _fsync_folder(folder):
+    if hasattr(os, 'O_DIRECTORY'): # not on Windows
+        with contextlib.suppress(OSError):
+            fd = os.open(folder, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+
+def _stat(filename):
+    try:
+        stat = os.stat(filename)
+        return stat.st_size, stat.st_mtime_ns
+    except OSError:
+        return None, None
+
+
+def _footprint(tracks):
+    # Estimates the memory used by the tracks and their (unshared) strings
+    return len(tracks) * TRACK_OVERHEAD + sum(
+        sys.getsizeof(track.title) + sys.getsizeof(track._name)
+        for track in tracks)
+
+
+def _track(title, folder, name, secs):
+    # Creates a Track from its parts (folder must be _interned())
+    track = Track.__new__(Track)
+    track.title = title
+    track._folder = folder
+    track._name = name
+    track.secs = secs
+    track._key = None
+    return track
+
+
+def _folder_end(filename):
+    # Returns the index just after the last path separator or 0
+    i = filename.rfind('/')
+    if os.altsep is not None or os.sep != '/':
+        i = max(i, filename.rfind('\\'))
+    return i + 1
+
+
+def _interned(folder):
+    # Returns the one shared copy of the given folder string so that every
+    # track in the same folder holds the same string object
+    return _folders.setdefault(folder, folder)
+
+
+_folders = {} # folder: folder (the prefix table used by _interned())
+
+
+def _relative_folder(folder, base):
+    # Returns folder relative to base (with a trailing separator unless
+    # it is base itself) or folder if it can't be made relative
+    if not os.path.isabs(folder) or URL_SCHEME in folder:
+        return folder
+    try:
+        folder = os.path.relpath(folder, base)
+    except ValueError: # e.g., on a different Windows drive
+        return folder
+    return '' if folder == os.curdir else os.path.join(folder, '')
+
+
+def _text(data):
+    # Decodes like open(..., 'rt', encoding='utf-8') (i.e., with universal
+    # newlines) so that the loaders can parse data line by line
+    return io.StringIO(data.decode('utf-8'), newline=None)
+
+
+def _clamp(index, length):
+    # Returns the index list.insert() would actually insert at
+    return slice(index, None).indices(length)[0]
+
+
+def cache_path():
+    '''returns the folder where PLE's caches are kept (creating it if
+    necessary)'''
+    path = os.path.join(os.environ.get('XDG_CACHE_HOME') or
+                        os.path.expanduser('~/.cache'), 'ple')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def parsed_cache():
+    '''returns the shared ParsedCache (creating it when first needed)'''
+    global _parsed_cache
+    if _parsed_cache is None:
+        _parsed_cache = ParsedCache()
+    return _parsed_cache
+
+
+_parsed_cache = None
 
 
 def humanized_length(secs, *, min_sign='′', sec_sign='″', sec_dp=0):
@@ -409,6 +1285,17 @@ def humanized_length(secs, *, min_sign='′', sec_sign='″', sec_dp=0):
     return f'{max(1, secs):.{sec_dp}f}{sec_sign}'
 
 
+NO_TAGS = tags.Tags(None, None, None, None)
+DISC = 'disc'
+TRACK = 'track'
+UNDERSCORES = 'underscores'
+RULES = { # rule: regex prefix (the order matters)
+    DISC: r'(?:(?i:cd|dis[ck])\s*\d+\s*[-_. ]\s*|\d{1,2}-(?=[a-z]*\d+-))?',
+    TRACK: r'(?:[a-z]*\d+-)?',
+    UNDERSCORES: ''}
+DEFAULT_RULES = (TRACK, UNDERSCORES) # the same as normalize_name() was
+_normalizer = Normalizer() # used by normalize_name() and normalize_names()
+DIGITS_RX = re.compile(r'(\d+)')
 M3U_EXTM3U = '#EXTM3U'
 M3U_EXTINF = '#EXTINF:'
 PLS_PLAYLIST = '[playlist]'
@@ -425,11 +1312,14 @@ XSPF_LOCATION = 'location'
 XSPF_TITLE = 'title'
 XSPF_DURATION = 'duration'
 FILE_SCHEME = 'file://'
+URL_SCHEME = '://'
+MAX_PARSED_CACHE = 64 * 1024 * 1024 # bytes
+MAX_RECENT = 128 * 1024 * 1024 # bytes (estimated)
+TRACK_OVERHEAD = 200 # bytes: a Track, its secs, list slot & index entries
+_VERSION = 3 # of the ParsedCache's entries
 
 
 if __name__ == '__main__':
-    import sys
-
     def main():
         usage = USAGE.format(name=os.path.basename(sys.argv[0]))
         if len(sys.argv) == 1 or sys.argv[1] in {'h', 'help', '-h',
@@ -440,20 +1330,37 @@ if __name__ == '__main__':
         if not args:
             raise SystemExit(usage)
         if what in {'b', 'build'}:
-            if len(args) > 2:
-                raise SystemExit(usage)
             cli_build(args)
         elif what in {'c', 'convert'}:
             if len(args) < 2:
                 raise SystemExit(usage)
             cli_convert(args)
+        elif what in {'d', 'dedupe'}:
+            cli_dedupe(args)
         elif what in {'i', 'info'}:
             cli_info(args)
+        elif what in {'r', 'repair'}:
+            if len(args) < 2:
+                raise SystemExit(usage)
+            cli_repair(args)
+        elif what in {'s', 'search'}:
+            if len(args) < 2:
+                raise SystemExit(usage)
+            cli_search(args)
+        elif what in {'w', 'where'}:
+            if len(args) > 2:
+                raise SystemExit(usage)
+            cli_where(args)
         else:
             raise SystemExit(usage)
 
 
     def cli_build(args):
+        use_tags = bool({'-t', '--tags'} & set(args))
+        args = [arg for arg in args if arg not in {'-t', '--tags'}]
+        if not args or len(args) > 2:
+            raise SystemExit(USAGE.format(
+                name=os.path.basename(sys.argv[0])))
         if len(args) == 2:
             format = args[0].lower()
             if not format.startswith('.'):
@@ -462,36 +1369,99 @@ if __name__ == '__main__':
         else:
             format = M3U.lower()
             folder = args[0].rstrip('/\\')
-        tracks = build(folder, format=format)
+        tracks = build(folder, format=format, use_tags=use_tags)
         print(f'wrote {tracks.filename}')
 
 
     def cli_convert(args):
-        format = args[0].lower()
-        if not format.startswith('.'):
-            format = '.' + format
-        uformat = format.upper()
-        for filename in args[1:]:
-            if not is_playlist(filename):
+        target = args[0].upper().lstrip('.')
+        if target == 'PLAIN': # keep each format but uncompressed
+            format, compression = None, ''
+        elif '.' + target in COMPRESSIONS: # keep each format
+            format, compression = None, '.' + target
+        else:
+            format, compression = split_suffix('x.' + target)
+            if format not in FORMATS:
+                raise SystemExit(f'unrecognized format: {args[0]}')
+        for filename in cli_playlists(args[1:]):
+            old_format, old_compression = split_suffix(filename)
+            if old_format not in FORMATS:
                 print(f'ignoring {filename}: unknown format')
-            elif filename.upper().endswith(uformat):
+                continue
+            new_suffix = ((format or old_format) + compression).lower()
+            if (old_format + old_compression).lower() == new_suffix:
                 print(f'skipping {filename}: already in target format')
-            else: # filename contains '.' because it ends with format
-                tracks = Playlist(filename)
-                tracks.save(filename[:filename.rfind('.')] + format)
+            else:
+                root = filename[:len(filename) - len(old_format) -
+                                len(old_compression)]
+                tracks = Playlist(filename, cache=False)
+                tracks.save(root + new_suffix)
                 print(f'wrote {tracks.filename}')
 
 
+    def cli_dedupe(args):
+        import dedupe
+
+        options = {arg for arg in args if arg.startswith('-')}
+        content = bool(options & {'-c', '--content'})
+        remove = bool(options & {'-r', '--remove'})
+        across = bool(options & {'-a', '--across'})
+        if options - {'-a', '--across', '-c', '--content', '-r',
+                      '--remove'}:
+            raise SystemExit(USAGE.format(
+                name=os.path.basename(sys.argv[0])))
+        playlists = []
+        for filename in cli_playlists(
+                [arg for arg in args if not arg.startswith('-')]):
+            try:
+                playlists.append(Playlist(filename))
+            except Error:
+                pass
+            except OSError as err:
+                print(err)
+        groups = dedupe.find(playlists, content=content)
+        for group in groups:
+            first, *others = group.entries
+            print(f'{first.tracks.filename}:{first.index + 1}: '
+                  f'{first.filename}')
+            for entry in others:
+                print(f'    {group.kind} duplicate: '
+                      f'{entry.tracks.filename}:{entry.index + 1}: '
+                      f'{entry.filename}')
+        count = len(dedupe.removable(groups, across=across))
+        if remove and count:
+            count = dedupe.remove(groups, across=across)
+            print(f'removed {count:,d} duplicates')
+        else:
+            print(f'{count:,d} removable duplicates')
+
+    def cli_playlists(names):
+        '''yields each name and every playlist in each folder name (and
+        its subfolders)'''
+        for folder_or_file in names:
+            if os.path.isdir(folder_or_file):
+                yield from walk.files(folder_or_file, cli_is_playlist)
+            else:
+                yield folder_or_file
+
+    def cli_is_playlist(name):
+        return not name.startswith('.') and is_playlist(name)
+
+
     def cli_info(args):
         for filename in args:
             if is_playlist(filename):
                 try:
                     tracks = Playlist(filename)
+                    missing = 0
                     for track in tracks:
                         if not os.path.isfile(track.filename):
                             print(f'playlist {tracks.filename} has missing '
                                   f'track: {track.filename}')
-                            break
+                            missing += 1
+                    if missing:
+                        print(f'{missing: 5,d} of {len(tracks):,d} tracks '
+                              f'missing: {tracks.filename}')
                     else:
                         print(f'{len(tracks): 5,d} tracks taking '
                               f'{tracks.humanized_length}: '
@@ -501,17 +1471,92 @@ if __name__ == '__main__':
                 except OSError as err:
                     print(err)
 
+    def cli_repair(args):
+        import dedupe
+        import repair
+
+        index = repair.MusicIndex(args[0].rstrip('/\\'))
+        sizes = dedupe.Hashes().sizes()
+        for filename in args[1:]:
+            if is_playlist(filename):
+                try:
+                    tracks = Playlist(filename)
+                    moved, missing = repair.relocate(tracks, index,
+                                                     sizes=sizes)
+                    for old, new in moved:
+                        print(f'relocated {old} → {new}')
+                    for old in missing:
+                        print(f'playlist {tracks.filename} has missing '
+                              f'track: {old}')
+                    print(f'{len(moved): 5,d} relocated and '
+                          f'{len(missing):,d} missing: {tracks.filename}')
+                except Error:
+                    pass
+                except OSError as err:
+                    print(err)
+
+    def cli_search(args):
+        import catalog
+        import search
+
+        index = search.SearchIndex(catalog.Catalog(args[0]))
+        index.update()
+        for hit in index.search(' '.join(args[1:]), limit=None):
+            print(f'{hit.playlist}:{hit.index + 1}: {hit.title} '
+                  f'({hit.filename})')
+
+    def cli_where(args):
+        import catalog
+
+        filename = os.path.abspath(args[0])
+        tracks_catalog = catalog.Catalog(args[1] if len(args) == 2 else '.')
+        tracks_catalog.refresh()
+        names = tracks_catalog.where(filename)
+        for name in names:
+            print(name)
+        if not names:
+            print(f'no playlists in {tracks_catalog.folder} use {filename}')
+
     USAGE = '''usage:
-{name} <b|build> [format] <folder>
+{name} <b|build> [-t|--tags] [format] <folder>
     Build a playlist based on the music files in folder and its subfolders
     and save it as dirname.format where dirname is the last component of
-    folder's name and format is one of 'm3u', 'pls', 'xspf'.
+    folder's name and format is one of 'm3u', 'pls', 'xspf' (optionally
+    compressed, e.g., 'm3u.xz'). With --tags the titles are read from the
+    files' tags and the tracks are sorted by artist, album and track
+    number tags.
 {name} <c|convert> <format> <playlist1> [playlist2 [... [playlistN]]]
     Convert the or each playlist.ext to playlist.format where format is one
-    of 'm3u', 'pls', 'xspf'.
+    of 'm3u', 'pls', 'xspf', optionally followed by '.gz', '.bz2' or '.xz'
+    for compression (e.g., 'm3u.gz'). If format is just 'gz', 'bz2' or 'xz'
+    each playlist keeps its format but is (re)compressed, or if it is
+    'plain', uncompressed. A playlist may be a folder in which case every
+    playlist in it and its subfolders is converted. (The original
+    playlists are left in place.)
+{name} <d|dedupe> [-a|--across] [-c|--content] [-r|--remove] <playlist1>
+        [playlist2 [... [playlistN]]]
+    Output every track that duplicates an earlier one in the given
+    playlist(s) or across them: the same file, or a file with the same size
+    and duration, or, with --content, a file with the same audio (ignoring
+    tags). A playlist may be a folder in which case every playlist in it
+    and its subfolders is checked. With --remove each duplicate of an
+    earlier track in the same playlist is removed (or with --across, each
+    duplicate of an earlier track in any of the playlists) and each changed
+    playlist saved.
 {name} <i|info> <playlist1> [playlist2 [... [playlistN]]]
     Output the name and number of tracks in the given playlist(s) or report
-    an error if one or more tracks doesn't actually exist.
+    every track that doesn't actually exist.
+{name} <r|repair> <folder> <playlist1> [playlist2 [... [playlistN]]]
+    Relocate every missing track in the given playlist(s) to the music file
+    in folder (or its subfolders) with the same name, choosing the one in
+    the most similar subfolder if there's more than one, and save each
+    changed playlist.
+{name} <s|search> <folder> <word1> [word2 [... [wordN]]]
+    Output every track in every playlist in folder (or its subfolders)
+    whose title or filename has a word that starts with each given word.
+{name} <w|where> <track> [folder]
+    Output the name of every playlist in folder (or its subfolders) that
+    contains the given track; folder defaults to the current folder.
 {name} <h|help>
     Show this help message and quit.'''
 
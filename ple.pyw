@@ -2,36 +2,89 @@
 # Copyright © 2021 Mark Summerfield. All rights reserved.
 # License: GPLv3
 
-import pathlib
-import tkinter as tk
-import tkinter.font as tkfont
+import sys
+import time
 
-import Config
-import Window
-from Const import APPNAME, VERSION
+import instance
 
 
 def main():
+    started = time.perf_counter()
+    args = sys.argv[1:]
+    timing = bool({'-t', '--timing'} & set(args))
+    args = [arg for arg in args if arg not in {'-t', '--timing'}]
+    if len(args) > 2 or (args and args[0] in {'-h', '--help'}):
+        raise SystemExit(USAGE)
+    # Hand the arguments to the running instance (if there is one) before
+    # paying for Tk, GStreamer and Config (whose atexit save would
+    # otherwise overwrite the running instance's configuration)
+    if instance.forward(args):
+        return
+    try:
+        server = instance.listen()
+    except OSError as err: # run without forwarding from later instances
+        print(f'cannot listen for other instances: {err}', file=sys.stderr)
+        server = None
+    else:
+        if server is None: # lost a race or the other instance is stuck
+            if instance.forward(args):
+                return
+            raise SystemExit('ple is already running but did not respond')
+    try:
+        run(args, server, started if timing else None)
+    finally:
+        if server is not None:
+            instance.close(server)
+
+
+def run(args, server, started):
+    import tkinter as tk
+
+    import Config
+    import Images
+    import Window
+    from Const import APPNAME, VERSION
+
     app = tk.Tk()
     app.withdraw()
     app.minsize(640, 480)
-    set_default_fonts(app)
     config = Config.config
+    set_default_fonts(config.base_font_size)
     app.geometry(config.geometry)
     app.title(f'{APPNAME} v{VERSION}')
     app.option_add('*tearOff', False)
     app.option_add('*insertOffTime', config.cursor_blink_rate)
-    imagepath = pathlib.Path(__file__).resolve().parent / 'images/'
-    app.iconphoto(True, tk.PhotoImage(file=imagepath / 'ple.png'))
-    window = Window.Window(app, imagepath)
+    app.iconphoto(True, Images.get('ple.png'))
+    window = Window.Window(app)
     app.protocol('WM_DELETE_WINDOW', window.on_close)
+
+    def on_started():
+        if server is not None:
+            instance.watch(app, server, window.open_arguments)
+        if args:
+            window.open_arguments(args)
+        if started is not None:
+            report_startup(started, painted, window.startup_times)
+
     app.deiconify()
+    app.wait_visibility() # show the window before doing anything else
+    app.update_idletasks()
+    painted = time.perf_counter()
+    window.start(on_started)
     app.mainloop()
 
 
-def set_default_fonts(app):
-    config = Config.config
-    size = config.base_font_size
+def report_startup(started, painted, times):
+    print(f'    first paint: {(painted - started) * 1000:6.0f}ms')
+    for name, when in times:
+        print(f'{name:>15}: {(when - started) * 1000:6.0f}ms')
+    print(f'    interactive: {(times[-1][1] - started) * 1000:6.0f}ms')
+
+
+def set_default_fonts(size):
+    import tkinter as tk
+    import tkinter.font as tkfont
+
     for name in ('TkCaptionFont', 'TkDefaultFont', 'TkFixedFont',
                  'TkMenuFont', 'TkIconFont', 'TkTextFont'):
         tkfont.nametofont(name).configure(size=size)
@@ -42,5 +95,12 @@ def set_default_fonts(app):
         tkfont.nametofont(name).configure(size=size)
 
 
+USAGE = '''usage: ple.pyw [-t|--timing] [playlist [track]]
+Opens the playlist (if given) and plays its track (if given) where track
+is a filename or a number counting from 1. If ple is already running the
+running instance does this instead. With --timing outputs how long each
+stage of startup took (from when main() was called).'''
+
+
 if __name__ == '__main__':
     main()
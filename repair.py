@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# Copyright © 2021 Mark Summerfield. All rights reserved.
+# License: GPLv3
+
+'''
+Relocate playlist tracks whose files have been moved.
+
+Usage:
+    index = repair.MusicIndex(music_path)
+    moved, missing = repair.relocate(tracks, index,
+                                     sizes=dedupe.Hashes().sizes())
+'''
+
+import os
+
+import playlist
+
+
+class MusicIndex:
+    '''An in-memory index of the music files in the given folder (and its
+    subfolders) keyed by (casefolded) basename
+
+    Sizes are only read (and then cached) when needed to choose between
+    several files that have the same basename.
+    '''
+
+    def __init__(self, folder):
+        self.folder = os.path.join(os.path.abspath(str(folder)), '')
+        self._filenames = set()
+        self._by_name = {}
+        self._sizes = {}
+        for filename in playlist.filter(self.folder):
+            self._filenames.add(filename)
+            self._by_name.setdefault(_key(filename), []).append(filename)
+
+
+    def __len__(self):
+        return len(self._filenames)
+
+
+    def __contains__(self, filename):
+        return filename in self._filenames
+
+
+    def exists(self, filename):
+        '''returns True if filename exists; this avoids a stat for the
+        files that were indexed (files the index doesn't cover, e.g., in
+        hidden or symlinked folders or with unregistered suffixes, are
+        checked on disk)'''
+        return filename in self._filenames or os.path.exists(filename)
+
+
+    def resolve(self, filename, size=None):
+        '''returns the most likely new location for filename or None
+
+        If there is more than one candidate, the one with the given size
+        is preferred (if size is known), and then the one whose folders
+        best match the original filename's folders.
+        '''
+        candidates = self._by_name.get(_key(filename))
+        if not candidates:
+            return None
+        if len(candidates) == 1:
+            return candidates[0]
+        if size is not None:
+            sized = [candidate for candidate in candidates
+                     if self._size(candidate) == size]
+            if len(sized) == 1:
+                return sized[0]
+            if sized:
+                candidates = sized
+        parts = _parts(filename)
+        return max(candidates,
+                   key=lambda candidate: _common_tail(parts,
+                                                      _parts(candidate)))
+
+
+    def _size(self, filename):
+        size = self._sizes.get(filename)
+        if size is None:
+            try:
+                size = os.path.getsize(filename)
+            except OSError:
+                size = -1
+            self._sizes[filename] = size
+        return size
+
+
+def relocate(tracks, index, *, sizes=None):
+    '''changes the filename of every missing track in tracks to its most
+    likely new location according to index; sizes may map filenames to
+    their sizes when they were last seen (e.g., dedupe.Hashes.sizes()) to
+    choose between candidates with the same basename
+
+    Returns a list of (old, new) filenames for the tracks that were
+    relocated and a list of the filenames that couldn't be resolved. The
+    relocations are saved once and are undone and redone as one step.
+    '''
+    moved = []
+    missing = []
+    with tracks.batch():
+        for i, track in enumerate(tracks):
+            if not index.exists(track.filename):
+                size = None if sizes is None else sizes.get(track.filename)
+                filename = index.resolve(track.filename, size)
+                if filename is None:
+                    missing.append(track.filename)
+                else:
+                    moved.append((track.filename, filename))
+                    tracks[i] = playlist.Track(track.title, filename,
+                                               track.secs)
+    return moved, missing
+
+
+def _key(filename):
+    return os.path.basename(filename).casefold()
+
+
+def _parts(filename):
+    return os.path.dirname(filename).casefold().split(os.sep)
+
+
+def _common_tail(a, b):
+    count = 0
+    for x, y in zip(reversed(a), reversed(b)):
+        if x != y:
+            break
+        count += 1
+    return count
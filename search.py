@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# Copyright © 2021 Mark Summerfield. All rights reserved.
+# License: GPLv3
+
+'''
+Full-text search of the titles and filenames of every track in every
+playlist in a catalog.
+
+Usage:
+    tracks_catalog = catalog.Catalog(playlists_path)
+    index = search.SearchIndex(tracks_catalog)
+    index.update() # refreshes the catalog and reindexes what changed
+    for hit in index.search('queen you'):
+        print(hit.playlist, hit.filename, hit.title)
+'''
+
+import bisect
+import collections
+import heapq
+import os
+import re
+
+
+Hit = collections.namedtuple('Hit', 'playlist index filename title')
+
+
+class SearchIndex:
+    '''An inverted index of title and filename words with prefix matching
+
+    Every query word matches any indexed word it is a prefix of, and a
+    track matches a query if every query word matches. Only playlists
+    that the catalog has (re)read since the last update() are reindexed.
+
+    Entry ids only ever increase so each posting list is sorted. The
+    entries of a dropped playlist are forgotten at once but their ids
+    are only purged from the posting lists (by reindexing everything)
+    when the garbage outweighs the live entries.
+    '''
+
+    def __init__(self, tracks_catalog):
+        self.tracks_catalog = tracks_catalog
+        self.clear()
+
+
+    def clear(self):
+        self._stamps = {} # playlist name: (size, mtime_ns)
+        self._ids = {} # playlist name: range of entry ids
+        self._entries = {} # entry id: (name, index, key)
+        self._postings = {} # word: sorted list of entry ids
+        self._words = [] # sorted list of the keys of _postings
+        self._words_changed = False
+        self._next_id = 0
+        self._garbage = 0
+
+
+    def __len__(self):
+        return len(self._entries)
+
+
+    def update(self):
+        '''refreshes the catalog and reindexes new and changed playlists;
+        returns the number of playlists (re)indexed or dropped'''
+        self.tracks_catalog.refresh()
+        names = set(self.tracks_catalog)
+        changed = 0
+        for name in set(self._stamps) - names:
+            self._drop(name)
+            changed += 1
+        for name in sorted(names):
+            stamp = self.tracks_catalog.stamp(name)
+            if self._stamps.get(name) != stamp:
+                self._drop(name)
+                self._add(name, stamp)
+                changed += 1
+        if self._garbage > len(self._entries):
+            self.clear()
+            return self.update()
+        return changed
+
+
+    def search(self, query, *, limit=1000):
+        '''returns a list of up to limit Hits for the tracks that match
+        every word in query (in playlist order)'''
+        query_words = sorted(set(words(query)), key=len, reverse=True)
+        if not query_words:
+            return []
+        if self._words_changed:
+            self._words = sorted(self._postings)
+            self._words_changed = False
+        # Use the longest (i.e., likely most selective) word to find the
+        # candidates and then filter them by each of the other words
+        prefixed = self._prefixed(query_words[0])
+        if len(prefixed) > MAX_MERGE:
+            # Matches are so common it is faster to scan in order and
+            # stop at the limit than to merge all the posting lists
+            ids = iter(self._entries)
+            others = query_words
+        else:
+            ids = heapq.merge(*(self._postings[word] for word in prefixed))
+            others = query_words[1:]
+        others = [re.compile(r'(?:^|[\W_])' + re.escape(word))
+                  for word in others]
+        hits = []
+        previous = -1
+        for entry_id in ids:
+            if entry_id == previous:
+                continue # the same entry can have several matching words
+            previous = entry_id
+            entry = self._entries.get(entry_id)
+            if entry is None:
+                continue # garbage from a dropped playlist
+            name, index, key = entry
+            if all(word_rx.search(key) for word_rx in others):
+                filenames, titles = self.tracks_catalog.tracks(name)
+                hits.append(Hit(name, index, filenames[index],
+                                titles[index]))
+                if len(hits) == limit:
+                    break
+        return hits
+
+
+    def _prefixed(self, prefix):
+        start = i = bisect.bisect_left(self._words, prefix)
+        while i < len(self._words) and self._words[i].startswith(prefix):
+            i += 1
+        return self._words[start:i]
+
+
+    def _add(self, name, stamp):
+        self._stamps[name] = stamp
+        filenames, titles = self.tracks_catalog.tracks(name)
+        start = self._next_id
+        self._next_id += len(filenames)
+        self._ids[name] = range(start, self._next_id)
+        if not filenames:
+            return # ''.split('\0') would give one (phantom) entry
+        # Casefold and tokenize the whole playlist at once: each entry's
+        # key is its title and the last PATH_PARTS of its filename
+        # (NUL separates entries since it can't occur in either)
+        sep = os.sep
+        parts = -PATH_PARTS
+        text = '\0'.join(
+            f'{title} {sep.join(filename.rsplit(sep, PATH_PARTS)[parts:])}'
+            for filename, title in zip(filenames, titles)).casefold()
+        entries = self._entries
+        for index, key in enumerate(text.split('\0')):
+            entries[start + index] = (name, index, key)
+        postings = self._postings
+        entry_id = start
+        for word in TOKEN_RX.findall(text):
+            if word == '\0':
+                entry_id += 1
+            else:
+                posting = postings.get(word)
+                if posting is None:
+                    postings[word] = [entry_id]
+                    self._words_changed = True
+                elif posting[-1] != entry_id:
+                    posting.append(entry_id)
+
+
+    def _drop(self, name):
+        self._stamps.pop(name, None)
+        for entry_id in self._ids.pop(name, ()):
+            del self._entries[entry_id]
+            self._garbage += 1
+
+
+def words(text):
+    '''returns a list of the casefolded words in text'''
+    return WORD_RX.findall(text.casefold())
+
+
+WORD_RX = re.compile(r'[^\W_]+')
+TOKEN_RX = re.compile(r'[^\W_]+|\0')
+PATH_PARTS = 3 # e.g., artist/album/track
+MAX_MERGE = 256
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+# Copyright © 2021 Mark Summerfield. All rights reserved.
+# License: GPLv3
+
+'''
+Playback orders (e.g., shuffles) that never copy, reorder or save the
+playlist itself.
+
+Usage:
+    order = shuffle.Order(tracks, shuffle.Mode.SPREAD_ARTISTS)
+    index = order.next() # None once every track has been played
+    print(tracks[index].title)
+    index = order.previous() # None if at the first
+'''
+
+import array
+import enum
+import marshal
+import os
+import random
+
+import playlist
+
+
+@enum.unique
+class Mode(enum.Enum):
+    IN_ORDER = 'In Order'
+    SHUFFLE = 'Shuffle'
+    LEAST_PLAYED = 'Shuffle Least Played First'
+    SPREAD_ARTISTS = 'Shuffle Spreading Artists'
+    SHUFFLE_ALBUMS = 'Shuffle Albums'
+
+    @classmethod
+    def from_name(Class, name):
+        for member in Class:
+            if member.name == name:
+                return member
+
+
+class Order:
+    '''A playback order over a playlist's tracks in which each track is
+    played once
+
+    The order is held as an array of the playlist's indexes. For IN_ORDER
+    and SHUFFLE the array is filled lazily one index per next() (the
+    shuffle is a Fisher-Yates shuffle whose only state is a dict of the
+    positions swapped so far), so starting either takes the same time
+    for a million tracks as for ten. LEAST_PLAYED draws each track with a
+    probability inversely proportional to its play count using a Fenwick
+    tree (so each draw is O(log n)). SPREAD_ARTISTS (which keeps each
+    artist's tracks as far apart as possible) and SHUFFLE_ALBUMS (which
+    plays whole albums in playlist order but the albums in random order)
+    compute the whole array up front in O(n log n).
+
+    An Order doesn't track changes to the playlist: create a new one if
+    tracks are added or removed (see is_current()).
+    '''
+
+    def __init__(self, tracks, mode=Mode.SHUFFLE, *, plays=None, seed=None):
+        self.mode = mode
+        self._tracks = tracks
+        self._count = len(tracks)
+        self._random = random.Random(seed)
+        self._order = array.array('I') # the indexes drawn so far
+        self._position = 0 # the number of _order's indexes played
+        self._swaps = None # position: index for SHUFFLE's Fisher-Yates
+        self._weights = None # for LEAST_PLAYED
+        self._tree = None # Fenwick tree of _weights for LEAST_PLAYED
+        self._total = 0.0 # the sum of _weights
+        if mode is Mode.SHUFFLE:
+            self._swaps = {}
+        elif mode is Mode.LEAST_PLAYED:
+            if plays is None:
+                plays = PlayCounts()
+            self._make_tree(plays)
+        elif mode is Mode.SPREAD_ARTISTS:
+            self._order = _spread(tracks, self._random)
+        elif mode is Mode.SHUFFLE_ALBUMS:
+            self._order = _by_album(tracks, self._random)
+
+
+    def __len__(self):
+        return self._count
+
+
+    def is_current(self, tracks):
+        '''returns True if this order is still valid for tracks'''
+        return tracks is self._tracks and len(tracks) == self._count
+
+
+    @property
+    def current(self):
+        '''returns the index of the track most recently returned by
+        next() or previous() or None'''
+        return self._order[self._position - 1] if self._position else None
+
+
+    def next(self):
+        '''returns the index of the next track to play or None if every
+        track has been played'''
+        if self._position == len(self._order):
+            if self._position == self._count:
+                return None
+            self._order.append(self._draw())
+        self._position += 1
+        return self._order[self._position - 1]
+
+
+    def previous(self):
+        '''returns the index of the previously played track or None'''
+        if self._position < 2:
+            return None
+        self._position -= 1
+        return self._order[self._position - 1]
+
+
+    def _draw(self):
+        i = len(self._order)
+        if self.mode is Mode.SHUFFLE:
+            # Positions before i are never looked at again so they are
+            # dropped from _swaps which only holds the displaced indexes
+            swaps = self._swaps
+            j = self._random.randrange(i, self._count)
+            index = swaps.pop(i, i)
+            if j != i:
+                index, swaps[j] = swaps.get(j, j), index
+            return index
+        if self.mode is Mode.LEAST_PLAYED:
+            return self._draw_weighted()
+        return i # IN_ORDER
+
+
+    def _make_tree(self, plays):
+        counts = plays.counts
+        self._weights = array.array('d', (
+            1.0 / (1 + counts.get(track.filename, 0))
+            for track in self._tracks))
+        self._total = sum(self._weights)
+        tree = array.array('d', [0.0]) * (self._count + 1)
+        for i, weight in enumerate(self._weights, 1):
+            tree[i] += weight
+            j = i + (i & -i)
+            if j <= self._count:
+                tree[j] += tree[i]
+        self._tree = tree
+
+
+    def _draw_weighted(self):
+        tree = self._tree
+        target = self._random.random() * self._total
+        i = 0
+        step = 1 << self._count.bit_length()
+        while step:
+            j = i + step
+            if j <= self._count and tree[j] <= target:
+                target -= tree[j]
+                i = j
+            step >>= 1
+        if i >= self._count or not self._weights[i]: # rounding errors
+            i = next(i for i, weight in enumerate(self._weights) if weight)
+        weight = self._weights[i]
+        self._weights[i] = 0.0
+        self._total -= weight
+        j = i + 1
+        while j <= self._count:
+            tree[j] -= weight
+            j += j & -j
+        return i
+
+
+class PlayCounts:
+    '''A persistent record of how many times each track has been played'''
+
+    def __init__(self, filename=None):
+        if filename is None:
+            filename = os.path.join(playlist.cache_path(), 'plays.bin')
+        self.filename = str(filename)
+        self._counts = None # filename: count
+
+
+    @property
+    def counts(self):
+        if self._counts is None:
+            self._load()
+        return self._counts
+
+
+    def __getitem__(self, filename):
+        return self.counts.get(filename, 0)
+
+
+    def add(self, filename):
+        '''records one more play of filename'''
+        counts = self.counts
+        counts[filename] = counts.get(filename, 0) + 1
+        self.save()
+
+
+    def _load(self):
+        try:
+            with open(self.filename, 'rb') as file:
+                data = marshal.loads(file.read())
+            self._counts = (data['counts'] if data.get('version') ==
+                            _VERSION else {})
+        except (OSError, EOFError, ValueError, TypeError, KeyError):
+            self._counts = {}
+
+
+    def save(self):
+        data = dict(version=_VERSION, counts=self.counts)
+        playlist.write_atomically(self.filename, marshal.dumps(data),
+                                  durable=False)
+
+
+def artist(folder):
+    '''returns the artist given by a track's folder assuming that its
+    folders are artist/album/track'''
+    folder = os.path.dirname(os.path.dirname(folder))
+    return os.path.basename(folder).casefold()
+
+
+def _spread(tracks, rnd):
+    # Each artist's tracks are shuffled and then spaced evenly (with a
+    # random offset and a little jitter) over [0, 1) and every track is
+    # then played in order of its place
+    artists = {} # folder: artist
+    by_artist = {}
+    for i, track in enumerate(tracks):
+        folder = track.folder
+        name = artists.get(folder)
+        if name is None:
+            name = artists[folder] = artist(folder)
+        by_artist.setdefault(name, []).append(i)
+    places = array.array('d', [0.0]) * len(tracks)
+    for indexes in by_artist.values():
+        rnd.shuffle(indexes)
+        count = len(indexes)
+        offset = rnd.random()
+        for n, i in enumerate(indexes):
+            jitter = rnd.uniform(-JITTER, JITTER)
+            places[i] = (n + offset + jitter) / count
+    return array.array('I', sorted(range(len(tracks)),
+                                   key=places.__getitem__))
+
+
+def _by_album(tracks, rnd):
+    by_album = {} # folder: indexes (in playlist order)
+    for i, track in enumerate(tracks):
+        by_album.setdefault(track.folder, []).append(i)
+    albums = list(by_album.values())
+    rnd.shuffle(albums)
+    order = array.array('I')
+    for indexes in albums:
+        order.extend(indexes)
+    return order
+
+
+JITTER = 0.1 # as a fraction of the gap between an artist's tracks
+_VERSION = 1
@@ -2,6 +2,7 @@
 tokei -f -tPython
 unrecognized.py -q
 python3 -m flake8 --ignore=W504,E261,E303 .
+python3 importcheck.py
 python3 -m vulture . \
     | grep -v Window.py.*unused.class.*60 \
     | grep -v .*Form.py.*unused.method..body \
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# Copyright © 2021 Mark Summerfield. All rights reserved.
+# License: GPLv3
+
+'''
+Read the title, artist, album and track number embedded in music files
+without decoding any audio (and without GStreamer).
+
+Only the tag headers are read: ID3v2 (falling back to ID3v1) for MP3s,
+and Vorbis comments for Ogg Vorbis, Opus and FLAC files. Frames that
+aren't wanted (e.g., cover art) are skipped over rather than read.
+
+Usage:
+    for filename, found in zip(filenames, tags.read_many(filenames)):
+        if found is not None and found.title:
+            print(filename, found.title, found.artist)
+'''
+
+import collections
+import concurrent.futures
+import os
+
+
+Tags = collections.namedtuple('Tags', 'title artist album track')
+
+
+def read(filename):
+    '''returns the Tags of the given music file (any or all of which may
+    be None) or None if it can't be read'''
+    try:
+        with open(filename, 'rb') as file:
+            header = file.read(10)
+            if header[:3] == b'ID3':
+                found = _read_id3v2(file, header)
+            elif header[:4] == b'fLaC':
+                found = _read_flac(file)
+            elif header[:4] == b'OggS':
+                found = _read_ogg(file)
+            else:
+                found = None
+            if found is None or not any(found.values()):
+                found = _read_id3v1(file) or found
+    except (OSError, ValueError, IndexError):
+        return None
+    if found is None:
+        return Tags(None, None, None, None)
+    return Tags(found.get('title'), found.get('artist'), found.get('album'),
+                _track_number(found.get('track')))
+
+
+def read_many(filenames, *, reader=None, workers=None):
+    '''returns a list of the Tags (or None) of each of the given files in
+    the same order, reading them with reader (which defaults to read())
+    in a thread pool (since the work is almost all I/O)'''
+    if reader is None:
+        reader = read
+    filenames = list(filenames)
+    if len(filenames) < 2:
+        return [reader(filename) for filename in filenames]
+    with concurrent.futures.ThreadPoolExecutor(
+            max_workers=workers or WORKERS) as executor:
+        return list(executor.map(reader, filenames, chunksize=CHUNK_FILES))
+
+
+def _read_id3v2(file, header):
+    major, flags = header[3], header[5]
+    end = 10 + synchsafe(header[6:10])
+    if major not in {2, 3, 4}:
+        return None
+    if flags & 0x80 and major < 4: # the whole tag is unsynchronized
+        data = _resynchronized(file.read(end - 10))
+        return _id3v2_frames(_BytesReader(data), major, len(data))
+    if flags & 0x40: # skip the extended header
+        size = file.read(4)
+        # v2.4's size includes the size itself but v2.3's doesn't
+        file.seek(synchsafe(size) - 4 if major == 4 else
+                  int.from_bytes(size, 'big'), os.SEEK_CUR)
+    return _id3v2_frames(file, major, end)
+
+
+def _id3v2_frames(file, major, end):
+    found = {}
+    if major == 2:
+        id_size, header_size, names = 3, 6, _ID3V22_FRAMES
+    else:
+        id_size, header_size, names = 4, 10, _ID3V2_FRAMES
+    while len(found) < len(names):
+        position = file.tell()
+        if position + header_size > end:
+            break
+        header = file.read(header_size)
+        if len(header) < header_size or header[0] == 0:
+            break # padding
+        frame_id = header[:id_size]
+        size_bytes = header[id_size:id_size + (3 if major == 2 else 4)]
+        size = (synchsafe(size_bytes) if major == 4 else
+                int.from_bytes(size_bytes, 'big'))
+        name = names.get(frame_id)
+        if name is None or name in found:
+            file.seek(size, os.SEEK_CUR)
+            continue
+        data = file.read(size)
+        if major == 4:
+            if header[9] & 0x0C: # compressed or encrypted
+                continue
+            if header[9] & 0x01: # has a data length indicator
+                data = data[4:]
+            if header[9] & 0x02: # unsynchronized
+                data = _resynchronized(data)
+        elif major == 3 and header[9] & 0xC0: # compressed or encrypted
+            continue
+        text = _id3v2_text(data)
+        if text:
+            found[name] = text
+    return found
+
+
+def _id3v2_text(data):
+    if not data:
+        return None
+    encoding = {0: 'latin-1', 1: 'utf-16', 2: 'utf-16-be',
+                3: 'utf-8'}.get(data[0], 'latin-1')
+    data = data[1:]
+    if encoding.startswith('utf-16') and len(data) % 2:
+        data = data[:-1]
+    text = data.decode(encoding, errors='replace')
+    return text.split('\0', 1)[0].strip() or None
+
+
+def _read_id3v1(file):
+    file.seek(0, os.SEEK_END)
+    if file.tell() < 128:
+        return None
+    file.seek(-128, os.SEEK_END)
+    data = file.read(128)
+    if data[:3] != b'TAG':
+        return None
+    found = {}
+    for name, start, end in (('title', 3, 33), ('artist', 33, 63),
+                             ('album', 63, 93)):
+        text = data[start:end].split(b'\0', 1)[0].decode(
+            'latin-1').strip()
+        if text:
+            found[name] = text
+    if data[125] == 0 and data[126]: # ID3v1.1 track number
+        found['track'] = str(data[126])
+    return found
+
+
+def _read_flac(file):
+    file.seek(4)
+    while True:
+        header = file.read(4)
+        if len(header) < 4:
+            return None
+        size = int.from_bytes(header[1:4], 'big')
+        if header[0] & 0x7F == 4: # VORBIS_COMMENT
+            return _vorbis_comments(file.read(size))
+        if header[0] & 0x80: # the last metadata block
+            return None
+        file.seek(size, os.SEEK_CUR)
+
+
+def _read_ogg(file):
+    # The comments are in the second packet which can span several pages
+    file.seek(0)
+    packets = []
+    packet = b''
+    read = 0
+    while len(packets) < 2 and read < MAX_OGG_HEADERS:
+        header = file.read(27)
+        if len(header) < 27 or header[:4] != b'OggS':
+            break
+        lacing = file.read(header[26])
+        data = file.read(sum(lacing))
+        read += 27 + len(lacing) + len(data)
+        offset = 0
+        for size in lacing:
+            packet += data[offset:offset + size]
+            offset += size
+            if size < 255: # the end of a packet
+                packets.append(packet)
+                packet = b''
+    if len(packets) < 2:
+        packets.append(packet) # possibly truncated but may be enough
+        if len(packets) < 2:
+            return None
+    comments = packets[1]
+    for prefix in (b'\x03vorbis', b'OpusTags'):
+        if comments.startswith(prefix):
+            return _vorbis_comments(comments[len(prefix):])
+    return None
+
+
+def _vorbis_comments(data):
+    found = {}
+    vendor_size = int.from_bytes(data[:4], 'little')
+    offset = 4 + vendor_size
+    count = int.from_bytes(data[offset:offset + 4], 'little')
+    offset += 4
+    for _ in range(count):
+        size = int.from_bytes(data[offset:offset + 4], 'little')
+        offset += 4
+        if offset + size > len(data):
+            break # truncated (or not really comments)
+        comment = data[offset:offset + size]
+        offset += size
+        key, _, value = comment.partition(b'=')
+        name = _VORBIS_FIELDS.get(key.upper())
+        if name is not None and name not in found:
+            value = value.decode('utf-8', errors='replace').strip()
+            if value:
+                found[name] = value
+    return found
+
+
+def _track_number(text):
+    # e.g., '3' or '3/12' or '03'
+    if text:
+        number = text.split('/', 1)[0].strip()
+        if number.isdecimal():
+            return int(number)
+    return None
+
+
+def synchsafe(data):
+    value = 0
+    for byte in data:
+        value = (value << 7) | (byte & 0x7F)
+    return value
+
+
+def _resynchronized(data):
+    return data.replace(b'\xFF\x00', b'\xFF')
+
+
+class _BytesReader:
+    # Just enough of a file's interface for _id3v2_frames()
+
+    def __init__(self, data):
+        self._data = data
+        self._position = 0
+
+
+    def tell(self):
+        return self._position
+
+
+    def read(self, size):
+        data = self._data[self._position:self._position + size]
+        self._position += len(data)
+        return data
+
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            offset += self._position
+        self._position = offset
+
+
+_ID3V2_FRAMES = {b'TIT2': 'title', b'TPE1': 'artist', b'TALB': 'album',
+                 b'TRCK': 'track'}
+_ID3V22_FRAMES = {b'TT2': 'title', b'TP1': 'artist', b'TAL': 'album',
+                  b'TRK': 'track'}
+_VORBIS_FIELDS = {b'TITLE': 'title', b'ARTIST': 'artist', b'ALBUM': 'album',
+                  b'TRACKNUMBER': 'track'}
+WORKERS = min(32, (os.cpu_count() or 1) * 4)
+CHUNK_FILES = 16 # per thread pool task
+MAX_OGG_HEADERS = 1024 * 1024 # bytes
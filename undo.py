@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# Copyright © 2021 Mark Summerfield. All rights reserved.
+# License: GPLv3
+
+'''
+Multi-level undo and redo of the changes made to a playlist.
+
+Usage:
+    tracks = playlist.Playlist(filename)
+    tracks.journal = undo.Journal(depth=100)
+    tracks.remove([3, 5]) # recorded
+    with tracks.batch(): # recorded as one step and saved once
+        tracks.retitle(0, 'Overture')
+        tracks.move_to([7], 1)
+    tracks.journal.undo(tracks) # one save
+    tracks.journal.redo(tracks) # one save
+'''
+
+import array
+import collections
+
+
+class Journal:
+    '''Records each playlist change as a compact operation from which
+    both the change and its inverse can be replayed
+
+    The operations (each a tuple whose first item is its kind) are:
+        ('insert', indexes, tracks) the tracks now at the indexes
+        ('remove', indexes, tracks) the tracks that were at the indexes
+        ('move', index, new_index)  one track moved
+        ('order', positions, sources, gesture) the tracks at sources
+                                    moved to positions (only those that
+                                    moved); gesture is None or, for a
+                                    block moved up or down, the
+                                    (before, after) indexes of the block
+        ('title', index, old, new)  a track was retitled
+        ('replace', index, old, new) a track was replaced
+
+    Indexes are kept in arrays rather than lists or tuples, and only
+    the tracks that were inserted or removed are referenced, so even for
+    huge playlists the memory used is proportional to what changed
+    rather than to the playlist's length. At most depth steps are kept;
+    the oldest are dropped first. Consecutive moves of the same track,
+    and consecutive up or down moves of the same block, are coalesced
+    into a single step; other reorderings (e.g., sorts) never are.
+    '''
+
+    def __init__(self, depth=None):
+        if depth is None:
+            depth = DEPTH
+        self._undos = collections.deque(maxlen=max(1, depth)) # of steps
+        self._redos = [] # of steps; each step is a tuple of operations
+        self._group = None # the operations recorded in the current batch
+        self._nesting = 0 # the depth of nested begin() calls
+        self._replaying = False
+
+
+    def clear(self):
+        self._undos.clear()
+        self._redos.clear()
+
+
+    @property
+    def depth(self):
+        return self._undos.maxlen
+
+
+    @property
+    def can_undo(self):
+        return bool(self._undos)
+
+
+    @property
+    def can_redo(self):
+        return bool(self._redos)
+
+
+    def record(self, op):
+        '''records the given operation as a new step (or as part of the
+        current batch's step); called by playlist.Playlist'''
+        if self._replaying:
+            return
+        if self._nesting:
+            self._group.append(op)
+        else:
+            self._push((op,))
+
+
+    def begin(self):
+        '''starts a batch; called by playlist.Playlist.batch()'''
+        if not self._replaying:
+            if not self._nesting:
+                self._group = []
+            self._nesting += 1
+
+
+    def end(self):
+        '''ends a batch; called by playlist.Playlist.batch()'''
+        if not self._replaying:
+            self._nesting -= 1
+            if not self._nesting:
+                group = self._group
+                self._group = None
+                if group:
+                    self._push(tuple(group))
+
+
+    def _push(self, step):
+        self._redos.clear()
+        if self._undos and len(step) == 1 and len(self._undos[-1]) == 1:
+            op = _coalesced(self._undos[-1][0], step[0])
+            if op is not None:
+                if op is _NOTHING: # e.g., moved down then back up
+                    self._undos.pop()
+                else:
+                    self._undos[-1] = (op,)
+                return
+        self._undos.append(step)
+
+
+    def undo(self, tracks):
+        '''reverts the most recent step with a single save; returns True if
+        there was a step to undo'''
+        if not self._undos:
+            return False
+        step = self._undos.pop()
+        self._replay(tracks, [_inverse(op) for op in reversed(step)])
+        self._redos.append(step)
+        return True
+
+
+    def redo(self, tracks):
+        '''reapplies the most recently undone step with a single save;
+        returns True if there was a step to redo'''
+        if not self._redos:
+            return False
+        step = self._redos.pop()
+        self._replay(tracks, step)
+        self._undos.append(step)
+        return True
+
+
+    def _replay(self, tracks, ops):
+        self._replaying = True
+        try:
+            with tracks.batch():
+                for op in ops:
+                    _apply(tracks, op)
+        finally:
+            self._replaying = False
+
+
+def _inverse(op):
+    kind = op[0]
+    if kind == 'insert':
+        return ('remove',) + op[1:]
+    if kind == 'remove':
+        return ('insert',) + op[1:]
+    if kind == 'move':
+        return ('move', op[2], op[1])
+    if kind == 'order':
+        gesture = op[3]
+        return ('order', op[2], op[1],
+                None if gesture is None else (gesture[1], gesture[0]))
+    return (kind, op[1], op[3], op[2]) # title or replace
+
+
+def _apply(tracks, op):
+    kind = op[0]
+    if kind == 'insert':
+        tracks.reinsert(list(zip(op[1], op[2])))
+    elif kind == 'remove':
+        tracks.remove(op[1])
+    elif kind == 'move':
+        tracks.move_track(op[1], op[2])
+    elif kind == 'order':
+        tracks.permute(op[1], op[2])
+    elif kind == 'title':
+        tracks.retitle(op[1], op[3])
+    elif kind == 'replace':
+        tracks[op[1]] = op[3]
+
+
+def _coalesced(previous, op):
+    '''returns the single operation equivalent to previous followed by op,
+    or _NOTHING if together they change nothing, or None if they can't be
+    coalesced'''
+    kind = op[0]
+    if kind != previous[0]:
+        return None
+    if kind == 'move':
+        if previous[2] != op[1]: # a different track
+            return None
+        if previous[1] == op[2]:
+            return _NOTHING
+        return ('move', previous[1], op[2])
+    if kind == 'order':
+        # Only a block moved up or down and then moved again (in either
+        # direction) is coalesced
+        if (previous[3] is None or op[3] is None or
+                previous[3][1] != op[3][0]):
+            return None
+        # After previous the track at i came from first[i]; after op the
+        # track at i came from second[i] so originally from
+        # first[second[i]]
+        first = dict(zip(previous[1], previous[2]))
+        second = dict(zip(op[1], op[2]))
+        positions = array.array('I')
+        sources = array.array('I')
+        for i in sorted(first.keys() | second.keys()):
+            j = second.get(i, i)
+            j = first.get(j, j)
+            if i != j:
+                positions.append(i)
+                sources.append(j)
+        if not positions:
+            return _NOTHING
+        return ('order', positions, sources, (previous[3][0], op[3][1]))
+    return None
+
+
+_NOTHING = ('nothing',)
+DEPTH = 100
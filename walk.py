@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# Copyright © 2021 Mark Summerfield. All rights reserved.
+# License: GPLv3
+
+'''
+Walk folder trees using a thread pool to read several folders at once.
+
+On network (e.g., NFS or SMB) mounts reading a folder is dominated by
+latency rather than CPU, so while one folder is being yielded the next
+few are already being read. The results are always yielded in the same
+(sorted) order however long each folder takes to read.
+
+Usage:
+    for filename in walk.files(music_path, formats.is_track):
+        print(filename)
+    for root, folders, files in walk.walk(playlists_path,
+                                          follow_symlinks=True):
+        print(root, len(folders), len(files))
+'''
+
+import concurrent.futures
+import os
+
+
+def walk(top, *, follow_symlinks=False, progress=None, workers=None):
+    '''yields a (root, folders, files) tuple for top and for each of its
+    subfolders in the same top-down order as os.walk() (and like
+    os.walk(), folders may be pruned in place to skip subfolders)
+
+    Each tuple's folders and files are sorted by name and hidden (i.e.,
+    dot) folders are skipped. Symlinked folders are skipped unless
+    follow_symlinks is True, in which case any folder that has already
+    been walked (e.g., because a symlink points to one of its ancestors)
+    is skipped, so loops are walked at most once. Folders that can't be
+    read are skipped. If given, progress is called with the number of
+    folders and files found so far after each folder has been read.
+    '''
+    top = os.fspath(top)
+    seen = set() # (st_dev, st_ino) of each folder walked if following
+    pending = [top] # a stack of the folders to walk: the next is last
+    scans = {} # folder: Future of _scan(folder)
+    folder_count = file_count = 0
+    with concurrent.futures.ThreadPoolExecutor(
+            max_workers=workers or WORKERS) as executor:
+        while pending:
+            # Read ahead the next folders (nearest first) but never have
+            # more than MAX_PENDING scans submitted or unconsumed (those
+            # for folders that have since been pushed down the stack by
+            # subfolders are kept until they are reached)
+            for folder in reversed(pending[-MAX_PENDING:]):
+                if len(scans) >= MAX_PENDING:
+                    break
+                if folder not in scans:
+                    scans[folder] = executor.submit(_scan, folder,
+                                                    follow_symlinks)
+            root = pending.pop()
+            scan = scans.pop(root, None)
+            scan = (_scan(root, follow_symlinks) if scan is None else
+                    scan.result())
+            if scan is None:
+                continue # unreadable
+            key, folders, files = scan
+            if follow_symlinks:
+                if key in seen:
+                    continue # a loop or a second link to the same folder
+                seen.add(key)
+            folder_count += 1
+            file_count += len(files)
+            if progress is not None:
+                progress(folder_count, file_count)
+            yield root, folders, files
+            pending += [os.path.join(root, name)
+                        for name in reversed(folders)]
+
+
+def files(top, match=None, **kwargs):
+    '''yields the full name of each file in top and its subfolders (in
+    walk() order) whose name matches, i.e., for which match(name)
+    returns True (if match is given); see walk() for kwargs'''
+    for root, _, names in walk(top, **kwargs):
+        for name in names:
+            if match is None or match(name):
+                yield os.path.join(root, name)
+
+
+def _scan(folder, follow_symlinks):
+    # Returns the folder's (st_dev, st_ino) (or None if not following
+    # symlinks since it isn't needed), sorted subfolders and sorted files
+    # or None if it can't be read
+    key = None
+    folders = []
+    files = []
+    try:
+        if follow_symlinks:
+            stat = os.stat(folder)
+            key = stat.st_dev, stat.st_ino
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                try:
+                    if not entry.is_dir():
+                        files.append(entry.name)
+                    elif not entry.name.startswith('.') and (
+                            follow_symlinks or not entry.is_symlink()):
+                        folders.append(entry.name)
+                except OSError:
+                    pass # e.g., a dangling symlink
+    except OSError:
+        return None
+    folders.sort()
+    files.sort()
+    return key, folders, files
+
+
+WORKERS = 16 # folder reads are mostly waiting so use more than the CPUs
+MAX_PENDING = 64 # the most folder scans in flight or awaiting use